@@ -0,0 +1,119 @@
+"""
+Times `efficient_attention`, `multi_head_attention` and `attention` forward and backward on CPU over head counts and
+sizes.
+
+    python benchmarks/attention.py
+    python benchmarks/attention.py -b 16 --heads 1 4 16 --sizes 8 32
+
+`efficient_attention` is compared with computing one head at a time, the way it was written before the heads were
+batched.  `multi_head_attention` computes its heads in one matmul per stage and is timed for reference.
+
+`attention` is compared with and without materializing the attention map.  Without the map, the forward without
+gradients uses the fused kernel and forward and backward uses the chunked online softmax.  Memory is the size of the
+tensors kept for backward.  Maps larger than `--largest_map` positions are not materialized.
+"""
+from hypergan.discriminators.configurable_discriminator import ConfigurableDiscriminator
+from hypergan.modules.attention import Attention
+from torch.nn import functional as f
+import argparse
+import time
+import torch
+
+class BenchmarkGAN:
+    def __init__(self, channels, size):
+        self._channels = channels
+        self._size = size
+
+    def channels(self):
+        return self._channels
+
+    def width(self):
+        return self._size
+
+    def height(self):
+        return self._size
+
+def per_head(layer, input_):
+    n, _, h, w = input_.size()
+    keys = layer.keys(input_).reshape((n, layer.key_channels, h * w))
+    queries = layer.queries(input_).reshape(n, layer.key_channels, h * w)
+    values = layer.values(input_).reshape((n, layer.value_channels, h * w))
+    head_key_channels = layer.key_channels // layer.head_count
+    head_value_channels = layer.value_channels // layer.head_count
+    attended_values = []
+    for i in range(layer.head_count):
+        key = f.softmax(keys[:, i * head_key_channels: (i + 1) * head_key_channels, :], dim=2)
+        query = f.softmax(queries[:, i * head_key_channels: (i + 1) * head_key_channels, :], dim=1)
+        value = values[:, i * head_value_channels: (i + 1) * head_value_channels, :]
+        context = key @ value.transpose(1, 2)
+        attended_values.append((context.transpose(1, 2) @ query).reshape(n, head_value_channels, h, w))
+    return layer.reprojection(torch.cat(attended_values, dim=1))
+
+def timed(fn, input, iterations):
+    for i in range(3):
+        fn(input).sum().backward()
+    start = time.time()
+    for i in range(iterations):
+        fn(input).sum().backward()
+    return (time.time() - start) / iterations * 1000
+
+def timed_forward(fn, input, iterations):
+    with torch.no_grad():
+        fn(input)
+        start = time.time()
+        for i in range(iterations):
+            fn(input)
+    return (time.time() - start) / iterations * 1000
+
+def kept_megabytes(fn, input):
+    storages = {}
+    def keep(tensor):
+        storage = tensor.untyped_storage()
+        storages[storage.data_ptr()] = storage.nbytes()
+        return tensor
+    with torch.autograd.graph.saved_tensors_hooks(keep, lambda tensor: tensor):
+        output = fn(input)
+    output.sum().backward()
+    return sum(storages.values()) / 2**20
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark attention layers on CPU.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--channels', '-c', type=int, default=64)
+    parser.add_argument('--heads', nargs='*', type=int, default=[1, 4, 8, 16])
+    parser.add_argument('--sizes', nargs='*', type=int, default=[8, 16, 32, 64], help='Spatial sizes for efficient_attention.')
+    parser.add_argument('--features', nargs='*', type=int, default=[256, 1024], help='Input sizes for multi_head_attention.')
+    parser.add_argument('--attention_sizes', nargs='*', type=int, default=[16, 32, 64, 128], help='Spatial sizes for attention.')
+    parser.add_argument('--attention_channels', type=int, default=32)
+    parser.add_argument('--largest_map', type=int, default=64*64, help='Largest attention map to materialize, in positions.')
+    parser.add_argument('--iterations', '-i', type=int, default=20)
+    args = parser.parse_args()
+
+    print("efficient_attention, %d channels, key and value channels 64" % args.channels)
+    for size in args.sizes:
+        for heads in args.heads:
+            component = ConfigurableDiscriminator(BenchmarkGAN(args.channels, size), {"device": "cpu", "layers": ["efficient_attention heads=%d key_channels=64 value_channels=64" % heads]})
+            layer = component.net[0]
+            x = torch.randn(args.batch_size, args.channels, size, size)
+            per_head_ms = timed(lambda x: per_head(layer, x), x, args.iterations)
+            batched_ms = timed(lambda x: layer(x, {}), x, args.iterations)
+            print("  %3dx%-3d heads %2d  per head %8.2f ms  batched %8.2f ms (%.2fx)" % (size, size, heads, per_head_ms, batched_ms, per_head_ms / batched_ms))
+
+    print("multi_head_attention")
+    for features in args.features:
+        for heads in args.heads:
+            component = ConfigurableDiscriminator(BenchmarkGAN(features, 1), {"device": "cpu", "layers": ["flatten", "multi_head_attention %d heads=%d" % (features, heads)]})
+            x = torch.randn(args.batch_size, features, 1, 1)
+            print("  %5d features heads %2d  %8.2f ms" % (features, heads, timed(component, x, args.iterations)))
+
+    print("attention, %d channels, batch size %d" % (args.attention_channels, args.batch_size))
+    for size in args.attention_sizes:
+        layer = Attention(args.attention_channels)
+        x = torch.randn(args.batch_size, args.attention_channels, size, size, requires_grad=True)
+        iterations = max(1, args.iterations * 16 // size)
+        for label, efficient_size in [("attention map", size * size), ("efficient", 0)]:
+            if efficient_size > args.largest_map:
+                print("  %3dx%-3d %-14s skipped" % (size, size, label))
+                continue
+            layer.efficient_size = efficient_size
+            print("  %3dx%-3d %-14s forward %9.2f ms  forward and backward %9.2f ms  %9.1f MB kept for backward" % (size, size, label, timed_forward(layer, x, iterations), timed(layer, x, iterations), kept_megabytes(layer, x)))
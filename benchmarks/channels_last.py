@@ -0,0 +1,73 @@
+"""
+Compares training step time of configurable generators and discriminators in NCHW and with
+`memory_format: channels_last`.
+
+    python benchmarks/channels_last.py default simpler-generator -s 64x64x3 -b 8
+    python benchmarks/channels_last.py configurable -s 128x128x3
+
+Both versions share weights.  The largest difference between their outputs is printed as a check.
+"""
+from hypergan.config_check import CheckGAN
+from hypergan.gan_component import ValidationException
+import argparse
+import copy
+import hypergan as hg
+import json
+import time
+import torch
+
+def components(config, width, height, channels, batch_size, memory_format):
+    config = copy.deepcopy(config)
+    for name in ["generator", "discriminator"]:
+        config[name]["memory_format"] = memory_format
+    gan = CheckGAN(config, width, height, channels, batch_size)
+    gan.latent = gan.create_component("latent", meta=False)
+    generator = gan.create_component("generator", meta=False, input=gan.latent)
+    discriminator = gan.create_component("discriminator", meta=False)
+    return gan, generator, discriminator
+
+def step(gan, generator, discriminator, z, x):
+    gan.latent.z = z
+    g = generator(z)
+    loss = discriminator(g).mean() + discriminator(x).mean()
+    loss.backward()
+    return g
+
+def run(gan, generator, discriminator, z, x, iterations):
+    for i in range(3):
+        step(gan, generator, discriminator, z, x)
+    start = time.time()
+    for i in range(iterations):
+        step(gan, generator, discriminator, z, x)
+    return (time.time() - start) / iterations * 1000
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark channels_last configurable components.')
+    parser.add_argument('configs', nargs='*', default=["default", "simpler-generator", "differential_augmentation"], help='Bundled config names or json paths.')
+    parser.add_argument('--size', '-s', type=str, default='64x64x3', help='Size of your data, widthxheightxchannels.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--iterations', '-i', type=int, default=10)
+    args = parser.parse_args()
+    width, height, channels = [int(x) for x in args.size.split("x")]
+
+    for name in args.configs:
+        if name.endswith(".json"):
+            with open(name) as f:
+                config = json.load(f)
+        else:
+            config = hg.Configuration.load(name + ".json", verbose=False, prepackaged=True)
+        torch.manual_seed(0)
+        try:
+            nchw = components(config, width, height, channels, args.batch_size, "contiguous")
+            channels_last = components(config, width, height, channels, args.batch_size, "channels_last")
+            channels_last[1].load_state_dict(nchw[1].state_dict())
+            channels_last[2].load_state_dict(nchw[2].state_dict())
+            z = nchw[0].latent.z.clone()
+            x = torch.rand([args.batch_size, channels, height, width]) * 2 - 1
+            difference = (step(*nchw, z, x) - step(*channels_last, z, x)).abs().max().item()
+        except ValidationException as e:
+            print("%-28s skipped: %s" % (name, e))
+            continue
+        nchw_ms = run(*nchw, z, x, args.iterations)
+        channels_last_ms = run(*channels_last, z, x, args.iterations)
+        print("%-28s NCHW %8.1f ms  channels_last %8.1f ms (%.2fx)  max difference %.2g" % (name, nchw_ms, channels_last_ms, nchw_ms / channels_last_ms, difference))
@@ -0,0 +1,115 @@
+"""
+Compares activation memory and training step time of configurable generators and discriminators with and without
+the `checkpoint` option.
+
+    python benchmarks/checkpoint.py default -s 128x128x3 -b 8
+    python benchmarks/checkpoint.py differential_augmentation -l resizable_stack conv
+
+Activation memory is the size of the tensors kept for backward, so it is measured the same way on CPU and
+GPU.  On CUDA the peak allocated memory is printed as well.
+"""
+from hypergan.config_check import CheckGAN
+from hypergan.gan_component import ValidationException
+import argparse
+import copy
+import hypergan as hg
+import json
+import time
+import torch
+
+def components(config, width, height, channels, batch_size, layers, device):
+    config = copy.deepcopy(config)
+    for name in ["generator", "discriminator"]:
+        config[name]["checkpoint"] = layers
+        config[name]["device"] = device
+    gan = CheckGAN(config, width, height, channels, batch_size)
+    gan.device = device
+    gan.latent = gan.create_component("latent", meta=False)
+    generator = gan.create_component("generator", meta=False, input=gan.latent).to(device)
+    discriminator = gan.create_component("discriminator", meta=False).to(device)
+    return gan, generator, discriminator
+
+def step(gan, generator, discriminator, z, x):
+    gan.latent.z = z
+    g = generator(z)
+    loss = discriminator(g).mean() + discriminator(x).mean()
+    loss.backward()
+    return g
+
+def saved_megabytes(gan, generator, discriminator, z, x):
+    """
+    Size of the distinct storages kept for backward by one forward pass.  These are the tensors autograd saves plus
+    the inputs of checkpointed layers, which the checkpoint holds for recomputation.
+    """
+    storages = {}
+    def keep(tensor):
+        storage = tensor.untyped_storage()
+        storages[storage.data_ptr()] = storage.nbytes()
+        return tensor
+    checkpointed = set([id(module) for component in [generator, discriminator] for module, parsed in zip(component.net, component.parsed_layers) if component.checkpointed(parsed.layer_name, parsed.parsed_options)])
+    def keep_input(module, args):
+        if id(module) in checkpointed:
+            [keep(arg) for arg in args if torch.is_tensor(arg)]
+    hook = torch.nn.modules.module.register_module_forward_pre_hook(keep_input)
+    try:
+        with torch.autograd.graph.saved_tensors_hooks(keep, lambda tensor: tensor):
+            gan.latent.z = z
+            loss = discriminator(generator(z)).mean() + discriminator(x).mean()
+    finally:
+        hook.remove()
+    loss.backward()
+    return sum(storages.values()) / 2**20
+
+def run(gan, generator, discriminator, z, x, iterations):
+    for i in range(3):
+        step(gan, generator, discriminator, z, x)
+    if z.is_cuda:
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.time()
+    for i in range(iterations):
+        step(gan, generator, discriminator, z, x)
+    if z.is_cuda:
+        torch.cuda.synchronize()
+    ms = (time.time() - start) / iterations * 1000
+    peak = torch.cuda.max_memory_allocated() / 2**20 if z.is_cuda else None
+    return ms, saved_megabytes(gan, generator, discriminator, z, x), peak
+
+def report(label, ms, saved, peak):
+    print("  %-26s %8.1f ms  %8.1f MB kept for backward%s" % (label, ms, saved, "" if peak is None else "  %8.1f MB peak" % peak))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark activation checkpointing of configurable components.')
+    parser.add_argument('configs', nargs='*', default=["default", "differential_augmentation"], help='Bundled config names or json paths.')
+    parser.add_argument('--layers', '-l', nargs='*', default=["resizable_stack"], help='Layer names to checkpoint.')
+    parser.add_argument('--size', '-s', type=str, default='64x64x3', help='Size of your data, widthxheightxchannels.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--iterations', '-i', type=int, default=10)
+    args = parser.parse_args()
+    width, height, channels = [int(x) for x in args.size.split("x")]
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+
+    for name in args.configs:
+        if name.endswith(".json"):
+            with open(name) as f:
+                config = json.load(f)
+        else:
+            config = hg.Configuration.load(name + ".json", verbose=False, prepackaged=True)
+        torch.manual_seed(0)
+        try:
+            stored = components(config, width, height, channels, args.batch_size, [], device)
+            recomputed = components(config, width, height, channels, args.batch_size, args.layers, device)
+            recomputed[1].load_state_dict(stored[1].state_dict())
+            recomputed[2].load_state_dict(stored[2].state_dict())
+            z = stored[0].latent.z.clone().to(device)
+            x = torch.rand([args.batch_size, channels, height, width], device=device) * 2 - 1
+            torch.manual_seed(1)
+            expected = step(*stored, z, x)
+            torch.manual_seed(1)
+            difference = (expected - step(*recomputed, z, x)).abs().max().item()
+        except ValidationException as e:
+            print("%-28s skipped: %s" % (name, e))
+            continue
+        print("%s (max difference %.2g)" % (name, difference))
+        report("stored", *run(*stored, z, x, args.iterations))
+        report("checkpoint " + " ".join(args.layers), *run(*recomputed, z, x, args.iterations))
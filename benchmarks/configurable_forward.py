@@ -0,0 +1,88 @@
+"""
+Compares the per-call overhead of ConfigurableComponent.forward with the per-layer interpreter it replaced.
+
+    python benchmarks/configurable_forward.py -b 1 -l 32
+
+Runs a stack of small layers on the CPU so Python dispatch, not compute, dominates.
+"""
+from hypergan.discriminators.configurable_discriminator import ConfigurableDiscriminator
+from hypergan.gan_component import ValidationException
+from hypergan.layer_shape import LayerShape
+import argparse
+import hypergan as hg
+import time
+import torch
+
+class BenchmarkGAN:
+    steps = 1
+
+    def channels(self):
+        return 8
+
+    def width(self):
+        return 8
+
+    def height(self):
+        return 8
+
+def interpreted_forward(component, input, context={}):
+    """The forward loop before execution plans, inspecting every layer on every call"""
+    for module, parsed, layer_shape in zip(component.net, component.parsed_layers, component.layer_shapes):
+        try:
+            options = parsed.parsed_options
+            args = parsed.args
+            layer_name = parsed.layer_name
+            name = options.name
+            if isinstance(module, hg.Layer):
+                input = module(input, context)
+            elif layer_name == "adaptive_instance_norm":
+                input = module(input, context['w'])
+            elif layer_name == "ez_norm":
+                input = module(input, context['w'])
+            elif layer_name == "split":
+                input = torch.split(input, args[0], options.dim or -1)[args[1]]
+            elif layer_name == "latent":
+                input = component.gan.latent.z
+            elif layer_name == "modulated_conv2d":
+                input = module(input, context['w'])
+            else:
+                input = module(input)
+            if component.gan.steps == 0:
+                size = LayerShape(*list(input.shape[1:]))
+            if name is not None:
+                context[name] = input
+        except:
+            raise ValidationException("Error on " + parsed.layer_defn)
+    return input
+
+def run(forward, x, iterations):
+    with torch.no_grad():
+        for i in range(10):
+            forward(x, {})
+        start = time.time()
+        for i in range(iterations):
+            forward(x, {})
+    return (time.time() - start) / iterations * 1e6
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', '-b', type=int, default=1)
+    parser.add_argument('--layers', '-l', type=int, default=32)
+    parser.add_argument('--iterations', '-i', type=int, default=2000)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    layers = []
+    for i in range(args.layers // 4):
+        layers += ["conv 8 filter=1 name=block%d" % i, "lrelu", "add self block%d" % i, "identity"]
+    component = ConfigurableDiscriminator(BenchmarkGAN(), {"device": "cpu", "layers": layers})
+    x = torch.randn(args.batch_size, 8, 8, 8)
+    with torch.no_grad():
+        component(x)
+
+    interpreted = run(lambda x, context: interpreted_forward(component, x, context), x, args.iterations)
+    planned = run(component.forward, x, args.iterations)
+    print("%d layers, batch size %d" % (len(layers), args.batch_size))
+    print("interpreter     %8.1f us/call" % interpreted)
+    print("execution plan  %8.1f us/call" % planned)
+    print("saved           %8.1f us/call (%.1f%%)" % (interpreted - planned, 100 * (interpreted - planned) / interpreted))
@@ -0,0 +1,87 @@
+"""
+Times training, sampling, saving and loading a GAN on the cpu backend.
+
+    python benchmarks/cpu_train.py -s 32x32x3 -b 8 -n 20
+    python benchmarks/cpu_train.py --config my_config.json
+
+Training data is a blank input so only the GAN is measured.  Without a config a small configurable
+generator and discriminator are used.
+"""
+from hypergan.inputs.image_loader import ImageLoader
+from hypergan.samplers.static_batch_sampler import StaticBatchSampler
+from hypergan.viewer import GlobalViewer
+import argparse
+import hyperchamber as hc
+import hypergan as hg
+import json
+import tempfile
+import time
+import torch
+
+def default_config(width, height, channels):
+    return {
+        "class": "class:hypergan.gans.standard_gan.StandardGAN",
+        "latent": {
+            "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
+            "z": 64
+        },
+        "generator": {
+            "class": "class:hypergan.generators.configurable_generator.ConfigurableGenerator",
+            "layers": ["linear %d*%d*64" % (height // 4, width // 4), "relu", "deconv 32", "relu", "deconv %d" % channels, "tanh"]
+        },
+        "discriminator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "layers": ["conv 32", "lrelu", "conv 64", "lrelu", "flatten", "linear 1"]
+        },
+        "loss": {
+            "class": "function:hypergan.losses.standard_loss.StandardLoss"
+        },
+        "trainer": {
+            "class": "function:hypergan.trainers.simultaneous_trainer.SimultaneousTrainer",
+            "hooks": [],
+            "optimizer": {"class": "class:torch.optim.Adam", "lr": 1e-4, "betas": [0.0, 0.999]}
+        }
+    }
+
+def timed(fn, count=1):
+    start = time.time()
+    for i in range(count):
+        result = fn()
+    return (time.time() - start) / count * 1000, result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark training on the cpu backend.')
+    parser.add_argument('--config', '-c', type=str, default=None, help='GAN configuration json.  Defaults to a small configurable GAN.')
+    parser.add_argument('--size', '-s', type=str, default='32x32x3', help='Size of your data, widthxheightxchannels.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--steps', '-n', type=int, default=20, help='Number of timed training steps.')
+    parser.add_argument('--threads', '-t', type=int, default=None, help='torch intra-op threads.  Defaults to the torch default.')
+    args = parser.parse_args()
+    GlobalViewer.enabled = False
+    if args.threads is not None:
+        torch.set_num_threads(args.threads)
+
+    width, height, channels = [int(x) for x in args.size.split("x")]
+    if args.config is None:
+        config = default_config(width, height, channels)
+    else:
+        with open(args.config) as f:
+            config = json.load(f)
+    inputs = ImageLoader(hc.Config({"blank": True, "batch_size": args.batch_size, "width": width, "height": height, "channels": channels}), device="cpu")
+    save_file = tempfile.mkdtemp() + "/model.save"
+
+    gan = hg.GAN(config=hc.Config(config), inputs=inputs, device="cpu")
+    trainable_gan = hg.TrainableGAN(gan, save_file=save_file, backend_name="cpu")
+    trainable_gan.step()
+    step_ms, _ = timed(trainable_gan.step, args.steps)
+    sampler = StaticBatchSampler(gan)
+    sample_ms, _ = timed(lambda: trainable_gan.sample(sampler, tempfile.mkdtemp(), save_samples=False))
+    save_ms, _ = timed(trainable_gan.save)
+    load_ms, loaded = timed(trainable_gan.load)
+
+    print("%s batch size %d, %d threads" % (args.size, args.batch_size, torch.get_num_threads()))
+    print("train step  %8.1f ms (%.1f images/sec)" % (step_ms, args.batch_size * 1000 / step_ms))
+    print("sample      %8.1f ms" % sample_ms)
+    print("save        %8.1f ms" % save_ms)
+    print("load        %8.1f ms%s" % (load_ms, "" if loaded else " (failed)"))
+    GlobalViewer.close()
@@ -0,0 +1,87 @@
+"""
+Times `DiffAugment` forward and backward against the meshgrid and gather version it replaced, and augmenting real
+and generated batches separately against one joint call.
+
+    python benchmarks/diff_augment.py
+    python benchmarks/diff_augment.py -s 256 -b 4 --policies color translation,cutout
+"""
+from hypergan.train_hooks.differential_augmentation_train_hook import DiffAugment
+import argparse
+import time
+import torch
+import torch.nn.functional as F
+
+def meshgrid_translation(x, ratio=0.125):
+    shift_x, shift_y = int(x.size(2) * ratio + 0.5), int(x.size(3) * ratio + 0.5)
+    translation_x = torch.randint(-shift_x, shift_x + 1, size=[x.size(0), 1, 1], device=x.device)
+    translation_y = torch.randint(-shift_y, shift_y + 1, size=[x.size(0), 1, 1], device=x.device)
+    grid_batch, grid_x, grid_y = torch.meshgrid(
+        torch.arange(x.size(0), dtype=torch.long, device=x.device),
+        torch.arange(x.size(2), dtype=torch.long, device=x.device),
+        torch.arange(x.size(3), dtype=torch.long, device=x.device),
+        indexing="ij"
+    )
+    grid_x = torch.clamp(grid_x + translation_x + 1, 0, x.size(2) + 1)
+    grid_y = torch.clamp(grid_y + translation_y + 1, 0, x.size(3) + 1)
+    x_pad = F.pad(x, [1, 1, 1, 1, 0, 0, 0, 0])
+    return x_pad.permute(0, 2, 3, 1).contiguous()[grid_batch, grid_x, grid_y].permute(0, 3, 1, 2)
+
+def meshgrid_cutout(x, ratio=0.5):
+    cutout_size = int(x.size(2) * ratio + 0.5), int(x.size(3) * ratio + 0.5)
+    offset_x = torch.randint(0, x.size(2) + (1 - cutout_size[0] % 2), size=[x.size(0), 1, 1], device=x.device)
+    offset_y = torch.randint(0, x.size(3) + (1 - cutout_size[1] % 2), size=[x.size(0), 1, 1], device=x.device)
+    grid_batch, grid_x, grid_y = torch.meshgrid(
+        torch.arange(x.size(0), dtype=torch.long, device=x.device),
+        torch.arange(cutout_size[0], dtype=torch.long, device=x.device),
+        torch.arange(cutout_size[1], dtype=torch.long, device=x.device),
+        indexing="ij"
+    )
+    grid_x = torch.clamp(grid_x + offset_x - cutout_size[0] // 2, min=0, max=x.size(2) - 1)
+    grid_y = torch.clamp(grid_y + offset_y - cutout_size[1] // 2, min=0, max=x.size(3) - 1)
+    mask = torch.ones(x.size(0), x.size(2), x.size(3), dtype=x.dtype, device=x.device)
+    mask[grid_batch, grid_x, grid_y] = 0
+    return x * mask.unsqueeze(1)
+
+def separate_color(x):
+    x = x + (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) - 0.5)
+    x_mean = x.mean(dim=1, keepdim=True)
+    x = (x - x_mean) * (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) * 2) + x_mean
+    x_mean = x.mean(dim=[1, 2, 3], keepdim=True)
+    return (x - x_mean) * (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) + 0.5) + x_mean
+
+PREVIOUS = {'color': separate_color, 'translation': meshgrid_translation, 'cutout': meshgrid_cutout}
+
+def previous(x, policy):
+    for p in policy.split(','):
+        x = PREVIOUS[p](x)
+    return x.contiguous()
+
+def timed(fn, x, g, iterations):
+    for i in range(3):
+        sum([o.sum() for o in fn(x, g)]).backward()
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    start = time.time()
+    for i in range(iterations):
+        sum([o.sum() for o in fn(x, g)]).backward()
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    return (time.time() - start) / iterations * 1000
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark DiffAugment.')
+    parser.add_argument('--size', '-s', type=int, default=128)
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--policies', nargs='*', default=['color', 'translation', 'cutout', 'color,translation,cutout'])
+    parser.add_argument('--iterations', '-i', type=int, default=20)
+    args = parser.parse_args()
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+
+    print("%s, %dx%d, batch size %d real and %d generated, forward and backward" % (device, args.size, args.size, args.batch_size, args.batch_size))
+    for policy in args.policies:
+        x = torch.rand(args.batch_size, 3, args.size, args.size, device=device) * 2 - 1
+        g = (torch.rand(args.batch_size, 3, args.size, args.size, device=device) * 2 - 1).requires_grad_()
+        previous_ms = timed(lambda x, g: [previous(x, policy), previous(g, policy)], x, g, args.iterations)
+        separate_ms = timed(lambda x, g: [DiffAugment(x, policy), DiffAugment(g, policy)], x, g, args.iterations)
+        joint_ms = timed(lambda x, g: [DiffAugment(torch.cat([x, g]), policy)], x, g, args.iterations)
+        print("  %-26s previous %8.2f ms  separate %8.2f ms (%.2fx)  joint %8.2f ms (%.2fx)" % (policy, previous_ms, separate_ms, previous_ms / separate_ms, joint_ms, previous_ms / joint_ms))
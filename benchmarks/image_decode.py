@@ -0,0 +1,56 @@
+"""
+Compares images/sec of UnsupervisedImageFolder with and without JPEG draft decoding.
+
+    python benchmarks/image_decode.py [folder] -s 64x64x3
+
+Without a folder, a set of synthetic 3000x2000 JPEGs is generated in a temporary directory.
+"""
+from PIL import Image
+from hypergan.inputs.image_loader import draft_size, image_transforms
+from hypergan.inputs.unsupervised_image_folder import UnsupervisedImageFolder
+import argparse
+import hyperchamber as hc
+import numpy as np
+import os
+import tempfile
+import time
+import torch
+import torchvision
+
+def synthetic_folder(count, width, height):
+    directory = tempfile.mkdtemp()
+    for i in range(count):
+        pixels = np.random.randint(0, 256, [height // 16, width // 16, 3], dtype=np.uint8)
+        Image.fromarray(pixels).resize((width, height), Image.BICUBIC).save(os.path.join(directory, "%04d.jpg" % i), quality=90)
+    return directory
+
+def run(folder, count):
+    start = time.time()
+    samples = []
+    for i in range(count):
+        [sample] = folder[i % len(folder)]
+        samples.append(sample)
+    return count / (time.time() - start), torch.stack(samples)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark JPEG draft decoding.')
+    parser.add_argument('directory', nargs='?', default=None, help='Folder of images.  Defaults to synthetic 3000x2000 JPEGs.')
+    parser.add_argument('--size', '-s', type=str, default='64x64x3', help='Size of your data, widthxheightxchannels.')
+    parser.add_argument('--resize', action='store_true', help='Use resize instead of crop.')
+    parser.add_argument('--count', '-n', type=int, default=64, help='Number of images to decode.')
+    args = parser.parse_args()
+
+    width, height, channels = [int(x) for x in args.size.split("x")]
+    config = hc.Config({"width": width, "height": height, "channels": channels, "crop": not args.resize, "resize": args.resize})
+    directory = args.directory or synthetic_folder(min(args.count, 16), 3000, 2000)
+    transform = torchvision.transforms.Compose(image_transforms(config) + [torchvision.transforms.PILToTensor()])
+    mode = "RGBA" if channels == 4 else "RGB"
+
+    full = UnsupervisedImageFolder(directory, transform=transform, mode=mode, manifest=False)
+    draft = UnsupervisedImageFolder(directory, transform=transform, mode=mode, manifest=False, draft_size=draft_size(config))
+    full_rate, full_samples = run(full, args.count)
+    draft_rate, draft_samples = run(draft, args.count)
+    difference = (full_samples.float() - draft_samples.float()).abs()
+    print("full decode   %8.1f images/sec" % full_rate)
+    print("draft decode  %8.1f images/sec (%.1fx)" % (draft_rate, draft_rate / full_rate))
+    print("difference    mean %.2f max %d (of 255)" % (difference.mean().item(), difference.max().item()))
@@ -0,0 +1,50 @@
+"""
+Times `ModulatedConv2d` when every sample shares one style, as when sampling a static batch, walking the latent
+space or serving requests that only vary noise.  The grouped convolution over per-sample weights is compared with
+modulating once and running a plain batched convolution.
+
+    python benchmarks/modulated_conv2d.py
+    python benchmarks/modulated_conv2d.py -c 256 -s 32 --batch_sizes 1 8 64
+"""
+from hypergan.modules.modulated_conv2d import ModulatedConv2d
+import argparse
+import time
+import torch
+
+def grouped(layer, input, style):
+    """The per-sample path, even though the styles are shared"""
+    layer.shares_style = lambda style, batch: False
+    try:
+        return layer(input, style)
+    finally:
+        del layer.shares_style
+
+def timed(fn, iterations):
+    with torch.no_grad():
+        fn()
+        start = time.time()
+        for i in range(iterations):
+            fn()
+    return (time.time() - start) / iterations * 1000
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark shared style ModulatedConv2d.')
+    parser.add_argument('--channels', '-c', type=int, default=128)
+    parser.add_argument('--size', '-s', type=int, default=32)
+    parser.add_argument('--style', type=int, default=512, help='Style vector size.')
+    parser.add_argument('--batch_sizes', nargs='*', type=int, default=[1, 8, 64])
+    parser.add_argument('--iterations', '-i', type=int, default=10)
+    args = parser.parse_args()
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+
+    print("%s, %d channels, %dx%d input, forward without gradients" % (device, args.channels, args.size, args.size))
+    for method in ["conv", "upsample", "downsample"]:
+        layer = ModulatedConv2d(args.channels, args.channels, 3, args.style, upsample=method == "upsample", downsample=method == "downsample").to(device)
+        for batch_size in args.batch_sizes:
+            x = torch.randn(batch_size, args.channels, args.size, args.size, device=device)
+            style = torch.randn(1, args.style, device=device).expand(batch_size, -1)
+            with torch.no_grad():
+                difference = (grouped(layer, x, style) - layer(x, style)).abs().max().item()
+            grouped_ms = timed(lambda: grouped(layer, x, style), args.iterations)
+            shared_ms = timed(lambda: layer(x, style), args.iterations)
+            print("  %-10s batch %3d  grouped %8.2f ms  shared %8.2f ms (%.2fx)  max difference %.2g" % (method, batch_size, grouped_ms, shared_ms, grouped_ms / shared_ms, difference))
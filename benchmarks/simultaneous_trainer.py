@@ -0,0 +1,74 @@
+"""
+Times a `SimultaneousTrainer` step with two `backward` passes that toggle `requires_grad` against `single_graph`,
+and reports the peak memory of each.
+
+    python benchmarks/simultaneous_trainer.py
+    python benchmarks/simultaneous_trainer.py -s 128x128x3 -b 4 --config my_config.json
+
+Training data is a blank input so only the GAN is measured.  Each mode runs in its own process so that the peak
+resident memory on the cpu backend is not shared between them.
+"""
+from hypergan.inputs.image_loader import ImageLoader
+from hypergan.viewer import GlobalViewer
+import argparse
+import hyperchamber as hc
+import hypergan as hg
+import json
+import resource
+import subprocess
+import sys
+import time
+import torch
+
+def run(args, single_graph):
+    width, height, channels = [int(x) for x in args.size.split("x")]
+    if args.config is None:
+        config = hg.Configuration.load("default.json", verbose=False, prepackaged=True)
+    else:
+        with open(args.config) as f:
+            config = json.load(f)
+    config["trainer"]["single_graph"] = single_graph
+    inputs = ImageLoader(hc.Config({"blank": True, "batch_size": args.batch_size, "width": width, "height": height, "channels": channels}), device=args.device)
+    gan = hg.GAN(config=hc.Config(config), inputs=inputs, device=args.device)
+    trainable_gan = hg.TrainableGAN(gan, backend_name=args.device)
+    trainable_gan.step()
+    if args.device != "cpu":
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+    start = time.time()
+    for i in range(args.steps):
+        trainable_gan.step()
+    if args.device != "cpu":
+        torch.cuda.synchronize()
+        peak = torch.cuda.max_memory_allocated() / 2**20
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return (time.time() - start) / args.steps * 1000, peak
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark SimultaneousTrainer single_graph.')
+    parser.add_argument('--config', '-c', type=str, default=None, help='GAN configuration json.  Defaults to default.json.')
+    parser.add_argument('--size', '-s', type=str, default='64x64x3', help='Size of your data, widthxheightxchannels.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--steps', '-n', type=int, default=10, help='Number of timed training steps.')
+    parser.add_argument('--single_graph', type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    GlobalViewer.enabled = False
+
+    if args.single_graph is not None:
+        print("%f %f" % run(args, args.single_graph == 1))
+        GlobalViewer.close()
+        sys.exit(0)
+
+    results = {}
+    for single_graph in [0, 1]:
+        output = subprocess.check_output([sys.executable] + sys.argv + ["--single_graph", str(single_graph)], text=True)
+        results[single_graph] = [float(x) for x in output.strip().split("\n")[-1].split()]
+
+    memory = "peak allocated" if args.device != "cpu" else "peak resident"
+    print("%s, %s batch size %d, %s" % (args.device, args.size, args.batch_size, args.config or "default.json"))
+    for single_graph, name in [(0, "two backward"), (1, "single_graph")]:
+        step_ms, peak = results[single_graph]
+        print("  %-14s step %8.1f ms (%.2fx)  %s %8.1f MB" % (name, step_ms, results[0][0] / step_ms, memory, peak))
+    GlobalViewer.close()
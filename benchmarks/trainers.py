@@ -0,0 +1,67 @@
+"""
+Counts the forward passes and times a training step for the alternating trainers.
+
+    python benchmarks/trainers.py
+    python benchmarks/trainers.py -s 64x64x3 -b 8 --trainers balanced_trainer
+
+Training data is a blank input so only the GAN is measured.  The generator and discriminator are the small
+configurable ones from `cpu_train.py`.
+"""
+from hypergan.inputs.image_loader import ImageLoader
+from hypergan.viewer import GlobalViewer
+import argparse
+import hyperchamber as hc
+import hypergan as hg
+import time
+import torch
+
+from cpu_train import default_config
+
+TRAINERS = {
+    "alternating_trainer": "function:hypergan.trainers.alternating_trainer.AlternatingTrainer",
+    "balanced_trainer": "function:hypergan.trainers.balanced_trainer.BalancedTrainer",
+    "accumulate_gradient_trainer": "function:hypergan.trainers.accumulate_gradient_trainer.AccumulateGradientTrainer"
+}
+
+def run(args, trainer, device):
+    width, height, channels = [int(x) for x in args.size.split("x")]
+    config = default_config(width, height, channels)
+    optimizer = config["trainer"]["optimizer"]
+    config["trainer"] = {"class": TRAINERS[trainer], "hooks": [], "d_optimizer": optimizer, "g_optimizer": optimizer}
+    inputs = ImageLoader(hc.Config({"blank": True, "batch_size": args.batch_size, "width": width, "height": height, "channels": channels}), device=device)
+    gan = hg.GAN(config=hc.Config(config), inputs=inputs, device=device)
+    trainable_gan = hg.TrainableGAN(gan, backend_name="cpu" if device == "cpu" else "single-gpu")
+
+    forward_pass = gan.forward_pass
+    forwards = [0]
+    def counted_forward_pass():
+        forwards[0] += 1
+        return forward_pass()
+    gan.forward_pass = counted_forward_pass
+
+    trainable_gan.step()
+    forwards[0] = 0
+    if device != "cpu":
+        torch.cuda.synchronize()
+    start = time.time()
+    for i in range(args.steps):
+        trainable_gan.step()
+    if device != "cpu":
+        torch.cuda.synchronize()
+    return (time.time() - start) / args.steps * 1000, forwards[0] / args.steps
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark forward passes per step of the alternating trainers.')
+    parser.add_argument('--size', '-s', type=str, default='32x32x3', help='Size of your data, widthxheightxchannels.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--steps', '-n', type=int, default=20, help='Number of timed training steps.')
+    parser.add_argument('--trainers', nargs='*', default=list(TRAINERS.keys()))
+    args = parser.parse_args()
+    device = "cuda:0" if torch.cuda.is_available() else "cpu"
+    GlobalViewer.enabled = False
+
+    print("%s, %s batch size %d" % (device, args.size, args.batch_size))
+    for trainer in args.trainers:
+        step_ms, forwards = run(args, trainer, device)
+        print("  %-28s step %8.1f ms  %.2f forward passes per step" % (trainer, step_ms, forwards))
+    GlobalViewer.close()
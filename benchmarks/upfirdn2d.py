@@ -0,0 +1,61 @@
+"""
+Compares the PyTorch `upfirdn2d` with the zero-insertion reference `upfirdn2d_native` and, when CUDA and the
+extension are available, the compiled op.  Forward and backward time and the largest difference are printed for
+the blurs `modulated_conv2d` uses.
+
+    python benchmarks/upfirdn2d.py
+    python benchmarks/upfirdn2d.py -b 4 -c 128 --sizes 64 256
+"""
+from hypergan.modules import modulated_conv2d
+from hypergan.modules.modulated_conv2d import UpFirDn2d, make_kernel, upfirdn2d_native, upfirdn2d_pytorch
+import argparse
+import time
+import torch
+
+# (label, up, down, pad) of the blurs in ModulatedConv2d with a 3x3 conv and the [1, 3, 3, 1] kernel
+BLURS = [("upsample", 2, 1, (2, 1)), ("downsample", 1, 1, (2, 2)), ("blur", 1, 1, (1, 1)), ("up and down", 2, 2, (1, 1))]
+
+def native(input, kernel, up, down, pad):
+    batch, channels, height, width = input.shape
+    out = upfirdn2d_native(input.reshape(-1, height, width, 1), kernel, up, up, down, down, pad[0], pad[1], pad[0], pad[1])
+    return out.reshape(batch, channels, out.shape[1], out.shape[2])
+
+def compiled(input, kernel, up, down, pad):
+    return UpFirDn2d.apply(input, kernel, (up, up), (down, down), (pad[0], pad[1], pad[0], pad[1]))
+
+def timed(fn, input, iterations):
+    for i in range(3):
+        fn(input).sum().backward()
+    if input.is_cuda:
+        torch.cuda.synchronize()
+    start = time.time()
+    for i in range(iterations):
+        fn(input).sum().backward()
+    if input.is_cuda:
+        torch.cuda.synchronize()
+    return (time.time() - start) / iterations * 1000
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark upfirdn2d implementations.')
+    parser.add_argument('--batch_size', '-b', type=int, default=8)
+    parser.add_argument('--channels', '-c', type=int, default=64)
+    parser.add_argument('--sizes', nargs='*', type=int, default=[16, 64, 128])
+    parser.add_argument('--iterations', '-i', type=int, default=10)
+    args = parser.parse_args()
+    devices = ["cpu"] + (["cuda:0"] if torch.cuda.is_available() else [])
+
+    for device in devices:
+        implementations = [("native", native), ("pytorch", upfirdn2d_pytorch)]
+        if device != "cpu" and modulated_conv2d.upfirdn2d_op() is not None:
+            implementations = [("compiled", compiled)] + implementations
+        kernel = make_kernel([1, 3, 3, 1]).to(device)
+        print("%s, batch size %d, %d channels" % (device, args.batch_size, args.channels))
+        for size in args.sizes:
+            x = torch.randn(args.batch_size, args.channels, size, size, device=device, requires_grad=True)
+            for label, up, down, pad in BLURS:
+                blur_kernel = kernel * (up ** 2)
+                fns = [(name, lambda x, fn=fn: fn(x, blur_kernel, up, down, pad)) for name, fn in implementations]
+                expected = fns[0][1](x)
+                difference = max([(fn(x) - expected).abs().max().item() for name, fn in fns[1:]])
+                times = "  ".join(["%s %8.2f ms" % (name, timed(fn, x, args.iterations)) for name, fn in fns])
+                print("  %3dx%-3d %-12s %s  max difference %.2g" % (size, size, label, times, difference))
@@ -37,7 +37,7 @@ class Custom2DInputDistribution:
         self.x = torch.Tensor(self.config.batch_size, 2).cuda()
         self.y = torch.Tensor(self.config.batch_size, 2).cuda()
 
-    def to(self, device):
+    def to(self, device, rank=0, world_size=1):
         self.x = self.x.to(device)
         self.y = self.y.to(device)
         return self
@@ -90,7 +90,7 @@ class TextInput:
         plt.xlabel("Time")
         plt.savefig(filename)
 
-    def to(self, device):
+    def to(self, device, rank=0, world_size=1):
         return TextInput(self.config, self._batch_size, self.filename, self.length, self.one_hot, device=device)
 
     def next(self, index=0):
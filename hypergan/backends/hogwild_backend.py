@@ -41,7 +41,7 @@ class HogwildBackend(Backend):
         num_processes=4
         for device in range(num_processes):
             done_event = mp.Event()
-            inputs = self.trainable_gan.gan.inputs.to(self.trainable_gan.gan.device)
+            inputs = self.trainable_gan.gan.inputs.to(self.trainable_gan.gan.device, rank=device, world_size=num_processes)
             p = mp.Process(target=train, args=(device, trainable_gan.gan, trainable_gan.save_file, inputs, done_event))
             p.start()
             self.processes.append(p)
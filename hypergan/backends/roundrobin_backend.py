@@ -65,12 +65,12 @@ class RoundrobinBackend(Backend):
         self.save_event = save_event
         self.save_complete_event = save_complete_event
 
-        for device in devices:
+        for rank, device in enumerate(devices):
             loaded_event = mp.Event()
             report_weights_event = mp.Event()
             set_weights_queue = mp.Queue()
             report_weights_queue = mp.Queue()
-            inputs = self.trainable_gan.gan.inputs.to(device)
+            inputs = self.trainable_gan.gan.inputs.to(device, rank=rank, world_size=len(devices))
             p = mp.Process(target=train, args=(device, head_device, trainable_gan.gan, inputs, loaded_event, report_weights_queue, set_weights_queue, report_weights_event, save_event, save_complete_event, self.trainable_gan.save_file))
             p.start()
             self.processes.append(p)
@@ -82,6 +82,12 @@ class CLI:
     def create_path(self, filename):
         return os.makedirs(os.path.expanduser(os.path.dirname(filename)), exist_ok=True)
 
+    def device(self):
+        """The device the GAN is created on.  The cpu backend always uses the CPU, otherwise the parameter server device or the default device."""
+        if self.args.backend == "cpu":
+            return "cpu"
+        return self.args.parameter_server_device
+
     def create_input(self, blank=False, rank=None):
         klass = GANComponent.lookup_function(None, self.input_config['class'])
         self.input_config["blank"]=blank
@@ -147,7 +153,8 @@ class CLI:
             fl = fcntl.fcntl(fd, fcntl.F_GETFL)
             fcntl.fcntl(fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
 
-        self.gan = hg.GAN(config=self.gan_config, inputs=self.create_input(), device=self.args.parameter_server_device)
+        self.gan = hg.GAN(config=self.gan_config, inputs=self.create_input(), device=self.device())
+        hg.parser.Parser.save_cache()
         self.gan.cli = self #TODO remove this link
         self.gan.inputs.next()
         self.lazy_create()
@@ -211,18 +218,49 @@ class CLI:
 
         return
 
+    def pack(self):
+        from hypergan.inputs.packed_image_loader import pack
+        directories = self.input_config.directories or [self.input_config.directory]
+        if self.args.output and len(directories) > 1:
+            raise ValidationException("--output can only be used when packing a single directory")
+        for directory in directories:
+            output = self.args.output or directory.rstrip("/") + ".packed"
+            print("[hypergan] Packing", directory, "into", output)
+            pack(self.input_config, directory, output, shard_size=self.args.shard_size or 10000)
+        print("[hypergan] Done.  Train on the packed dataset with `hypergan train " + output + "`")
+
+    def check(self):
+        size = [self.input_config.width, self.input_config.height, self.input_config.channels, self.input_config.batch_size]
+        if self.args.cost:
+            from hypergan.cost_model import estimate, format_costs
+            rows, totals, errors = estimate(self.gan_config, *size)
+            print(format_costs(rows, totals, errors))
+        else:
+            from hypergan.config_check import check_config, format_report
+            rows, errors = check_config(self.gan_config, *size)
+            print(format_report(rows, errors))
+        if len(errors) > 0:
+            raise ValidationException("[hypergan] " + self.config_name + " failed the check")
+        print("[hypergan] " + self.config_name + " is valid")
+
     def run(self):
         if self.method == 'train':
             self.train()
         elif self.method == 'build':
-            self.gan = hg.GAN(config=self.gan_config, inputs=self.create_input(blank=True))
+            self.gan = hg.GAN(config=self.gan_config, inputs=self.create_input(blank=True), device=self.device())
+            hg.parser.Parser.save_cache()
             if not self.gan.load(self.save_file):
                 raise ValidationException("Could not load model: "+ self.save_file)
             self.build()
         elif self.method == 'new':
             self.new()
+        elif self.method == 'pack':
+            self.pack()
+        elif self.method == 'check':
+            self.check()
         elif self.method == 'sample':
-            self.gan = hg.GAN(config=self.gan_config, inputs=self.create_input(blank=False))
+            self.gan = hg.GAN(config=self.gan_config, inputs=self.create_input(blank=False), device=self.device())
+            hg.parser.Parser.save_cache()
             if not self.gan.load(self.save_file):
                 print("Initializing new model")
 
@@ -0,0 +1,146 @@
+"""
+Checks that a GAN config builds and that its layer shapes line up, without allocating weights.
+
+Components are constructed on PyTorch's `meta` device, so parameters and activations only carry
+their shapes.  Used by `hypergan check <config>`.
+"""
+from hypergan.gan_component import ValidationException, GANComponent
+import hyperchamber as hc
+import torch
+
+class CheckGAN:
+    """
+    Stand in for a GAN while checking a config.  Only the latent is built with storage, it is small
+    and distributions sample on construction.
+    """
+    def __init__(self, config, width, height, channels, batch_size):
+        self.config = hc.Config(config)
+        self._width = width
+        self._height = height
+        self._channels = channels
+        self._batch_size = batch_size
+        self.device = "cpu"
+        self.steps = torch.zeros([1])
+        self.named_layers = {}
+
+    def batch_size(self):
+        return self._batch_size
+
+    def channels(self):
+        return self._channels
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def add_metric(self, name, value):
+        pass
+
+    def create_component(self, name, meta=True, **kw_args):
+        defn = hc.Config(self.config[name])
+        if defn['class'] == None:
+            raise ValidationException("Component definition is missing '" + name + "'")
+        klass = GANComponent.lookup_function(None, defn['class'])
+        if not meta:
+            return klass(self, defn, **kw_args)
+        defn = hc.Config({**defn, "device": "meta"})
+        with torch.device("meta"):
+            return klass(self, defn, **kw_args)
+
+def layer_row(name, layer_defn, expected, output, module):
+    shape = list(output.shape[1:])
+    return {
+        "component": name,
+        "layer": layer_defn,
+        "expected": list(expected.dims) if expected is not None else None,
+        "shape": shape,
+        "parameters": sum([p.numel() for p in module.parameters()]) if module is not None else 0,
+        "activation_bytes": output.numel() * output.element_size()
+    }
+
+def trace(name, component, input, measure=None):
+    """
+    Runs `component` on a meta `input` one layer at a time, returning a row per layer.
+
+    `measure(call, module, input, context)` can replace running each layer, returning the output and
+    a dict of extra columns for the row.
+    """
+    if hasattr(component, "plan"):
+        layers = [(parsed.layer_defn, call, module, expected) for call, module, parsed, expected in zip(component.plan, component.net, component.parsed_layers, component.layer_shapes)]
+    else:
+        layers = [(component.__class__.__name__, lambda module, input, context: module(input), component, None)]
+    if getattr(component, "input_is_latent", False):
+        # the latent layer returns the latent `forward` was given
+        component.latent_input = input
+    rows = []
+    context = {}
+    for layer_defn, call, module, expected in layers:
+        try:
+            if measure is None:
+                output, columns = call(module, input, context), {}
+            else:
+                output, columns = measure(call, module, input, context)
+        except Exception as e:
+            raise ValidationException("Error on " + layer_defn + " - input size " + ",".join([str(x) for x in input.shape]) + ": " + str(e)) from e
+        rows.append({**layer_row(name, layer_defn, expected, output, module), **columns})
+        input = output
+    return rows
+
+def check_config(config, width, height, channels, batch_size, measure=None):
+    """
+    Builds the latent, generator and discriminator of `config` on the meta device.  `measure` is
+    passed to `trace`, see `hypergan.cost_model`.
+
+    Returns `(rows, errors)`.  `rows` has one entry per layer with the size tracked while building
+    (`expected`), the traced output `shape`, the parameter count and the activation bytes for the
+    whole batch.  `errors` lists every problem found, an empty list means the config is usable.
+    """
+    gan = CheckGAN(config, width, height, channels, batch_size)
+    rows = []
+    errors = []
+    stage = "latent"
+    try:
+        latent = gan.create_component("latent", meta=False)
+        gan.latent = latent
+        latent.z = torch.empty(latent.z.shape, device="meta")
+        stage = "generator"
+        generator = gan.create_component("generator", input=latent)
+        generator_rows = trace("generator", generator, torch.empty([batch_size, latent.current_input_size], device="meta"), measure)
+        rows += generator_rows
+        if generator_rows[-1]["shape"] != [channels, height, width]:
+            errors.append("generator: output size " + str(generator_rows[-1]["shape"]) + " does not match the input size " + str([channels, height, width]))
+        stage = "discriminator"
+        discriminator = gan.create_component("discriminator")
+        rows += trace("discriminator", discriminator, torch.empty([batch_size, channels, height, width], device="meta"), measure)
+    except ValidationException as e:
+        errors.append(stage + ": " + str(e))
+    except Exception as e:
+        errors.append(stage + ": " + e.__class__.__name__ + " " + str(e))
+
+    for row in rows:
+        expected = [d for d in (row["expected"] or []) if d != 1]
+        shape = [d for d in row["shape"] if d != 1]
+        if row["expected"] is not None and expected != shape:
+            errors.append(row["component"] + ": " + row["layer"] + " tracked output size " + str(row["expected"]) + " but produces " + str(row["shape"]))
+    return rows, errors
+
+def format_report(rows, errors):
+    lines = ["%-14s %-48s %-20s %12s %12s" % ("component", "layer", "output", "parameters", "activations")]
+    for row in rows:
+        lines.append("%-14s %-48s %-20s %12d %12s" % (row["component"], row["layer"][:48], "x".join([str(d) for d in row["shape"]]), row["parameters"], format_bytes(row["activation_bytes"])))
+    for component in ["generator", "discriminator"]:
+        component_rows = [row for row in rows if row["component"] == component]
+        if len(component_rows) > 0:
+            lines.append("%s: %d parameters, %s of activations" % (component, sum([r["parameters"] for r in component_rows]), format_bytes(sum([r["activation_bytes"] for r in component_rows]))))
+    for error in errors:
+        lines.append("Error: " + error)
+    return "\n".join(lines)
+
+def format_bytes(count):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if count < 1024:
+            return "%.1f%s" % (count, unit)
+        count /= 1024
+    return "%.1fTB" % count
@@ -11,6 +11,7 @@ import pyparsing
 import hypergan
 import torch
 import torch.nn as nn
+from torch.utils.checkpoint import checkpoint
 
 from .gan_component import GANComponent
 from hypergan.gan_component import ValidationException
@@ -60,6 +61,8 @@ class ConfigurableComponent(GANComponent):
             self.is_latent = True
         else:
             self.is_latent = False
+        self.input_is_latent = input_is_latent or self.is_latent
+        self.latent_input = None
         self._latent_parameters = []
         self.layer_ops = {**self.activations(),
             **ConfigurableComponent.custom_layers,
@@ -152,13 +155,19 @@ class ConfigurableComponent(GANComponent):
             gan.named_layers = {}
         self.subnets = hc.Config(hc.Config(config).subnets or {})
         GANComponent.__init__(self, gan, config)
-        self.device = self.config.device or "cuda:0"
-        self.const_two = torch.Tensor([2.0]).float()[0].cuda()
-        self.const_one = torch.Tensor([1.0]).float()[0].cuda()
+        self.device = self.config.device or getattr(gan, "device", None) or "cpu"
 
     def required(self):
         return "layers".split()
 
+    def validate(self):
+        errors = GANComponent.validate(self)
+        if self.config.memory_format not in [None, "contiguous", "channels_last"]:
+            errors.append("`memory_format` must be contiguous or channels_last")
+        if not isinstance(self.config.checkpoint or [], (str, list)):
+            errors.append("`checkpoint` must be a layer name or a list of layer names")
+        return errors
+
     def layer(self, name):
         if name in self.gan.named_layers:
             return self.gan.named_layers[name] 
@@ -172,6 +181,10 @@ class ConfigurableComponent(GANComponent):
             self.nn_layers.append(net)
 
         self.net = nn.ModuleList(self.nn_layers)
+        self.channels_last = self.config.memory_format == "channels_last"
+        if self.channels_last:
+            self.net.to(memory_format=torch.channels_last)
+        self.compile_plan()
 
     def create_parsed_layer(self, layer_defn):
         config = self.config
@@ -183,10 +196,8 @@ class ConfigurableComponent(GANComponent):
     def parse_layer(self, layer_defn):
         print("Parsing layer:", layer_defn)
         parsed = self.parser.parse_string(layer_defn)
-        parsed.parsed_options = hc.Config(parsed.options)
-        parsed.layer_defn = layer_defn
         print("Parsed layer:", parsed.to_list())
-        layer = self.build_layer(parsed.layer_name, parsed.args, parsed.parsed_options)
+        layer = self.build_layer(parsed.layer_name, list(parsed.args), parsed.parsed_options)
         return parsed, layer
 
     def build_layer(self, op, args, options):
@@ -254,7 +265,7 @@ class ConfigurableComponent(GANComponent):
         return result
 
     def get_device(self):
-        return torch.device(self.device or "cuda:0")
+        return torch.device(self.device or "cpu")
 
     def get_same_padding(self, input_rows, filter_rows, stride, dilation):
         out_rows = (input_rows + stride - 1) // stride
@@ -393,7 +404,7 @@ class ConfigurableComponent(GANComponent):
         if options.input_channels:
             input_channels = options.input_channels
 
-        result = ModulatedConv2d(input_channels, channels, filter, self.layer_output_sizes['w'].size(), upsample=upsample, demodulate=demodulate, downsample=downsample, lr_mul=lr_mul)
+        result = ModulatedConv2d(input_channels, channels, filter, self.layer_output_sizes['w'].size(), upsample=upsample, demodulate=demodulate, downsample=downsample, lr_mul=lr_mul, shared_style=options.shared_style == True)
 
         if upsample:
             self.current_size = LayerShape(channels, self.current_size.height * 2, self.current_size.width * 2)
@@ -643,7 +654,7 @@ class ConfigurableComponent(GANComponent):
         return layer
 
     def layer_attention(self, net, args, options):
-        layer = Attention(self.current_size.channels)
+        layer = Attention(self.current_size.channels, efficient_size=options.efficient_size or 256, chunk_size=options.chunk_size or 1024)
         self.nn_init(layer.v, options.initializer)
         self.nn_init(layer.h, options.initializer)
         self.nn_init(layer.g, options.initializer)
@@ -658,7 +669,7 @@ class ConfigurableComponent(GANComponent):
         return nn.LayerNorm(self.current_size.dims, elementwise_affine=affine)
 
     def layer_learned_noise(self, net, args, options):
-        return LearnedNoise(*([self.gan.batch_size(), *self.current_size.dims]))
+        return LearnedNoise()
 
     def layer_adaptive_instance_norm(self, net, args, options):
         return AdaptiveInstanceNorm(self.layer_output_sizes['w'].size(), self.current_size.channels, equal_linear=options.equal_linear)
@@ -673,9 +684,10 @@ class ConfigurableComponent(GANComponent):
     def nn_init(self, layer, initializer_option):
         if initializer_option is None:
             return
-        if type(initializer_option) == pyparsing.ParseResults and type(initializer_option[0]) == hypergan.parser.Pattern:
-            args = [initializer_option[0].layer_name] + initializer_option[0].args
-            options = hc.Config(initializer_option[0].options)
+        initializer = hypergan.parser.nested_pattern(initializer_option)
+        if initializer is not None:
+            args = [initializer.layer_name] + list(initializer.args)
+            options = initializer.parsed_options
         else:
             args = [initializer_option]
             options = hc.Config({})
@@ -726,48 +738,117 @@ class ConfigurableComponent(GANComponent):
         return NoOp()
 
 
+    def compile_plan(self):
+        """
+        Resolves every parsed layer into a `call(module, input, context)` function so `forward` does not
+        look at layer names or options on each step.  The plan is rebuilt when the component is unpickled.
+        """
+        self.plan = [self.compile_layer(module, parsed) for module, parsed in zip(self.net, self.parsed_layers)]
+        self.validated = False
+
+    def compile_layer(self, module, parsed):
+        options = parsed.parsed_options
+        args = parsed.args
+        layer_name = parsed.layer_name
+        if isinstance(module, hg.Layer):
+            call = lambda module, input, context: module(input, context)
+        elif layer_name in ["adaptive_instance_norm", "ez_norm", "modulated_conv2d"]:
+            call = lambda module, input, context: module(input, context['w'])
+        elif layer_name == "split":
+            size, index, dim = args[0], args[1], options.dim or -1
+            call = lambda module, input, context: torch.split(input, size, dim)[index]
+        elif layer_name == "latent":
+            def call(module, input, context, component=self):
+                if component.input_is_latent:
+                    return component.latent_input
+                latent = component.gan.latent
+                z = latent.z
+                if z.shape[0] != input.shape[0]:
+                    # running at another batch size than the latent was sampled at, such as one sample at a time.
+                    # the training latent is restored so inference does not change what the trainer sees
+                    saved = z, getattr(latent, "instance", None)
+                    latent.next(input.shape[0])
+                    z = latent.z
+                    latent.z, latent.instance = saved
+                return z
+        elif layer_name == "pretrained":
+            call = imagenet_normalized(torch.as_tensor([0.485, 0.456, 0.406]), torch.as_tensor([0.229, 0.224, 0.225]))
+        else:
+            call = lambda module, input, context: module(input)
+
+        if getattr(self, "channels_last", False) and layer_name in ["linear", "reshape"]:
+            def call(module, input, context, call=call):
+                output = call(module, input, context)
+                if output.dim() == 4:
+                    return output.contiguous(memory_format=torch.channels_last)
+                return output
+
+        if self.checkpointed(layer_name, options):
+            def call(module, input, context, call=call):
+                if not torch.is_grad_enabled():
+                    return call(module, input, context)
+                # tensors read from `context` are captured by the non-reentrant checkpoint, so named layers and
+                # double backward through the recomputed layer keep working
+                return checkpoint(lambda input: call(module, input, context), input, use_reentrant=False)
+
+        if options.name is not None:
+            def named(module, input, context, call=call, name=options.name):
+                output = call(module, input, context)
+                context[name] = output
+                return output
+            return named
+        return call
+
+    def checkpointed(self, layer_name, options):
+        """
+        True when the layer's activations are recomputed during backward instead of stored.  Set per layer with
+        `checkpoint=true` or for every layer of a type with the component option `"checkpoint": ["resizable_stack"]`.
+        """
+        if layer_name == "latent":
+            return False
+        if options.checkpoint is not None:
+            return options.checkpoint == True
+        policy = self.config.checkpoint or []
+        if isinstance(policy, str):
+            policy = [policy]
+        return layer_name in policy
+
     def forward(self, input, context={}):
-        if self.get_device().index != input.device.index:
-            input = input.to(self.get_device())
-        for module, parsed, layer_shape in zip(self.net, self.parsed_layers, self.layer_shapes):
+        device = self.get_device()
+        if input.device.type != device.type or (device.index is not None and input.device.index != device.index):
+            input = input.to(device)
+        if self.channels_last and input.dim() == 4:
+            input = input.contiguous(memory_format=torch.channels_last)
+        if self.input_is_latent:
+            self.latent_input = input
+        if not self.validated:
+            return self.forward_validate(input, context)
+        i = 0
+        try:
+            for i, (call, module) in enumerate(zip(self.plan, self.net)):
+                input = call(module, input, context)
+        except Exception as e:
+            raise ValidationException("Error on " + self.parsed_layers[i].layer_defn + " - input size " + ",".join([str(x) for x in input.shape])) from e
+        self.sample = input
+        return input
+
+    def forward_validate(self, input, context={}):
+        """
+        Runs the plan one layer at a time, comparing each output with the size computed when the layer was built.
+        Size tracking is approximate for some layers, so mismatches are reported rather than raised.
+        """
+        for call, module, parsed, layer_shape in zip(self.plan, self.net, self.parsed_layers, self.layer_shapes):
             try:
-                options = parsed.parsed_options
-                args = parsed.args
-                layer_name = parsed.layer_name
-                name = options.name
-                if isinstance(module, hg.Layer):
-                    input = module(input, context)
-                elif layer_name == "adaptive_instance_norm":
-                    input = module(input, context['w'])
-                elif layer_name == "ez_norm":
-                    input = module(input, context['w'])
-                elif layer_name == "split":
-                    input = torch.split(input, args[0], options.dim or -1)[args[1]]
-                elif layer_name == "latent":
-                    input = self.gan.latent.z#sample()
-                elif layer_name == "modulated_conv2d":
-                    input = module(input, context['w'])
-                elif layer_name == "pretrained":
-                    in_zero_one = (input + self.const_one) / self.const_two
-                    mean = torch.as_tensor([0.485, 0.456, 0.406], device='cuda:0').view(1, 3, 1, 1)
-                    std = torch.as_tensor([0.229, 0.224, 0.225], device='cuda:0').view(1, 3, 1, 1)
-
-                    input = module(input.clone().sub_(mean).div_(std))
-                else:
-                    input = module(input)
-                if self.gan.steps == 0:
-                    size = LayerShape(*list(input.shape[1:]))
-                    if size.squeeze_dims() != layer_shape.squeeze_dims():
-                        print("Error: Size error on", layer_name)
-                        print("Error: Expected output size", layer_shape.dims)
-                        print("Error: Actual output size", size.dims)
-                        raise "Layer size error, cannot continue"
-                    else:
-                        pass
-                if name is not None:
-                    context[name] = input
-            except:
-                raise ValidationException("Error on " + parsed.layer_defn + " - input size " + ",".join([str(x) for x in input.shape]))
+                output = call(module, input, context)
+            except Exception as e:
+                raise ValidationException("Error on " + parsed.layer_defn + " - input size " + ",".join([str(x) for x in input.shape])) from e
+            size = LayerShape(*list(output.shape[1:]))
+            if size.squeeze_dims() != layer_shape.squeeze_dims():
+                print("Warning: Size mismatch on", parsed.layer_defn)
+                print("Warning: Expected output size", layer_shape.dims)
+                print("Warning: Actual output size", size.dims)
+            input = output
+        self.validated = True
         self.sample = input
         return input
 
@@ -784,10 +865,25 @@ class ConfigurableComponent(GANComponent):
     def __getstate__(self):
         obj = dict(self.__dict__)
         del obj["parser"]
+        obj.pop("plan", None)
+        obj["latent_input"] = None
 
         return obj
 
     def __setstate__(self, d):
         self.__dict__ = d
+        self.__dict__.setdefault("input_is_latent", False)
+        self.__dict__.setdefault("channels_last", False)
         self.parser = hypergan.parser.Parser()
-
+        if hasattr(self, "net"):
+            self.compile_plan()
+
+def imagenet_normalized(mean, std):
+    """Returns a plan call that normalizes input with `mean` and `std` before a pretrained torchvision network"""
+    statistics = {}
+    def call(module, input, context):
+        if input.device not in statistics:
+            statistics[input.device] = (mean.to(input.device).view(1, -1, 1, 1), std.to(input.device).view(1, -1, 1, 1))
+        mean_d, std_d = statistics[input.device]
+        return module((input - mean_d) / std_d)
+    return call
@@ -0,0 +1,125 @@
+"""
+Estimates what a config costs to train at a given size and batch size, without allocating weights.
+
+Each layer of the generator and discriminator is run on the meta device (see `hypergan.config_check`)
+with its FLOPs counted by `torch.utils.flop_counter`, forward and backward, and the tensors autograd
+saves for backward recorded.  This covers every layer that runs through torch operators, including
+`conv2d`, `deconv`, `linear`, `multi_head_attention`, `efficient_attention`, `resizable_stack` and
+`modulated_conv2d`.
+
+Per step totals assume one generator pass and two discriminator passes (real and fake), with both
+discriminator graphs kept alive until backward.
+"""
+from hypergan.config_check import check_config, format_bytes
+from torch.utils.flop_counter import FlopCounterMode
+import torch
+
+# Tensors of parameter size kept by each optimizer, matched on the class name in the config
+OPTIMIZER_STATES = {
+    "adadelta": 2,
+    "adagrad": 1,
+    "adam": 2,
+    "adamax": 2,
+    "adamirror": 2,
+    "adamw": 2,
+    "rmsprop": 1,
+    "sgd": 0
+}
+
+class Measure:
+    """Runs layers for `trace`, recording FLOPs and the activations saved for backward"""
+    def __init__(self):
+        self.saved = {}
+
+    def __call__(self, call, module, input, context):
+        if input.is_floating_point() and not input.requires_grad:
+            input.requires_grad_()
+        saved = []
+        def pack(tensor):
+            saved.append(tensor)
+            return tensor
+        with FlopCounterMode(display=False) as forward_counter, torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+            output = call(module, input, context)
+
+        parameters = [p for p in module.parameters() if p.requires_grad]
+        parameter_ids = set([id(p) for p in module.parameters()])
+        backward_flops = 0
+        if output.requires_grad:
+            inputs = parameters + ([input] if input.requires_grad else [])
+            with FlopCounterMode(display=False) as backward_counter:
+                torch.autograd.grad(output, inputs, torch.empty_like(output), retain_graph=True, allow_unused=True)
+            backward_flops = backward_counter.get_total_flops()
+
+        saved_bytes = 0
+        for tensor in saved:
+            if id(tensor) in parameter_ids or id(tensor._base) in parameter_ids or id(tensor) in self.saved:
+                continue
+            self.saved[id(tensor)] = tensor
+            saved_bytes += tensor.numel() * tensor.element_size()
+        return output, {
+            "forward_flops": forward_counter.get_total_flops(),
+            "backward_flops": backward_flops,
+            "parameter_bytes": sum([p.numel() * p.element_size() for p in module.parameters()]),
+            "saved_bytes": saved_bytes
+        }
+
+def optimizer_states(config):
+    """Returns the number of parameter sized tensors the configured optimizer keeps"""
+    trainer = config.get("trainer") or {}
+    optimizer = trainer.get("optimizer") or trainer.get("d_optimizer") or {}
+    name = str(optimizer.get("class") or "adam").split(".")[-1].lower()
+    states = OPTIMIZER_STATES.get(name, 2)
+    if optimizer.get("amsgrad") and name in ["adam", "adamw", "adamirror"]:
+        states += 1
+    if name == "rmsprop":
+        states += int(bool(optimizer.get("momentum"))) + int(bool(optimizer.get("centered")))
+    if name == "sgd" and optimizer.get("momentum"):
+        states += 1
+    return states
+
+def estimate(config, width, height, channels, batch_size):
+    """
+    Returns `(rows, totals, errors)`.  Rows are the `check_config` rows with `forward_flops`,
+    `backward_flops`, `parameter_bytes` and `saved_bytes` added.  `totals` is the estimate for one
+    training step.
+    """
+    rows, errors = check_config(config, width, height, channels, batch_size, measure=Measure())
+    def total(component, key):
+        return sum([row.get(key, 0) for row in rows if row["component"] == component])
+    passes = {"generator": 1, "discriminator": 2}
+    parameter_bytes = sum([total(c, "parameter_bytes") for c in passes])
+    states = optimizer_states(config)
+    forward_activations = sum([total(c, "saved_bytes") * n for c, n in passes.items()])
+    largest_output = max([row["activation_bytes"] for row in rows] or [0])
+    totals = {
+        "forward_flops": sum([total(c, "forward_flops") * n for c, n in passes.items()]),
+        "backward_flops": sum([total(c, "backward_flops") * n for c, n in passes.items()]),
+        "parameter_bytes": parameter_bytes,
+        "gradient_bytes": parameter_bytes,
+        "optimizer_bytes": parameter_bytes * states,
+        "forward_activation_bytes": forward_activations,
+        # during backward the saved activations are alive with a gradient for the current layer's output and input
+        "backward_activation_bytes": forward_activations + 2 * largest_output
+    }
+    totals["peak_bytes"] = parameter_bytes * (2 + states) + totals["backward_activation_bytes"]
+    return rows, totals, errors
+
+def format_costs(rows, totals, errors):
+    lines = ["%-14s %-40s %-16s %10s %10s %10s %10s" % ("component", "layer", "output", "fwd flops", "bwd flops", "params", "saved")]
+    for row in rows:
+        lines.append("%-14s %-40s %-16s %10s %10s %10s %10s" % (row["component"], row["layer"][:40], "x".join([str(d) for d in row["shape"]]), format_flops(row.get("forward_flops", 0)), format_flops(row.get("backward_flops", 0)), format_bytes(row.get("parameter_bytes", 0)), format_bytes(row.get("saved_bytes", 0))))
+    lines.append("Per step (generator once, discriminator twice):")
+    lines.append("  FLOPs             %s forward, %s backward" % (format_flops(totals["forward_flops"]), format_flops(totals["backward_flops"])))
+    lines.append("  parameters        %s (+%s gradients, +%s optimizer state)" % (format_bytes(totals["parameter_bytes"]), format_bytes(totals["gradient_bytes"]), format_bytes(totals["optimizer_bytes"])))
+    lines.append("  activations       %s forward, %s backward peak" % (format_bytes(totals["forward_activation_bytes"]), format_bytes(totals["backward_activation_bytes"])))
+    lines.append("  peak memory       %s" % format_bytes(totals["peak_bytes"]))
+    for error in errors:
+        lines.append("Error: " + error)
+    return "\n".join(lines)
+
+def format_flops(count):
+    for unit in ["", "K", "M", "G", "T"]:
+        if count < 1000:
+            return "%.1f%s" % (count, unit)
+        count /= 1000
+    return "%.1fP" % count
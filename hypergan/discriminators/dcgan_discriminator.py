@@ -24,5 +24,5 @@ class DCGANDiscriminator(BaseDiscriminator):
         self.linear = nn.Linear(4*4*512, 1)
 
     def forward(self, x):
-        net = self.net(x).view(self.gan.batch_size(), -1)
-        return self.linear(net).view(self.gan.batch_size(),1)
+        net = self.net(x).view(x.shape[0], -1)
+        return self.linear(net).view(x.shape[0],1)
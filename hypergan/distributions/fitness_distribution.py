@@ -1,5 +1,6 @@
 import hyperchamber as hc
 import numpy as np
+import time
 import torch
 from .base_distribution import BaseDistribution
 
@@ -10,6 +11,16 @@ from hypergan.gan_component import ValidationException, GANComponent
 TINY=1e-12
 
 class FitnessDistribution(BaseDistribution):
+    """
+    Samples `steps` batches from `source` and keeps the `batch_size` latents the discriminator
+    scores lowest (highest with `reverse`) on the generated samples.
+
+    With `batched: true` all `steps*batch_size` latents are scored without gradients in chunks of
+    `chunk_size` (a multiple of `batch_size`, sized from free device memory if unset) and selected
+    on the device.  `reservoir_size` then keeps that many of the best latents and their scores
+    between calls instead of scoring the prior best again.  The time spent per `next()` is
+    reported as the `fitness_ms` metric one call later, so reading it does not wait on the device.
+    """
     def __init__(self, gan, config):
         BaseDistribution.__init__(self, gan, config)
         klass = GANComponent.lookup_function(None, self.config['source'])
@@ -19,14 +30,94 @@ class FitnessDistribution(BaseDistribution):
         self.current_height = 1
         self.current_input_size = config["z"]
         self.z = self.source.z
+        self.chunk_size = self.config.chunk_size
+        self.reservoir = None
+        self.reservoir_scores = None
+        self.timer = None
 
     def create(self):
         pass
 
-    def next(self):
+    def score(self, latents):
+        scores = []
+        for chunk in torch.split(latents, self.chunk_size or latents.shape[0]):
+            d_scores = self.gan.discriminator(self.gan.generator(chunk))
+            scores.append(d_scores.view(d_scores.shape[0], -1).mean(dim=1))
+        return torch.cat(scores, dim=0)
+
+    def measure_chunk_size(self, latents):
+        """Largest multiple of `batch_size` that fits in about half the free device memory, measured with one batch"""
+        batch_size = self.gan.batch_size()
+        device = latents.device
+        if device.type != 'cuda':
+            return latents.shape[0]
+        torch.cuda.synchronize(device)
+        before = torch.cuda.memory_allocated(device)
+        torch.cuda.reset_peak_memory_stats(device)
+        self.score(latents[:batch_size])
+        per_sample = max(1, (torch.cuda.max_memory_allocated(device) - before) // batch_size)
+        free, total = torch.cuda.mem_get_info(device)
+        chunk_size = int(free * 0.5 // per_sample) // batch_size * batch_size
+        return max(batch_size, min(latents.shape[0], chunk_size))
+
+    def start_timer(self, device):
+        if self.timer is not None:
+            start, end = self.timer
+            if isinstance(start, float):
+                elapsed = (end - start) * 1000.0
+            else:
+                end.synchronize()
+                elapsed = start.elapsed_time(end)
+            self.gan.add_metric('fitness_ms', elapsed)
+        if device.type == 'cuda':
+            start = torch.cuda.Event(enable_timing=True)
+            start.record()
+            return start
+        return time.time()
+
+    def stop_timer(self, start):
+        if isinstance(start, float):
+            self.timer = (start, time.time())
+        else:
+            end = torch.cuda.Event(enable_timing=True)
+            end.record()
+            self.timer = (start, end)
+
+    def next_batched(self, batch_size=None):
+        batch_size = batch_size or self.gan.batch_size()
+        latents = torch.cat([self.source.next(batch_size) for i in range(self.config.steps or 1)], dim=0)
+        start = self.start_timer(latents.device)
+        largest = bool(self.config.reverse)
+        with torch.no_grad():
+            if self.chunk_size is None:
+                self.chunk_size = self.measure_chunk_size(latents)
+            scores = self.score(latents)
+            if self.config.reservoir_size:
+                if self.reservoir is not None:
+                    latents = torch.cat([self.reservoir, latents], dim=0)
+                    scores = torch.cat([self.reservoir_scores, scores], dim=0)
+                keep = max(batch_size, self.config.reservoir_size)
+                self.reservoir_scores, best_idx = torch.topk(scores, min(keep, scores.shape[0]), largest=largest)
+                self.reservoir = latents.index_select(0, best_idx)
+                self.best_sample = self.reservoir[:batch_size]
+            else:
+                if not self.config.discard_prior and hasattr(self, 'best_sample'):
+                    latents = torch.cat([self.best_sample, latents], dim=0)
+                    scores = torch.cat([self.score(self.best_sample), scores], dim=0)
+                best_scores, best_idx = torch.topk(scores, batch_size, largest=largest, sorted=False)
+                self.best_sample = latents.index_select(0, best_idx)
+        self.stop_timer(start)
+        self.z = self.best_sample
+        return self.best_sample
+
+    def next(self, batch_size=None):
+        """Returns the best `batch_size` latents, by default the training batch size"""
+        if self.config.batched:
+            return self.next_batched(batch_size)
+        batch_size = batch_size or self.gan.batch_size()
         if not hasattr(self, 'best_sample'):
-            self.best_sample = self.source.next()
-            self.best_sample = self.next()
+            self.best_sample = self.source.next(batch_size)
+            self.best_sample = self.next(batch_size)
         if self.config.discard_prior:
             all_samples = []
             all_scores = []
@@ -36,7 +127,7 @@ class FitnessDistribution(BaseDistribution):
             all_scores = torch.split(prior_best_scores, 1, dim=0)
             all_scores = [d.mean() for d in all_scores]
         for i in range(self.config.steps or 1):
-            sample = self.source.next()
+            sample = self.source.next(batch_size)
             d_scores = self.gan.discriminator(self.gan.generator(sample))
             d_scores = torch.split(d_scores, 1, dim=0)
             d_scores = [d.mean() for d in d_scores]
@@ -47,7 +138,7 @@ class FitnessDistribution(BaseDistribution):
         sorted_idx = np.argsort(all_scores)
         if self.config.reverse:
             sorted_idx = sorted_idx[::-1]
-        sorted_idx = sorted_idx[:self.gan.batch_size()]
+        sorted_idx = sorted_idx[:batch_size]
         sorted_samples = [all_samples[idx] for idx in sorted_idx]
         self.best_sample = torch.cat(sorted_samples, dim=0)
         self.z = self.best_sample
@@ -0,0 +1,90 @@
+import math
+import torch
+import torch.nn as nn
+
+class LatentBuffer(nn.Module):
+    """
+    Hands out batches of latents as slices of a larger pre-generated block on the device
+
+    Blocks of `block_batches` batches are drawn from a dedicated `torch.Generator` with `sample_fn(shape, generator, device)`.
+    When a block runs out a new one is allocated, so slices already handed out stay valid.  `next` can
+    ask for any batch size, a block is made larger when one batch does not fit.
+
+    The generator state at the start of the current block and the position in it are part of the
+    `state_dict`, so a restored buffer continues with the same latents.
+    """
+    def __init__(self, shape, sample_fn, block_batches=64, seed=None):
+        super(LatentBuffer, self).__init__()
+        self.shape = list(shape)
+        self.sample_fn = sample_fn
+        self.block_batches = block_batches
+        if seed is None:
+            seed = int(torch.randint(0, 2**62, [1]).item())
+        self.seed = seed
+        self.generator = None
+        self.block = None
+        self.block_state = None
+        self.position = 0
+        self.restore = None
+
+    def refill(self, device, batch_size=0):
+        if self.generator is None or self.generator.device != device:
+            self.generator = torch.Generator(device=device)
+            self.generator.manual_seed(self.seed)
+        position = 0
+        if self.restore is not None:
+            rng_state, position = self.restore
+            self.restore = None
+            try:
+                self.generator.set_state(rng_state)
+            except RuntimeError:
+                print("[hypergan] Warning: latent generator state was saved on a different device type, not restoring it.")
+                position = 0
+        self.block_state = self.generator.get_state()
+        self.block = self.sample_fn([max(self.shape[0] * self.block_batches, batch_size)] + self.shape[1:], self.generator, device)
+        self.position = position
+
+    def next(self, device, batch_size=None):
+        batch_size = batch_size or self.shape[0]
+        device = torch.device(device)
+        if device.type == 'cuda' and device.index is None:
+            device = torch.device('cuda', torch.cuda.current_device())
+        if self.restore is not None or self.block is None or self.block.device != device:
+            self.refill(device, batch_size)
+        if self.position + batch_size > self.block.shape[0]:
+            self.refill(device, batch_size)
+        result = self.block[self.position:self.position + batch_size]
+        self.position += batch_size
+        return result
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['generator'] = None
+        state['block'] = None
+        if self.block_state is not None and self.restore is None:
+            state['restore'] = (self.block_state, self.position)
+        return state
+
+    def _save_to_state_dict(self, destination, prefix, keep_vars):
+        super(LatentBuffer, self)._save_to_state_dict(destination, prefix, keep_vars)
+        if self.block_state is not None:
+            destination[prefix + 'rng_state'] = self.block_state
+            destination[prefix + 'position'] = torch.tensor(self.position)
+
+    def _load_from_state_dict(self, state_dict, prefix, local_metadata, strict, missing_keys, unexpected_keys, error_msgs):
+        rng_state = state_dict.pop(prefix + 'rng_state', None)
+        position = state_dict.pop(prefix + 'position', None)
+        super(LatentBuffer, self)._load_from_state_dict(state_dict, prefix, local_metadata, strict, missing_keys, unexpected_keys, error_msgs)
+        if rng_state is not None:
+            self.restore = (rng_state.cpu(), int(position))
+
+def uniform(shape, generator, device):
+    return torch.rand(shape, generator=generator, device=device).mul_(2).sub_(1)
+
+def truncated_normal(shape, generator, device, bound=2.0):
+    """Normal samples truncated to (-bound, bound) by inverting the CDF of uniform samples"""
+    low = 0.5 * (1 + math.erf(-bound / math.sqrt(2)))
+    high = 0.5 * (1 + math.erf(bound / math.sqrt(2)))
+    u = torch.rand(shape, generator=generator, device=device)
+    u = u.mul_(high - low).add_(low).mul_(2).sub_(1)
+    return u.erfinv_().mul_(math.sqrt(2)).clamp_(-bound, bound)
@@ -28,10 +28,11 @@ class NormalDistribution(BaseDistribution):
         #    errors.append("z must be a multiple of 2 (was %2d)" % self.config.z)
         return errors
 
-    def sample(self):
-        self.z = torch.randn(self.shape, device=self.gan.device)
+    def sample(self, batch_size=None):
+        self.z = torch.randn([batch_size or self.shape[0]] + self.shape[1:], device=self.gan.device)
         return self.z
 
-    def next(self):
-        self.instance = self.sample()
+    def next(self, batch_size=None):
+        """Samples `batch_size` latents, by default the training batch size"""
+        self.instance = self.sample(batch_size)
         return self.instance
@@ -4,11 +4,20 @@ from hypergan.gan_component import ValidationException, GANComponent
 from torch.autograd import Variable
 from torch.autograd import grad as torch_grad
 from torch.distributions import uniform
+import collections
 import hyperchamber as hc
 import numpy as np
 import torch
 
 class OptimizeDistribution(BaseDistribution):
+    """
+    Moves latents from `source` for up to `steps` optimizer steps to reduce the adversarial norm
+    between the discriminator scores of real and generated samples.
+
+    With `fast: true` one optimizer is kept and its state cleared between calls, the real score is
+    computed once per call, no higher order graph is built, and each sample is frozen once its
+    movement falls below `z_change_threshold` of its first step.  The loop ends when all are frozen.
+    """
     def __init__(self, gan, config):
         BaseDistribution.__init__(self, gan, config)
         klass = GANComponent.lookup_function(None, self.config['source']['class'])
@@ -21,14 +30,62 @@ class OptimizeDistribution(BaseDistribution):
         self.hardtanh = torch.nn.Hardtanh()
         self.relu = torch.nn.ReLU()
         self.z_var = None
+        self.optimizer = None
 
     def create(self):
         pass
 
-    def next(self):
-        sample = self.source.next()
-        if self.z_var is None:
-            self.z_var = Variable(sample, requires_grad=True).cuda()
+    def create_optimizer(self, params):
+        defn = self.config.optimizer.copy()
+        klass = GANComponent.lookup_function(None, defn['class'])
+        del defn["class"]
+        return klass(params, **defn)
+
+    def next_fast(self, batch_size=None):
+        sample = self.source.next(batch_size)
+        if self.z_var is None or self.z_var.shape != sample.shape:
+            self.z_var = torch.zeros_like(sample, requires_grad=True)
+            self.optimizer = self.create_optimizer([self.z_var])
+        self.optimizer.state = collections.defaultdict(dict)
+        z = self.z_var
+        with torch.no_grad():
+            z.copy_(sample)
+            real = self.gan.discriminator(self.gan.inputs.sample).mean()
+        frozen = torch.zeros([z.shape[0]] + [1] * (len(z.shape) - 1), dtype=torch.bool, device=z.device)
+        first_z_change = None
+
+        for i in range(self.config.steps or 1):
+            fake = self.gan.discriminator(self.gan.generator(self.hardtanh(z))).mean()
+            loss = self.gan.loss.forward_adversarial_norm(real, fake)
+            z_move = torch_grad(outputs=loss, inputs=z)[0]
+            if self.config.z_change_threshold:
+                z_change = z_move.abs().view(z.shape[0], -1).mean(dim=1).view(frozen.shape)
+                if first_z_change is None:
+                    first_z_change = z_change
+                frozen = frozen | (z_change < first_z_change * self.config.z_change_threshold)
+                if frozen.all():
+                    break
+                z_move = z_move.masked_fill(frozen, 0)
+                previous = z.detach().clone()
+            z.grad = z_move
+            self.optimizer.step()
+            if self.config.z_change_threshold:
+                with torch.no_grad():
+                    z.copy_(torch.where(frozen, previous, z))
+            if self.config.loss_threshold and loss < self.config.loss_threshold:
+                break
+
+        if self.config.info:
+            print("[optimize distribution] steps", i, "loss", loss.item(), "frozen", frozen.sum().item(), "mean movement", (z-sample).abs().mean().item())
+        self.instance = z
+        return z
+
+    def next(self, batch_size=None):
+        if self.config.fast:
+            return self.next_fast(batch_size)
+        sample = self.source.next(batch_size)
+        if self.z_var is None or self.z_var.shape != sample.shape:
+            self.z_var = sample.detach().clone().requires_grad_()
         defn = self.config.optimizer.copy()
         klass = GANComponent.lookup_function(None, defn['class'])
         del defn["class"]
@@ -2,6 +2,7 @@ import hyperchamber as hc
 import numpy as np
 import torch
 from .base_distribution import BaseDistribution
+from .latent_buffer import LatentBuffer, truncated_normal
 
 from ..gan_component import ValidationException
 from torch.distributions import uniform
@@ -16,7 +17,8 @@ class TruncatedNormalDistribution(BaseDistribution):
         self.current_height = 1
         self.current_input_size = config["z"]
         batch_size = gan.batch_size()
-        self.z = torch.Tensor(batch_size, self.current_input_size).cuda()
+        self.buffer = LatentBuffer([batch_size, self.current_input_size], truncated_normal, block_batches=self.config.buffer_batches or 64, seed=self.config.seed)
+        self.z = self.buffer.next(self.gan.device)
 
     def create(self):
         pass
@@ -30,19 +32,11 @@ class TruncatedNormalDistribution(BaseDistribution):
         #    errors.append("z must be a multiple of 2 (was %2d)" % self.config.z)
         return errors
 
-    # https://discuss.pytorch.org/t/implementing-truncated-normal-initializer/4778/15
-    def truncated_normal_(self, tensor, mean=0, std=1):
-        size = tensor.shape
-        tmp = tensor.new_empty(size + (4,)).normal_()
-        valid = (tmp < 2) & (tmp > -2)
-        ind = valid.max(-1, keepdim=True)[1]
-        tensor.data.copy_(tmp.gather(-1, ind).squeeze(-1))
-        tensor.data.mul_(std).add_(mean)
-
-    def sample(self):
-        self.truncated_normal_(self.z)
+    def sample(self, batch_size=None):
+        self.z = self.buffer.next(self.gan.device, batch_size)
         return self.z
 
-    def next(self):
-        self.instance = self.sample()
+    def next(self, batch_size=None):
+        """Samples `batch_size` latents, by default the training batch size"""
+        self.instance = self.sample(batch_size)
         return self.instance
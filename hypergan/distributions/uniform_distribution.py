@@ -2,6 +2,7 @@ import hyperchamber as hc
 import numpy as np
 import torch
 from .base_distribution import BaseDistribution
+from .latent_buffer import LatentBuffer, uniform as uniform_sample
 
 from ..gan_component import ValidationException
 from torch.distributions import uniform
@@ -15,6 +16,7 @@ class UniformDistribution(BaseDistribution):
         self.current_input_size = config["z"]
         batch_size = gan.batch_size()
         self.shape = [batch_size, self.current_input_size]
+        self.buffer = LatentBuffer(self.shape, uniform_sample, block_batches=self.config.buffer_batches or 64, seed=self.config.seed)
         if self.config.projections is not None:
             self.current_input_size *= len(self.config.projections)
             self.current_channels *= len(self.config.projections)
@@ -45,10 +47,8 @@ class UniformDistribution(BaseDistribution):
             return periodic
         return self.lookup_function(projection)
 
-    def sample(self):
-        self.const_two = torch.tensor(2.0, device=self.gan.device)
-        self.const_one = torch.tensor(1.0, device=self.gan.device)
-        self.z = torch.rand(self.shape, device=self.gan.device) * self.const_two - self.const_one
+    def sample(self, batch_size=None):
+        self.z = self.buffer.next(self.gan.device, batch_size)
         if self.config.projections is None:
             return self.z
         projections = []
@@ -59,8 +59,9 @@ class UniformDistribution(BaseDistribution):
             ps.append(self.z)
         return torch.cat(ps, -1)
 
-    def next(self):
-        self.instance = self.sample()
+    def next(self, batch_size=None):
+        """Samples `batch_size` latents, by default the training batch size"""
+        self.instance = self.sample(batch_size)
         return self.instance
 
 def identity(config, gan, net):
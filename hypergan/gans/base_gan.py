@@ -22,9 +22,14 @@ import re
 import torch
 import torch.nn as nn
 
+def default_device():
+    if torch.cuda.is_available():
+        return "cuda:0"
+    return "cpu"
+
 class BaseGAN():
-    def __init__(self, config=None, inputs=None, device="cuda"):
-        """ Initialized a new GAN."""
+    def __init__(self, config=None, inputs=None, device=None):
+        """ Initialized a new GAN.  `device` defaults to the first GPU when one is available, otherwise the CPU."""
         self._metrics = {}
         self.components = {}
         self.destroy = False
@@ -35,7 +40,7 @@ class BaseGAN():
             config = hg.Configuration.default()
 
         self.config = config
-        self.device = device
+        self.device = device or default_device()
         self.create()
         self.hooks = self.setup_hooks()
         self.train_hooks = TrainHookCollection(self)
@@ -143,7 +148,7 @@ class BaseGAN():
         if Path(path).is_file():
             print("Loading " + path)
             try:
-                state_dict = torch.load(path)
+                state_dict = torch.load(path, map_location=self.device)
                 print('state_dict', state_dict.keys())
                 component.load_state_dict(state_dict)
                 return True
@@ -272,7 +277,7 @@ class BaseGAN():
         hooks = []
         for hook_config in (self.config.trainer["hooks"]):
             hook_config = hc.lookup_functions(hook_config.copy())
-            defn = {k: v for k, v in hook_config.items() if k in inspect.getargspec(hook_config['class']).args}
+            defn = {k: v for k, v in hook_config.items() if k in inspect.getfullargspec(hook_config['class']).args}
             defn['gan']=self
             defn['config']=hook_config
             hook = hook_config["class"](**defn)
@@ -51,11 +51,12 @@ class StandardGAN(BaseGAN):
 
     def forward_pass(self):
         self.x = self.inputs.next()
+        if hasattr(self.inputs, 'wait_time'):
+            self.add_metric('input_ms', self.inputs.wait_time * 1000.0)
         self.augmented_latent = self.train_hooks.augment_latent(self.latent.next())
         g = self.generator(self.augmented_latent)
         self.g = g
-        self.augmented_x = self.train_hooks.augment_x(self.x)
-        self.augmented_g = self.train_hooks.augment_g(self.g)
+        self.augmented_x, self.augmented_g = self.train_hooks.augment_xg(self.x, self.g)
         d_real = self.forward_discriminator([self.augmented_x])
         d_fake = self.forward_discriminator([self.augmented_g])
         self.d_fake = d_fake
@@ -29,6 +29,6 @@ class DCGANGenerator(BaseGenerator):
         )
 
     def forward(self, x):
-        lin = self.linear(x).view(self.gan.batch_size(), 512, 4, 4)
+        lin = self.linear(x).view(x.shape[0], 512, 4, 4)
         net = self.net(lin)
-        return net.view(self.gan.batch_size(),3,64,64)
+        return net.view(x.shape[0],3,64,64)
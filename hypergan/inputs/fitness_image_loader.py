@@ -10,42 +10,40 @@ import numpy as np
 
 class FitnessImageLoader(ImageLoader):
     """
-    ImageLoader loads a set of images
+    ImageLoader that keeps the `batch_size` samples the discriminator scores lowest
+    (highest with `reverse`) out of the prior best batch and `steps` new batches.
+
+    All candidates are scored in a single discriminator pass.  With `cache_scores` the prior best
+    batch keeps the scores it was selected with instead of being scored again.
     """
 
-    def __init__(self, config):
-        super(FitnessImageLoader, self).__init__(config=config)
+    def __init__(self, config, device=None):
+        super(FitnessImageLoader, self).__init__(config=config, device=device)
+        self.best_sample = None
+        self.best_scores = None
+
+    def score(self, samples):
+        d_scores = self.gan.discriminator(samples)
+        return d_scores.view(d_scores.shape[0], -1).mean(dim=1)
 
     def next(self, index=0):
-        if not hasattr(self, 'best_sample'):
+        if self.best_sample is None:
             self.best_sample = super(FitnessImageLoader, self).next(index)
-            self.best_sample = self.next(index)
-        if self.config.discard_prior:
-            all_samples = []
-            all_scores = []
-        else:
-            all_samples = torch.split(self.best_sample, 1, dim=0)
-            prior_best_scores = self.gan.discriminator(self.best_sample)
-            all_scores = torch.split(prior_best_scores, 1, dim=0)
-            all_scores = [d.mean() for d in all_scores]
-
-        for i in range(self.config.steps or 1):
-            sample = super(FitnessImageLoader, self).next(index)
-            d_scores = self.gan.discriminator(sample)
-            d_scores = torch.split(d_scores, 1, dim=0)
-            d_scores = [d.mean() for d in d_scores]
-            samples = torch.split(sample, 1, dim=0)
-            all_scores += d_scores
-            all_samples += samples
-        all_scores = [s.item() for s in all_scores]
-        sorted_idx = np.argsort(all_scores)
-        if self.config.reverse:
-            sorted_idx = sorted_idx[::-1]
-        sorted_idx = sorted_idx[:self.gan.batch_size()]
-        sorted_samples = [all_samples[idx] for idx in sorted_idx]
-        self.best_sample = torch.cat(sorted_samples, dim=0).cuda()
+        candidates = [super(FitnessImageLoader, self).next(index) for i in range(self.config.steps or 1)]
+
+        with torch.no_grad():
+            if self.config.discard_prior:
+                all_samples = torch.cat(candidates, dim=0)
+                all_scores = self.score(all_samples)
+            elif self.config.cache_scores and self.best_scores is not None:
+                all_samples = torch.cat([self.best_sample] + candidates, dim=0)
+                all_scores = torch.cat([self.best_scores, self.score(all_samples[self.best_sample.shape[0]:])], dim=0)
+            else:
+                all_samples = torch.cat([self.best_sample] + candidates, dim=0)
+                all_scores = self.score(all_samples)
+
+            best_scores, best_idx = torch.topk(all_scores, self.gan.batch_size(), largest=bool(self.config.reverse), sorted=False)
+        self.best_scores = best_scores
+        self.best_sample = all_samples.index_select(0, best_idx)
         self.sample = self.best_sample
         return self.best_sample
-
-
-
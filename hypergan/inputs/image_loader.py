@@ -1,36 +1,58 @@
 from hypergan.gan_component import ValidationException, GANComponent
 from .crop_resize_transform import CropResizeTransform
+from .shared_cache import CachedDataset, SharedImageCache
 from .unsupervised_image_folder import UnsupervisedImageFolder
 import glob
 import os
+import queue
+import random
+import threading
+import time
 import torch
 import torch.utils.data as data
 import torchvision
-import PIL
 
 class ImageLoader:
     """
     ImageLoader loads a set of images
+
+    Loading options:
+
+    * `workers` - number of worker processes decoding images.  Default 0 (decode on the training thread)
+    * `persistent_workers` - keep worker processes alive between epochs.  Requires `workers`
+    * `prefetch_factor` - batches loaded ahead by each worker.  Requires `workers`
+    * `prefetch` - size of the ring of ready batches filled by a background thread.  Default 0 (disabled)
+    * `draft` - decode JPEGs at a reduced size when `crop` or `resize` shrinks them anyway.  Default true
+    * `manifest` - cache directory listings in `~/.hypergan/manifests`.  Default true
+    * `cache_bytes` - keep up to this many bytes of preprocessed images in shared memory.  Every loader
+      created with `to` reads from the same cache.  Not used with `random_crop`.  Default 0 (disabled)
+    * `reuse_buffers` - write every batch into the same device tensor instead of allocating one per step.
+      Only safe when nothing holds on to the previous batch.  Default false
+
+    Batches stay uint8 until they reach the device and are scaled to [-1, 1] there.
+    The time `next` spent waiting on data is stored in `wait_time`.
     """
 
-    def __init__(self, config, device=None):
+    def __init__(self, config, device=None, rank=0, world_size=1, caches=None, seed=None):
         self.config = config
+        self.rank = rank
+        self.world_size = world_size
+        self.seed = seed
+        if self.seed is None:
+            self.seed = random.randint(0, 2**31 - 1)
+        self.caches = caches or []
         self.datasets = []
-        transform_list = []
-        h, w = self.config.height, self.config.width
+        self.ready = []
+        self.wait_time = 0.0
+        self.device = device
+        self.buffer = None
+        self.offset = torch.tensor(-1.0, device=device)
+        self.scale = torch.tensor(127.5, device=device)
         if self.config.blank:
             return
 
-        if config.crop:
-            transform_list.append(CropResizeTransform((h, w)))
-
-        if config.resize:
-            transform_list.append(torchvision.transforms.Resize((h, w)))
-
-        if config.random_crop:
-            transform_list.append(torchvision.transforms.RandomCrop((h, w), pad_if_needed=True, padding_mode='edge'))
-
-        transform_list.append(torchvision.transforms.ToTensor())
+        transform_list = image_transforms(config)
+        transform_list.append(torchvision.transforms.PILToTensor())
         transform = torchvision.transforms.Compose(transform_list)
 
         directories = self.config.directories or [self.config.directory]
@@ -38,21 +60,43 @@ class ImageLoader:
             directories = [directories]
 
         self.dataloaders = []
-        self.device=device
-        for directory in directories:
+        self.samplers = []
+        self.epochs = []
+        if caches is None and self.config.cache_bytes and self.config.random_crop:
+            print("[hypergan] Warning: cache_bytes is not used with random_crop.")
+        for i, directory in enumerate(directories):
             mode = "RGB"
             if self.channels() == 4:
                 mode = "RGBA"
-            image_folder = UnsupervisedImageFolder(directory, transform=transform, mode=mode)
+            dataset = UnsupervisedImageFolder(directory, transform=transform, mode=mode, manifest=self.config.manifest, draft_size=draft_size(config))
+            if caches is None and self.config.cache_bytes and not self.config.random_crop:
+                self.caches.append(SharedImageCache(len(dataset), [self.channels(), self.height(), self.width()], self.config.cache_bytes))
+            if i < len(self.caches):
+                dataset = CachedDataset(dataset, self.caches[i])
             shuffle = True
             if config.shuffle is not None:
                 shuffle = config.shuffle
-            dataloader = data.DataLoader(image_folder, batch_size=config.batch_size, shuffle=shuffle, num_workers=0, drop_last=True, pin_memory=True)
+            sampler = data.DistributedSampler(dataset, num_replicas=world_size, rank=rank, shuffle=shuffle, seed=self.seed, drop_last=True)
+            dataloader = data.DataLoader(dataset, batch_size=config.batch_size, sampler=sampler, drop_last=True, pin_memory=torch.cuda.is_available(), **self.worker_options())
             self.dataloaders.append(dataloader)
-            #self.datasets.append(iter(self.dataloaders[-1]))
+            self.samplers.append(sampler)
+            self.epochs.append(0)
 
-    def to(self, device):
-        return ImageLoader(self.config, device=device)
+    def worker_options(self):
+        workers = self.config.workers or 0
+        options = {"num_workers": workers}
+        if workers > 0:
+            if self.config.persistent_workers:
+                options["persistent_workers"] = True
+            if self.config.prefetch_factor:
+                options["prefetch_factor"] = self.config.prefetch_factor
+        elif self.config.persistent_workers or self.config.prefetch_factor:
+            print("[hypergan] Warning: persistent_workers and prefetch_factor require workers > 0, ignoring.")
+        return options
+
+    def to(self, device, rank=0, world_size=1):
+        """Returns a loader on `device` sharing this loader's cache.  Loaders with the same `world_size` and different `rank` see disjoint images each epoch."""
+        return ImageLoader(self.config, device=device, rank=rank, world_size=world_size, caches=self.caches, seed=self.seed)
 
     def batch_size(self):
         return self.config.batch_size
@@ -67,18 +111,84 @@ class ImageLoader:
         return self.config.channels
 
     def next(self, index=0):
+        if self.config.blank:
+            return torch.zeros([self.config.batch_size, self.config.channels, self.config.height, self.config.width], device=self.device)
+        start = time.time()
+        if (self.config.prefetch or 0) > 0:
+            batch = self.next_ready(index)
+        else:
+            batch = self.next_batch(index)
+        self.wait_time = time.time() - start
+        batch = batch.to(self.device, non_blocking=True)
+        if self.config.reuse_buffers:
+            if self.buffer is None or self.buffer.shape != batch.shape:
+                self.buffer = torch.empty(batch.shape, device=batch.device)
+            return normalize(batch, self.offset, self.scale, out=self.buffer)
+        return normalize(batch, self.offset, self.scale)
+
+    def next_batch(self, index=0):
         if len(self.datasets) == 0:
             self.datasets = [iter(dl) for dl in self.dataloaders]
-        if self.config.blank:
-            return torch.zeros([self.config.batch_size, self.config.channels, self.config.height, self.config.width]).cuda()
         try:
-            self.multiple = torch.tensor(2.0, device=self.device)
-            self.offset = torch.tensor(-1.0, device=self.device)
-            return self.datasets[index].next()[0].to(self.device) * self.multiple + self.offset
-        except ValueError:
-            return self.next(index)
-        except PIL.UnidentifiedImageError:
-            return self.next(index)
+            return next(self.datasets[index])[0]
         except StopIteration:
+            self.epochs[index] += 1
+            self.samplers[index].set_epoch(self.epochs[index])
             self.datasets[index] = iter(self.dataloaders[index])
-            return self.next(index)
+            return self.next_batch(index)
+
+    def next_ready(self, index=0):
+        if len(self.ready) == 0:
+            self.start_prefetch()
+        batch = self.ready[index].get()
+        if isinstance(batch, Exception):
+            raise batch
+        return batch
+
+    def start_prefetch(self):
+        """Starts one background thread per dataloader, each keeping up to `prefetch` batches ready"""
+        self.datasets = [iter(dl) for dl in self.dataloaders]
+        self.ready = [queue.Queue(maxsize=self.config.prefetch) for _ in self.dataloaders]
+        for index in range(len(self.dataloaders)):
+            threading.Thread(target=self.prefetch_loop, args=(index,), daemon=True).start()
+
+    def prefetch_loop(self, index):
+        while True:
+            try:
+                batch = self.next_batch(index)
+            except Exception as e:
+                self.ready[index].put(e)
+                return
+            self.ready[index].put(batch)
+
+def normalize(batch, offset, scale, out=None):
+    """Maps a uint8 batch to [-1, 1] in a single kernel.  `offset` and `scale` are the -1 and 127.5 scalar tensors on the batch device."""
+    return torch.addcdiv(offset, batch, scale, out=out)
+
+def draft_size(config):
+    """Returns the (width, height) JPEGs can be decoded at for `image_transforms(config)`, or None when the full image is needed"""
+    if config.draft == False:
+        return None
+    if config.crop or config.resize:
+        return (config.width, config.height)
+    return None
+
+def image_transforms(config, random_crop=True):
+    """
+    Returns the list of PIL transforms used to bring an image to the configured size.
+
+    `random_crop=False` leaves out the random crop, for preprocessing that has to be deterministic.
+    """
+    transform_list = []
+    h, w = config.height, config.width
+
+    if config.crop:
+        transform_list.append(CropResizeTransform((h, w)))
+
+    if config.resize:
+        transform_list.append(torchvision.transforms.Resize((h, w)))
+
+    if config.random_crop and random_crop:
+        transform_list.append(torchvision.transforms.RandomCrop((h, w), pad_if_needed=True, padding_mode='edge'))
+
+    return transform_list
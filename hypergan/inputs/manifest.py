@@ -0,0 +1,173 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import contextlib
+import hashlib
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MANIFEST_DIRECTORY = "~/.hypergan/manifests"
+MANIFEST_VERSION = 1
+
+class Manifest:
+    """
+    Cached listing of an image directory, stored as json under `~/.hypergan/manifests`
+
+    Each directory is stored with its mtime, files and subdirectories.  A directory whose mtime
+    has not changed is not listed again, so a warm start costs one `stat` per directory.  New files
+    have their header read once to record the image size.  Files that cannot be decoded are kept
+    in a quarantine list and left out of `samples`.  Files found unreadable while loading, possibly
+    in DataLoader workers, are appended to a `.quarantine` side file that `samples` merges in.
+
+    Files replaced in place (same name) are not detected.  Delete the manifest to rescan.
+    """
+    def __init__(self, root, path=None, threads=16):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.path = path or Manifest.default_path(self.root)
+        self.threads = threads
+        self.quarantine_path = self.path + ".quarantine"
+
+    @staticmethod
+    def default_path(root):
+        key = hashlib.sha1(root.encode('utf-8')).hexdigest()
+        return os.path.join(os.path.expanduser(MANIFEST_DIRECTORY), key + ".json")
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION or data.get("root") != self.root:
+                data = None
+        except (OSError, ValueError):
+            data = None
+        if data is None:
+            data = {"version": MANIFEST_VERSION, "root": self.root, "directories": {}, "sizes": {}, "quarantine": []}
+        quarantined = self.load_quarantine()
+        for relative in quarantined:
+            data["sizes"].pop(relative, None)
+        data["quarantine"] = sorted(set(data["quarantine"]) | quarantined)
+        return data
+
+    def load_quarantine(self):
+        try:
+            with open(self.quarantine_path) as f:
+                return set([line.rstrip("\n") for line in f if line.strip() != ""])
+        except OSError:
+            return set()
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Exclusive lock shared by every process using this manifest, a no-op without `fcntl` or a writable directory"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            f = open(self.path + ".lock", "a")
+        except OSError:
+            yield
+            return
+        with f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def save(self, data):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + "." + str(os.getpid()) + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print("[hypergan] Warning: could not write manifest " + self.path + ": " + str(e))
+            return False
+        return True
+
+    def samples(self, is_valid_file):
+        """Returns the sorted paths of every readable image under `root`, updating the manifest if anything changed"""
+        with self.lock():
+            return self.update_samples(is_valid_file)
+
+    def update_samples(self, is_valid_file):
+        data = self.load()
+        merge_quarantine = os.path.exists(self.quarantine_path)
+        changed = False
+        directories = {}
+        pending = [""]
+        while len(pending) > 0:
+            relative = pending.pop()
+            entry = self.list_directory(relative, data["directories"].get(relative))
+            if entry is None:
+                continue
+            if entry is not data["directories"].get(relative):
+                changed = True
+            directories[relative] = entry
+            pending += [os.path.join(relative, d) for d in entry["subdirectories"]]
+        if directories.keys() != data["directories"].keys():
+            changed = True
+
+        files = [os.path.join(relative, f) for relative, entry in directories.items() for f in entry["files"]]
+        files = [f for f in files if is_valid_file(os.path.join(self.root, f))]
+        listed = set(files)
+        quarantine = set([f for f in data["quarantine"] if f in listed])
+        sizes = {f: data["sizes"][f] for f in files if f in data["sizes"]}
+        unknown = [f for f in files if f not in sizes and f not in quarantine]
+        if len(unknown) > 0:
+            print("[hypergan] Reading %d new images in %s" % (len(unknown), self.root))
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                for f, size in zip(unknown, executor.map(self.read_size, unknown)):
+                    if size is None:
+                        quarantine.add(f)
+                    else:
+                        sizes[f] = size
+        files = [f for f in files if f in sizes]
+        if changed or merge_quarantine or len(unknown) > 0 or len(sizes) != len(data["sizes"]) or len(quarantine) != len(data["quarantine"]):
+            data["directories"] = directories
+            data["sizes"] = sizes
+            data["quarantine"] = sorted(quarantine)
+            if self.save(data) and merge_quarantine:
+                os.remove(self.quarantine_path)
+
+        files.sort(key=lambda f: (os.path.join(self.root, os.path.dirname(f)), os.path.basename(f)))
+        return [os.path.join(self.root, f) for f in files]
+
+    def list_directory(self, relative, entry):
+        path = os.path.join(self.root, relative)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if entry is not None and entry["mtime"] == mtime:
+            return entry
+        files = []
+        subdirectories = []
+        with os.scandir(path) as it:
+            for item in it:
+                if item.is_dir(follow_symlinks=True):
+                    subdirectories.append(item.name)
+                else:
+                    files.append(item.name)
+        return {"mtime": mtime, "files": sorted(files), "subdirectories": sorted(subdirectories)}
+
+    def read_size(self, relative):
+        try:
+            with Image.open(os.path.join(self.root, relative)) as img:
+                return list(img.size)
+        except (OSError, ValueError):
+            return None
+
+    def quarantine(self, path):
+        """Records `path` as unreadable so later runs skip it.  Safe to call from several processes at once"""
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        try:
+            with self.lock():
+                with open(self.quarantine_path, "a") as f:
+                    f.write(relative + "\n")
+        except OSError as e:
+            print("[hypergan] Warning: could not quarantine " + relative + " in " + self.quarantine_path + ": " + str(e))
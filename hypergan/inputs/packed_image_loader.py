@@ -0,0 +1,177 @@
+from hypergan.gan_component import ValidationException
+from .image_loader import draft_size, image_transforms, normalize
+from .unsupervised_image_folder import UnsupervisedImageFolder
+import json
+import numpy as np
+import os
+import time
+import torch
+import torch.utils.data as data
+import torchvision
+
+INDEX_FILE = "index.json"
+
+class PackedImageLoader:
+    """
+    PackedImageLoader loads a set of images created with `hypergan pack`
+
+    Images are stored preprocessed as uint8 `[N, C, H, W]` shards.  Shards are memory mapped and
+    batches are gathered with a single fancy index per shard, so there is no decoding or per image
+    work while training.
+    """
+
+    def __init__(self, config, device=None, rank=0, world_size=1, seed=None):
+        self.config = config
+        self.device = device
+        self.rank = rank
+        self.world_size = world_size
+        self.seed = seed
+        if self.seed is None:
+            self.seed = np.random.randint(2**31 - 1)
+        self.datasets = []
+        self.wait_time = 0.0
+        self.offset = torch.tensor(-1.0, device=device)
+        self.scale = torch.tensor(127.5, device=device)
+        if self.config.blank:
+            return
+
+        directories = self.config.directories or [self.config.directory]
+        if(not isinstance(directories, list)):
+            directories = [directories]
+
+        for directory in directories:
+            dataset = PackedDataset(directory)
+            if dataset.shape != [self.channels(), self.height(), self.width()]:
+                raise ValidationException("Packed dataset " + directory + " has shape " + "x".join([str(d) for d in dataset.shape]) + ", expected " + "x".join([str(d) for d in [self.channels(), self.height(), self.width()]]) + ".  Run `hypergan pack` again with the matching --size.")
+            if len(dataset) // self.world_size < self.batch_size():
+                raise ValidationException("Packed dataset " + directory + " has fewer images per process than the batch size")
+            self.datasets.append(dataset)
+        self.permutations = [None for _ in self.datasets]
+        self.positions = [0 for _ in self.datasets]
+        self.epochs = [0 for _ in self.datasets]
+
+    @staticmethod
+    def is_packed(directory):
+        return os.path.isfile(os.path.join(os.path.expanduser(directory), INDEX_FILE))
+
+    def to(self, device, rank=0, world_size=1):
+        return PackedImageLoader(self.config, device=device, rank=rank, world_size=world_size, seed=self.seed)
+
+    def batch_size(self):
+        return self.config.batch_size
+
+    def width(self):
+        return self.config.width
+
+    def height(self):
+        return self.config.height
+
+    def channels(self):
+        return self.config.channels
+
+    def next_indices(self, index):
+        dataset = self.datasets[index]
+        position = self.positions[index]
+        if self.permutations[index] is None or position + self.batch_size() > len(self.permutations[index]):
+            if self.config.shuffle == False:
+                permutation = np.arange(len(dataset))
+            else:
+                permutation = np.random.RandomState((self.seed + self.epochs[index]) % 2**32).permutation(len(dataset))
+            self.permutations[index] = permutation[self.rank::self.world_size]
+            self.epochs[index] += 1
+            position = 0
+        self.positions[index] = position + self.batch_size()
+        return self.permutations[index][position:position + self.batch_size()]
+
+    def next(self, index=0):
+        if self.config.blank:
+            return torch.zeros([self.config.batch_size, self.config.channels, self.config.height, self.config.width], device=self.device)
+        start = time.time()
+        batch = torch.from_numpy(self.datasets[index].gather(self.next_indices(index)))
+        self.wait_time = time.time() - start
+        self.sample = normalize(batch.to(self.device, non_blocking=True), self.offset, self.scale)
+        return self.sample
+
+class PackedDataset:
+    """
+    A directory of uint8 shards plus an `index.json` describing them
+    """
+    def __init__(self, directory):
+        self.directory = os.path.expanduser(directory)
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.isfile(index_path):
+            raise ValidationException("No packed dataset found at " + self.directory + ".  Create one with `hypergan pack`.")
+        with open(index_path) as f:
+            self.index = json.load(f)
+        self.shape = [self.index["channels"], self.index["height"], self.index["width"]]
+        self.shards = [np.load(os.path.join(self.directory, shard["file"]), mmap_mode='r') for shard in self.index["shards"]]
+        self.offsets = np.cumsum([0] + [shard["count"] for shard in self.index["shards"]])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def gather(self, indices):
+        """Returns a uint8 `[len(indices), C, H, W]` array.  Indices are sorted so each shard is read in order."""
+        indices = np.sort(indices)
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        result = np.empty([len(indices)] + self.shape, dtype=np.uint8)
+        start = 0
+        for shard_id in np.unique(shard_ids):
+            local = indices[shard_ids == shard_id] - self.offsets[shard_id]
+            result[start:start + len(local)] = self.shards[shard_id][local]
+            start += len(local)
+        return result
+
+def pack(config, directory, output_directory, shard_size=10000, workers=0):
+    """
+    Preprocesses every image in `directory` with the crop/resize options from the input `config` and
+    writes them to `output_directory` as uint8 shards of at most `shard_size` images.
+    """
+    if config.random_crop:
+        print("[hypergan] Warning: random_crop is not applied when packing.  Use --crop or --resize to pack at a fixed size.")
+    mode = "RGB"
+    if config.channels == 4:
+        mode = "RGBA"
+    transform = torchvision.transforms.Compose(image_transforms(config, random_crop=False) + [torchvision.transforms.PILToTensor()])
+    image_folder = UnsupervisedImageFolder(directory, transform=transform, mode=mode, draft_size=draft_size(config))
+    dataloader = data.DataLoader(image_folder, batch_size=64, shuffle=False, num_workers=workers)
+    shape = [config.channels, config.height, config.width]
+    count = len(image_folder)
+    os.makedirs(output_directory, exist_ok=True)
+
+    shards = []
+    shard = None
+    written = 0
+    try:
+        for [batch] in dataloader:
+            if list(batch.shape[1:]) != shape:
+                raise ValidationException("Image size " + "x".join([str(d) for d in batch.shape[1:]]) + " does not match " + "x".join([str(d) for d in shape]) + ".  Use --crop or --resize.")
+            batch = batch.numpy()
+            while len(batch) > 0:
+                if shard is None or shard_written == len(shard):
+                    shard_count = min(shard_size, count - written)
+                    filename = "shard-%05d.npy" % len(shards)
+                    shard = np.lib.format.open_memmap(os.path.join(output_directory, filename), mode='w+', dtype=np.uint8, shape=tuple([shard_count] + shape))
+                    shards.append({"file": filename, "count": shard_count})
+                    shard_written = 0
+                n = min(len(batch), len(shard) - shard_written)
+                shard[shard_written:shard_written + n] = batch[:n]
+                shard_written += n
+                written += n
+                batch = batch[n:]
+                if shard_written == len(shard):
+                    shard.flush()
+            print("[hypergan] Packed %d/%d" % (written, count))
+    except RuntimeError as e:
+        raise ValidationException("Could not pack " + directory + ", images are not the same size.  Use --crop or --resize. (" + str(e) + ")")
+
+    index = {
+        "channels": config.channels,
+        "height": config.height,
+        "width": config.width,
+        "count": written,
+        "shards": shards
+    }
+    with open(os.path.join(output_directory, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+    return index
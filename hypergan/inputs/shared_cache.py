@@ -0,0 +1,68 @@
+import torch
+import torch.multiprocessing as mp
+import torch.utils.data as data
+
+class SharedImageCache:
+    """
+    Fixed size store of preprocessed uint8 images in shared memory
+
+    The cache is created once and passed to every process that loads from the same dataset, so
+    an image decoded by one backend worker is read from memory by the others.  Once `cache_bytes`
+    is used up, the least recently used image is evicted.
+    """
+    def __init__(self, count, shape, cache_bytes):
+        image_bytes = shape[0] * shape[1] * shape[2]
+        self.size = max(1, min(count, cache_bytes // image_bytes))
+        self.shape = list(shape)
+        self.images = torch.zeros([self.size] + self.shape, dtype=torch.uint8).share_memory_()
+        self.slot_of = torch.full([count], -1, dtype=torch.int64).share_memory_()
+        self.owner = torch.full([self.size], -1, dtype=torch.int64).share_memory_()
+        self.last_used = torch.full([self.size], -1, dtype=torch.int64).share_memory_()
+        self.clock = torch.zeros([1], dtype=torch.int64).share_memory_()
+        self.lock = mp.Lock()
+
+    def tick(self, slot):
+        self.last_used[slot] = self.clock[0]
+        self.clock[0] += 1
+
+    def get(self, index):
+        """Returns a copy of the cached image at dataset `index`, or None"""
+        with self.lock:
+            slot = int(self.slot_of[index])
+            if slot < 0:
+                return None
+            self.tick(slot)
+            return self.images[slot].clone()
+
+    def put(self, index, image):
+        """Stores `image` for dataset `index`, evicting the least recently used image if the cache is full"""
+        with self.lock:
+            if self.slot_of[index] >= 0:
+                return
+            slot = int(torch.argmin(self.last_used))
+            evicted = int(self.owner[slot])
+            if evicted >= 0:
+                self.slot_of[evicted] = -1
+            self.images[slot].copy_(image)
+            self.owner[slot] = index
+            self.slot_of[index] = slot
+            self.tick(slot)
+
+    def __len__(self):
+        return int((self.owner >= 0).sum())
+
+class CachedDataset(data.Dataset):
+    """Wraps a dataset of `[image]` items, reading and filling a `SharedImageCache`"""
+    def __init__(self, dataset, cache):
+        self.dataset = dataset
+        self.cache = cache
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index):
+        image = self.cache.get(index)
+        if image is None:
+            [image] = self.dataset[index]
+            self.cache.put(index, image)
+        return [image]
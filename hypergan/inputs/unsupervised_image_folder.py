@@ -1,4 +1,5 @@
 from PIL import Image
+from .manifest import Manifest
 import os
 import torch
 import torchvision
@@ -6,16 +7,28 @@ import torchvision
 class UnsupervisedImageFolder(torchvision.datasets.vision.VisionDataset):
     """
     Loads everything possible from a folder
+
+    The listing comes from a `Manifest` unless `manifest=False`.  Images that fail to decode are
+    quarantined and replaced by the next image in the folder.
+
+    With `draft_size=(width, height)` JPEGs are decoded at the smallest DCT scale (1/2, 1/4 or 1/8)
+    that is still at least that size.  Only use it when the transform shrinks to that size anyway.
     """
     def __init__(self, root, transform=None,
-                 target_transform=None, is_valid_file=None, mode=None):
+                 target_transform=None, is_valid_file=None, mode=None, manifest=None, draft_size=None):
         extensions = torchvision.datasets.folder.IMG_EXTENSIONS
-        if mode == "RGBA":
-            loader = self.rgba_loader
+        self.mode = mode or "RGB"
+        self.draft_size = draft_size
+        if mode == "RGBA" or draft_size is not None:
+            loader = self.pil_loader
         else:
             loader = torchvision.datasets.folder.default_loader
         super(UnsupervisedImageFolder, self).__init__(root, transform=transform,
                                             target_transform=target_transform)
+        if manifest is None or manifest is True:
+            manifest = Manifest(self.root)
+        self.manifest = manifest or None
+        self.quarantined = set()
         samples = self._make_dataset(self.root, extensions, is_valid_file)
         if len(samples) == 0:
             raise (RuntimeError("Found 0 files in subfolders of: " + self.root + "\n"
@@ -35,6 +48,8 @@ class UnsupervisedImageFolder(torchvision.datasets.vision.VisionDataset):
         if extensions is not None:
             def is_valid_file(x):
                 return torchvision.datasets.folder.has_file_allowed_extension(x, extensions)
+        if self.manifest:
+            return self.manifest.samples(is_valid_file)
         d = dir
         for root, _, fnames in sorted(os.walk(d, followlinks=True)):
             for fname in sorted(fnames):
@@ -45,19 +60,35 @@ class UnsupervisedImageFolder(torchvision.datasets.vision.VisionDataset):
         return images
 
     def __getitem__(self, index):
-        sample = self.loader(self.samples[index])
-        if self.transform is not None:
-            sample = self.transform(sample)
+        for i in range(len(self.samples)):
+            path = self.samples[(index + i) % len(self.samples)]
+            if path in self.quarantined:
+                continue
+            try:
+                sample = self.loader(path)
+            except (OSError, ValueError) as e:
+                self.quarantine(path, e)
+                continue
+            if self.transform is not None:
+                sample = self.transform(sample)
+            return [sample]
+        raise RuntimeError("No readable images in " + self.root)
 
-        return [sample]
+    def quarantine(self, path, error):
+        print("[hypergan] Warning: skipping unreadable image " + path + " (" + str(error) + ")")
+        self.quarantined.add(path)
+        if self.manifest:
+            self.manifest.quarantine(path)
 
     def __len__(self):
         return len(self.samples)
 
 
-    def rgba_loader(self, path):
+    def pil_loader(self, path):
         # open path as file to avoid ResourceWarning (https://github.com/python-pillow/Pillow/issues/835)
         with open(path, 'rb') as f:
             img = Image.open(f)
-            return img.convert('RGBA')
+            if self.draft_size is not None:
+                img.draft(None, self.draft_size)
+            return img.convert(self.mode)
 
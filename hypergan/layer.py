@@ -1,3 +1,4 @@
+import torch
 import torch.nn as nn
 
 class Layer(nn.Module):
@@ -14,3 +15,7 @@ class Layer(nn.Module):
 
     def latent_parameters(self):
         return []
+
+def is_channels_last(input):
+    """True for a 4-d tensor stored channels last (NHWC) instead of NCHW"""
+    return input.dim() == 4 and not input.is_contiguous() and input.is_contiguous(memory_format=torch.channels_last)
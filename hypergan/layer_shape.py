@@ -17,7 +17,7 @@ class LayerShape:
             self.width = dims[3]
 
     def squeeze_dims(self):
-        filter(lambda x: x == 1, self.dims)
+        return [x for x in self.dims if x != 1]
 
     def size(self):
         if len(self.dims) == 1:
@@ -32,36 +32,18 @@ class EfficientAttention(hg.Layer):
 
     def forward(self, input_, context):
         n, _, h, w = input_.size()
-        keys = self.keys(input_).reshape((n, self.key_channels, h * w))
-        queries = self.queries(input_).reshape(n, self.key_channels, h * w)
-        values = self.values(input_).reshape((n, self.value_channels, h * w))
         head_key_channels = self.key_channels // self.head_count
         head_value_channels = self.value_channels // self.head_count
-        
-        attended_values = []
-        for i in range(self.head_count):
-            key = f.softmax(keys[
-                :,
-                i * head_key_channels: (i + 1) * head_key_channels,
-                :
-            ], dim=2)
-            query = f.softmax(queries[
-                :,
-                i * head_key_channels: (i + 1) * head_key_channels,
-                :
-            ], dim=1)
-            value = values[
-                :,
-                i * head_value_channels: (i + 1) * head_value_channels,
-                :
-            ]
-            context = key @ value.transpose(1, 2)
-            attended_value = (
-                context.transpose(1, 2) @ query
-            ).reshape(n, head_value_channels, h, w)
-            attended_values.append(attended_value)
-
-        aggregated_values = torch.cat(attended_values, dim=1)
+        # every head in one batched matmul, [n, heads, head channels, h*w]
+        keys = self.keys(input_).reshape(n, self.key_channels, h * w)[:, :self.head_count * head_key_channels]
+        queries = self.queries(input_).reshape(n, self.key_channels, h * w)[:, :self.head_count * head_key_channels]
+        values = self.values(input_).reshape(n, self.value_channels, h * w)[:, :self.head_count * head_value_channels]
+        key = f.softmax(keys.reshape(n, self.head_count, head_key_channels, h * w), dim=3)
+        query = f.softmax(queries.reshape(n, self.head_count, head_key_channels, h * w), dim=2)
+        value = values.reshape(n, self.head_count, head_value_channels, h * w)
+
+        context = key @ value.transpose(2, 3)
+        aggregated_values = (context.transpose(2, 3) @ query).reshape(n, self.head_count * head_value_channels, h, w)
         reprojected_value = self.reprojection(aggregated_values)
         attention = reprojected_value
 
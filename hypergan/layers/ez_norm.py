@@ -1,5 +1,6 @@
 import torch.nn as nn
 import hypergan as hg
+from hypergan.layer import is_channels_last
 from hypergan.layer_shape import LayerShape
 
 class EzNorm(hg.Layer):
@@ -59,6 +60,9 @@ class EzNorm(hg.Layer):
 
     def forward(self, input, context):
         style = context[self.options.style or 'w']
+        if self.dim == 1 and is_channels_last(input):
+            # multiplied in NHWC so the output stays channels last
+            return (self.conv(input).permute(0, 2, 3, 1) * self.beta(style).view(input.shape[0], 1, 1, -1)).permute(0, 3, 1, 2)
         N = input.shape[0]
         D = input.shape[self.dim]
         view = [1 for x in input.shape]
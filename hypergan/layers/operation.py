@@ -6,6 +6,7 @@ import hyperchamber as hc
 import pyparsing
 
 from hypergan.gan_component import ValidationException
+from hypergan.modules.learned_noise import LearnedNoise
 
 class Operation(hg.Layer):
     """
@@ -22,6 +23,10 @@ class Operation(hg.Layer):
         self.layers, self.layer_names, self.layer_sizes = self.build_layers(component, args, options)
         for i, (layer, layer_name) in enumerate(zip(self.layers, self.layer_names)):
             self.add_module('layer_'+str(i)+"_"+layer_name, layer)
+        self.sources = [self.resolve_source(layer, layer_name, component) for layer, layer_name in zip(self.layers, self.layer_names)]
+        if operation not in ["+", "*", "cat"]:
+            raise ValidationException("Unknown operation: "+ operation)
+        self.mean = bool(self.options.mean)
 
     def build_layers(self, component, args, options):
         options = hc.Config(options)
@@ -37,7 +42,7 @@ class Operation(hg.Layer):
                 layer_shapes.append(self.size)
             elif arg == 'noise':
                 layers.append(LearnedNoise())
-                layer_names.append(None)
+                layer_names.append("noise")
                 layer_shapes.append(self.size)
             elif arg in component.named_layers:
                 layers.append(None)
@@ -51,10 +56,9 @@ class Operation(hg.Layer):
                 layers.append(None)
                 layer_names.append(arg)
                 layer_shapes.append(component.context_shapes[arg])
-            elif type(arg) == pyparsing.ParseResults and type(arg[0]) == hg.parser.Pattern:
-                parsed = arg[0]
-                parsed.parsed_options = hc.Config(parsed.options)
-                layer = component.build_layer(parsed.layer_name, parsed.args, parsed.parsed_options)
+            elif hg.parser.nested_pattern(arg) is not None:
+                parsed = hg.parser.nested_pattern(arg)
+                layer = component.build_layer(parsed.layer_name, list(parsed.args), parsed.parsed_options)
                 layers.append(layer)
                 layer_names.append(parsed.layer_name)
                 layer_shapes.append(component.current_size)
@@ -62,34 +66,41 @@ class Operation(hg.Layer):
                 raise ValidationException("Could not parse operation layer '" + arg + "'")
         return layers, layer_names, layer_shapes
 
+    def resolve_source(self, layer, layer_name, component):
+        """Returns `(kind, key)` describing where each operand is read from, so `forward` does not parse layer names"""
+        if layer_name == "self":
+            return ("input", None)
+        if isinstance(layer, hg.Layer):
+            return ("hg_layer", None)
+        if layer_name is not None and layer_name.split(" ")[0] == 'layer':
+            return ("context", layer_name.split(" ")[1])
+        if layer is None:
+            return ("context", layer_name)
+        return ("module", None)
+
     def output_size(self):
         return self.size
 
     def forward(self, input, context):
         output = None
-        for layer, layer_name in zip(self.layers, self.layer_names):
-            if layer_name == "self":
+        for layer, (kind, key) in zip(self.layers, self.sources):
+            if kind == "input":
                 layer_output = input
-            elif isinstance(layer, hg.Layer):
+            elif kind == "context":
+                layer_output = context[key]
+            elif kind == "hg_layer":
                 layer_output = layer(input, context)
-            elif layer_name.split(" ")[0] == 'layer':
-                layer_output = context[layer_name.split(" ")[1]]
-            elif layer_name in context:
-                layer_output = context[layer_name]
             else:
                 layer_output = layer(input)
             if output is None:
                 output = layer_output
+            elif self.operation == "+":
+                output = output + layer_output
+            elif self.operation == "*":
+                output = output * layer_output
             else:
-                if self.operation == "+":
-                    output = output + layer_output
-                elif self.operation == "*":
-                    output = output * layer_output
-                elif self.operation == "cat":
-                    output = torch.cat([output, layer_output], 1)
-                else:
-                    raise ValidationException("Unknown operation: "+ self.operation)
-        if self.options.mean:
+                output = torch.cat([output, layer_output], 1)
+        if self.mean:
             output /= len(self.layers)
 
         return output
@@ -2,6 +2,7 @@ import torch.nn as nn
 import torch
 from hypergan.layer_shape import LayerShape
 import hypergan as hg
+from hypergan.layer import is_channels_last
 
 class SegmentSoftmax(hg.Layer):
     """
@@ -62,4 +63,7 @@ class SegmentSoftmax(hg.Layer):
         segment = segment.view(*new_shape)
         selection = self.softmax(segment)
         rendered = (selection * net_in).sum(dim=1).view([input.shape[0]]+list(self.output_size().dims))
+        if is_channels_last(input):
+            # the strided views above are faster than a NHWC softmax, only the small output is copied back
+            return rendered.contiguous(memory_format=torch.channels_last)
         return rendered
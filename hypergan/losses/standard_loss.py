@@ -8,8 +8,6 @@ class StandardLoss(BaseLoss):
     def __init__(self, gan, config):
         super(StandardLoss, self).__init__(gan, config)
         self.relu = torch.nn.ReLU()
-        self.two = torch.Tensor([2.0]).cuda()
-        self.eps = torch.Tensor([1e-12]).cuda()
 
     def _forward(self, d_real, d_fake):
         criterion = torch.nn.BCEWithLogitsLoss()
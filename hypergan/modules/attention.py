@@ -1,11 +1,87 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
+
+def chunked_attention_forward(q, k, v, chunk_size):
+    """softmax(q k^T) v and the logsumexp of each query, one `chunk_size` block of queries and keys at a time"""
+    n = q.shape[1]
+    outs, lses = [], []
+    for i in range(0, n, chunk_size):
+        qi = q[:, i:i+chunk_size]
+        m = None
+        for j in range(0, n, chunk_size):
+            s = torch.bmm(qi, k[:, j:j+chunk_size].transpose(1,2))
+            m_j = s.amax(-1, keepdim=True)
+            if m is None:
+                m = m_j
+                p = torch.exp(s - m)
+                l = p.sum(-1, keepdim=True)
+                acc = torch.bmm(p, v[:, j:j+chunk_size])
+            else:
+                m_new = torch.maximum(m, m_j)
+                scale = torch.exp(m - m_new)
+                p = torch.exp(s - m_new)
+                l = l * scale + p.sum(-1, keepdim=True)
+                acc = acc * scale + torch.bmm(p, v[:, j:j+chunk_size])
+                m = m_new
+        outs.append(acc / l)
+        lses.append((m + torch.log(l)).squeeze(-1))
+    return torch.cat(outs, 1), torch.cat(lses, 1)
+
+def chunked_attention_backward(q, k, v, out, lse, d_out, d_lse, chunk_size):
+    """Gradients of `chunked_attention_forward` for q, k and v, recomputing each block of the attention map"""
+    n = q.shape[1]
+    delta = (d_out * out).sum(-1) - d_lse
+    blocks = range(0, n, chunk_size)
+    dq = []
+    dk = [0 for j in blocks]
+    dv = [0 for j in blocks]
+    for i in blocks:
+        qi, d_out_i = q[:, i:i+chunk_size], d_out[:, i:i+chunk_size]
+        lse_i, delta_i = lse[:, i:i+chunk_size, None], delta[:, i:i+chunk_size, None]
+        dqi = 0
+        for b, j in enumerate(blocks):
+            kj, vj = k[:, j:j+chunk_size], v[:, j:j+chunk_size]
+            p = torch.exp(torch.bmm(qi, kj.transpose(1,2)) - lse_i)
+            dv[b] = dv[b] + torch.bmm(p.transpose(1,2), d_out_i)
+            ds = p * (torch.bmm(d_out_i, vj.transpose(1,2)) - delta_i)
+            dqi = dqi + torch.bmm(ds, kj)
+            dk[b] = dk[b] + torch.bmm(ds.transpose(1,2), qi)
+        dq.append(dqi)
+    return torch.cat(dq, 1), torch.cat(dk, 1), torch.cat(dv, 1)
+
+class ChunkedAttention(torch.autograd.Function):
+    """
+    softmax(q k^T) v over `[batch, positions, channels]` with an online softmax, so no more than a `chunk_size`
+    square block of the attention map exists at once.  Only the output and each query's logsumexp are kept for
+    backward.  The backward pass is made of differentiable ops, so gradients of gradients, as the gradient penalty
+    and adversarial norm hooks take, work as they do through the attention map.
+    """
+    @staticmethod
+    def forward(ctx, q, k, v, chunk_size):
+        out, lse = chunked_attention_forward(q, k, v, chunk_size)
+        ctx.save_for_backward(q, k, v, out, lse)
+        ctx.chunk_size = chunk_size
+        return out, lse
+
+    @staticmethod
+    def backward(ctx, d_out, d_lse):
+        q, k, v, out, lse = ctx.saved_tensors
+        return chunked_attention_backward(q, k, v, out, lse, d_out, d_lse, ctx.chunk_size) + (None,)
 
 class Attention(nn.Module):
-    """ Self attention Layer from https://github.com/heykeetae/Self-Attention-GAN/blob/master/sagan_models.py """
-    def __init__(self,in_dim):
+    """
+    Self attention Layer from https://github.com/heykeetae/Self-Attention-GAN/blob/master/sagan_models.py
+
+    Above `efficient_size` positions (width * height) the attention map is not materialized.  With gradients it is
+    computed by `ChunkedAttention` in `chunk_size` blocks, and without them by PyTorch's fused attention kernel, which
+    has no double backward.
+    """
+    def __init__(self,in_dim, efficient_size=256, chunk_size=1024):
         super(Attention,self).__init__()
         self.chanel_in = in_dim
+        self.efficient_size = efficient_size
+        self.chunk_size = chunk_size
         self.f = nn.Conv2d(in_channels = in_dim , out_channels = in_dim , kernel_size= 1)
         self.g = nn.Conv2d(in_channels = in_dim , out_channels = in_dim, kernel_size= 1)
         self.h = nn.Conv2d(in_channels = in_dim , out_channels = in_dim , kernel_size= 1)
@@ -15,6 +91,8 @@ class Attention(nn.Module):
         self.softmax  = nn.Softmax(dim=1) #
     def forward(self,x):
         m_batchsize,C,width ,height = x.size()
+        if width * height > self.efficient_size:
+            return self.v(self.efficient_attention(x))
         f  = self.f(x).view(m_batchsize,C,width*height).permute(0,2,1)
         g =  self.g(x).view(m_batchsize,C,width*height)
         fg =  torch.bmm(f,g)
@@ -23,3 +101,18 @@ class Attention(nn.Module):
 
         fgh = torch.bmm(h, attention_map )
         return self.v(fgh.view(x.shape))
+
+    def efficient_attention(self, x):
+        """
+        `fgh` from `forward` without the attention map.  The softmax is over f for each position of g, so g is the
+        query.  Fused kernels need [batch, positions, channels] inputs with contiguous channels.
+        """
+        m_batchsize,C,width ,height = x.size()
+        f = self.f(x).reshape(m_batchsize,C,width*height).transpose(1,2).contiguous()
+        g = self.g(x).reshape(m_batchsize,C,width*height).transpose(1,2).contiguous()
+        h = self.h(x).reshape(m_batchsize,C,width*height).transpose(1,2).contiguous()
+        if torch.is_grad_enabled():
+            fgh, _ = ChunkedAttention.apply(g, f, h, self.chunk_size)
+        else:
+            fgh = F.scaled_dot_product_attention(g, f, h, scale=1.0)
+        return fgh.transpose(1,2).reshape(x.shape)
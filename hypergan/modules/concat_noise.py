@@ -7,6 +7,6 @@ class ConcatNoise(nn.Module):
         super(ConcatNoise, self).__init__()
         self.z = uniform.Uniform(torch.Tensor([-1.0]),torch.Tensor([1.0]))
     def forward(self, x):
-        noise = self.z.sample(x.shape).cuda()
+        noise = self.z.sample(x.shape).to(x.device)
         cat = torch.cat([x, noise.view(*x.shape)], 1)
         return cat
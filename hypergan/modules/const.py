@@ -7,4 +7,4 @@ class Const(nn.Module):
         self.weight = nn.Parameter(torch.randn(1, c, h, w) * mul)
 
     def forward(self, _input):
-        return self.weight
+        return self.weight.expand(_input.shape[0], -1, -1, -1)
@@ -3,6 +3,7 @@ from torch import nn
 
 import os
 import math
+import weakref
 
 import torch
 from torch.autograd import Function
@@ -11,17 +12,34 @@ import torch.nn.functional as F
 
 
 module_path = os.path.dirname(__file__)
+EXTENSIONS_DIRECTORY = "~/.hypergan/extensions"
 _upfirdn2d_op = None
+_upfirdn2d_error = None
+
+def extensions_directory():
+    """Where compiled extensions are kept.  Set `HYPERGAN_EXTENSIONS_DIR` to share prebuilt extensions between workers"""
+    directory = os.path.expanduser(os.environ.get("HYPERGAN_EXTENSIONS_DIR", EXTENSIONS_DIRECTORY))
+    os.makedirs(directory, exist_ok=True)
+    return directory
 
 def upfirdn2d_op():
-    global _upfirdn2d_op
-    if _upfirdn2d_op is None:
-        _upfirdn2d_op = load(
-            'upfirdn2d',
-            sources=[
-                os.path.join(module_path, 'upfirdn2d.cpp'),
-                os.path.join(module_path, 'upfirdn2d_kernel.cu'),
-            ])
+    """
+    The upfirdn2d CUDA extension, compiled on first use, or None if it cannot be built.  Builds are reused from
+    `extensions_directory()` while the sources are unchanged.
+    """
+    global _upfirdn2d_op, _upfirdn2d_error
+    if _upfirdn2d_op is None and _upfirdn2d_error is None:
+        try:
+            _upfirdn2d_op = load(
+                'upfirdn2d',
+                sources=[
+                    os.path.join(module_path, 'upfirdn2d.cpp'),
+                    os.path.join(module_path, 'upfirdn2d_kernel.cu'),
+                ],
+                build_directory=extensions_directory())
+        except Exception as e:
+            _upfirdn2d_error = e
+            print("[hypergan] Warning: upfirdn2d CUDA extension unavailable, using the PyTorch implementation: " + str(e))
     return _upfirdn2d_op
 
 def make_kernel(k):
@@ -161,6 +179,8 @@ class UpFirDn2d(Function):
 
 
 def upfirdn2d(input, kernel, up=1, down=1, pad=(0, 0)):
+    if not input.is_cuda or upfirdn2d_op() is None:
+        return upfirdn2d_pytorch(input, kernel, up, down, pad)
     out = UpFirDn2d.apply(
         input, kernel, (up, up), (down, down), (pad[0], pad[1], pad[0], pad[1])
     )
@@ -168,6 +188,47 @@ def upfirdn2d(input, kernel, up=1, down=1, pad=(0, 0)):
     return out
 
 
+_filters = {}
+
+def upfirdn2d_filter(kernel, channels, up, pad):
+    """
+    The depthwise weight and output crop used by `upfirdn2d_pytorch`, cached by kernel, channels, up factor and
+    padding.  Entries are dropped along with their kernel.
+    """
+    key = (id(kernel), kernel._version, kernel.device, kernel.dtype, channels, up, pad)
+    cached = _filters.get(key)
+    if cached is not None and cached[0]() is kernel:
+        return cached[1]
+    kernel_h, kernel_w = kernel.shape
+    if up == 1:
+        # a correlation with the flipped kernel after padding
+        weight = torch.flip(kernel, [0, 1])
+        crop = (pad[0], pad[1], pad[0], pad[1])
+    else:
+        # conv_transpose2d scatters the kernel at every `up`th position, the same as convolving the zero
+        # upsampled input.  Padding then becomes a crop of its output
+        weight = kernel
+        crop = (pad[0] - kernel_w + 1, pad[1] + up - kernel_w, pad[0] - kernel_h + 1, pad[1] + up - kernel_h)
+    weight = weight.detach().expand(channels, 1, kernel_h, kernel_w).contiguous()
+    _filters[key] = (weakref.ref(kernel, lambda ref, key=key: _filters.pop(key, None)), (weight, crop))
+    return weight, crop
+
+def upfirdn2d_pytorch(input, kernel, up=1, down=1, pad=(0, 0)):
+    """
+    `upfirdn2d` with PyTorch ops, used when the CUDA extension is unavailable.  One depthwise convolution over
+    `[batch, channels, height, width]`, strided for `down` and transposed for `up`.
+    """
+    channels = input.shape[1]
+    weight, crop = upfirdn2d_filter(kernel, channels, up, tuple(pad))
+    weight = weight.to(input.dtype)
+    if up == 1:
+        return F.conv2d(F.pad(input, crop), weight, stride=down, groups=channels)
+    out = F.pad(F.conv_transpose2d(input, weight, stride=up, groups=channels), crop)
+    if down > 1:
+        out = out[:, :, ::down, ::down]
+    return out
+
+
 def upfirdn2d_native(
     input, kernel, up_x, up_y, down_x, down_y, pad_x0, pad_x1, pad_y0, pad_y1
 ):
@@ -269,10 +330,12 @@ class ModulatedConv2d(nn.Module):
             downsample=False,
             lr_mul=1.0,
             blur_kernel=[1, 3, 3, 1],
+            shared_style=False,
             ):
         super(ModulatedConv2d, self).__init__()
 
         self.eps = 1e-8
+        self.shared_style = shared_style
         self.kernel_size = kernel_size
         self.in_channel = in_channel
         self.out_channel = out_channel
@@ -307,16 +370,38 @@ class ModulatedConv2d(nn.Module):
 
         self.demodulate = demodulate
 
-    def forward(self, input, style):
-        batch, in_channel, height, width = input.shape
-
-        style = self.modulation(style).view(batch, 1, in_channel, 1, 1)
+    def shares_style(self, style, batch):
+        """
+        True when every sample uses the same style: a `[1, style_dim]` style, one expanded from it, or `shared_style`.
+        Only shapes and strides are checked so no device sync is needed.  The weights are then modulated once for a
+        plain batched conv.
+        """
+        return style.shape[0] == 1 or style.stride(0) == 0 or self.shared_style
+
+    def modulated_weight(self, style):
+        """`[styles, out_channel, in_channel, kernel_size, kernel_size]` weights modulated by each style"""
+        styles = style.shape[0]
+        style = self.modulation(style).view(styles, 1, self.in_channel, 1, 1)
         weight = self.scale * self.mod_weight * style
 
         if self.demodulate:
             demod = torch.rsqrt(weight.pow(2).sum([2, 3, 4]) + 1e-8)
-            weight = weight * demod.view(batch, self.out_channel, 1, 1, 1)
+            weight = weight * demod.view(styles, self.out_channel, 1, 1, 1)
+        return weight
+
+    def forward(self, input, style):
+        batch, in_channel, height, width = input.shape
 
+        if self.shares_style(style, batch):
+            weight = self.modulated_weight(style[:1])[0]
+            if self.upsample:
+                out = F.conv_transpose2d(input, weight.transpose(0, 1), padding=0, stride=2)
+                return self.blur(out)
+            if self.downsample:
+                return F.conv2d(self.blur(input), weight, padding=0, stride=2)
+            return F.conv2d(input, weight, padding=self.padding)
+
+        weight = self.modulated_weight(style)
         weight = weight.view(
             batch * self.out_channel, in_channel, self.kernel_size, self.kernel_size
         )
@@ -349,5 +434,3 @@ class ModulatedConv2d(nn.Module):
             out = out.view(batch, self.out_channel, height, width)
 
         return out
-
-
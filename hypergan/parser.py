@@ -1,49 +1,167 @@
+import hyperchamber as hc
+import json
+import os
 import pyparsing
+from types import MappingProxyType
 from pyparsing import alphas, alphanums, delimitedList, replaceWith, nestedExpr, oneOf, pyparsing_common, Dict, Forward, Keyword, Group, Suppress, Word, ZeroOrMore
 
+PARSE_CACHE_VERSION = 1
+
 class Pattern:
+    """
+    A parsed layer definition.
+
+    Patterns are shared between components through the parse cache, so they are frozen once parsed:
+    `args` is a tuple, `options` is read only and a nested definition such as `(conv 4)` is a
+    tuple holding one Pattern.  Use `parsed_options` for a mutable copy of the options.
+    """
     def __init__(self, tokens):
         self.__dict__.update(tokens.asDict())
         args = list(tokens[1:-1])
         if args != [[]]:
             self.args = args
+        self.layer_defn = None
+
+    def freeze(self, layer_defn=None):
+        self.__dict__["args"] = tuple([freeze_value(arg) for arg in self.args])
+        self.__dict__["options"] = MappingProxyType({k: freeze_value(v) for k, v in self.options.items()})
+        self.__dict__["layer_defn"] = layer_defn
+        self.__dict__["frozen"] = True
+        return self
+
+    @property
+    def parsed_options(self):
+        return hc.Config(self.options)
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("frozen"):
+            raise AttributeError("Parsed layer '" + str(self.layer_defn) + "' is shared and cannot be modified")
+        self.__dict__[name] = value
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["options"] = dict(state["options"])
+        return state
+
+    def __setstate__(self, state):
+        state["options"] = MappingProxyType(state["options"])
+        self.__dict__.update(state)
 
     def to_list(self):
-        return [self.layer_name, list(self.args), self.options]
+        return [self.layer_name, list(self.args), dict(self.options)]
+
+def freeze_value(value):
+    if isinstance(value, Pattern):
+        return value.freeze()
+    if isinstance(value, (pyparsing.ParseResults, list, tuple)):
+        return tuple([freeze_value(v) for v in value])
+    return value
+
+def nested_pattern(value):
+    """Returns the Pattern of a nested layer definition such as `(conv 4)`, otherwise None"""
+    if isinstance(value, tuple) and len(value) == 1 and isinstance(value[0], Pattern):
+        return value[0]
+    return None
+
+def pattern_to_json(pattern):
+    def encode(value):
+        nested = nested_pattern(value)
+        if nested is not None:
+            return {"pattern": pattern_to_json(nested)}
+        return value
+    return [pattern.layer_name, [encode(a) for a in pattern.args], {k: encode(v) for k, v in pattern.options.items()}]
+
+def pattern_from_json(data, layer_defn=None):
+    def decode(value):
+        if isinstance(value, dict):
+            return (pattern_from_json(value["pattern"]),)
+        return value
+    pattern = Pattern.__new__(Pattern)
+    pattern.__dict__.update({"layer_name": data[0], "args": [decode(a) for a in data[1]], "options": {k: decode(v) for k, v in data[2].items()}})
+    return pattern.freeze(layer_defn)
+
+def convert_dict(s, l, toks):
+    retv = {}
+    for sublist in toks:
+        retv[sublist[0]] = sublist[1]
+    return retv
+
+def convert_list(s, l, toks):
+    if len(toks) == 0:
+        return [[]]
+
+    return list(toks)
+
+def build_grammar():
+    FALSE = Keyword("false")
+    NULL = Keyword("null")
+    TRUE = Keyword("true")
+    FALSE.setParseAction(replaceWith(False))
+    NULL.setParseAction(replaceWith(None))
+    TRUE.setParseAction(replaceWith(True))
+    pattern = Forward()
+    label = Word(alphas, alphanums+"_").setResultsName("layer_name")
+    configurable_param = nestedExpr(content = pattern)
+    arg = (NULL ^ FALSE ^ TRUE ^ pyparsing_common.number ^ (Word(alphanums+"*_") + ~ Word("=")) ^ configurable_param)
+    args = arg[...].setResultsName("args")
+    args.setParseAction(convert_list)
+    options = Dict(Group(Word(alphanums+"_") + Suppress("=") + arg))[...].setResultsName("options")
+    options.setParseAction(convert_dict)
+    pattern <<= label + args + options
+    pattern.setParseAction(Pattern)
+    return pattern
 
 class Parser:
-    def __init__(self):
-        FALSE = Keyword("false")
-        NULL = Keyword("null")
-        TRUE = Keyword("true")
-        FALSE.setParseAction(replaceWith(False))
-        NULL.setParseAction(replaceWith(None))
-        TRUE.setParseAction(replaceWith(True))
-        pattern = Forward()
-        label = Word(alphas, alphanums+"_").setResultsName("layer_name")
-        configurable_param = nestedExpr(content = pattern)
-        arg = (NULL ^ FALSE ^ TRUE ^ pyparsing_common.number ^ (Word(alphanums+"*_") + ~ Word("=")) ^ configurable_param)
-        args = arg[...].setResultsName("args")
-        args.setParseAction(self.convert_list)
-        options = Dict(Group(Word(alphanums+"_") + Suppress("=") + arg))[...].setResultsName("options")
-        options.setParseAction(self.convert_dict)
-        pattern <<= label + args + options
-        pattern.setParseAction(Pattern)
-        self.pattern = pattern
-
-    def convert_dict(self, s, l, toks):
-        retv = {}
-        for sublist in toks:
-            retv[sublist[0]] = sublist[1]
-        return retv
-
-    def convert_list(self, s, l, toks):
-        if len(toks) == 0:
-            return [[]]
-
-        return list(toks)
+    """
+    Parses layer definitions such as `conv 64 stride=2`.
+
+    Results are kept in a process wide cache keyed by the definition string, and the grammar is built
+    once per process on the first cache miss, so creating a `Parser` is free.  `load_cache` and
+    `save_cache` persist the cache as json so new processes skip parsing entirely.
+    """
+    grammar = None
+    cache = {}
+    cache_path = None
+    cache_dirty = False
 
     def parse_string(self, string):
+        parsed = Parser.cache.get(string)
+        if parsed is None:
+            if Parser.grammar is None:
+                Parser.grammar = build_grammar()
+            parsed = Parser.grammar.parseString(string, parseAll=True)[0].freeze(string)
+            Parser.cache[string] = parsed
+            Parser.cache_dirty = True
+        return parsed
+
+    @staticmethod
+    def load_cache(path):
+        """Adds the layers stored at `path` to the cache and remembers `path` for `save_cache`"""
+        Parser.cache_path = path
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get("version") != PARSE_CACHE_VERSION:
+            return 0
+        for layer_defn, pattern in data["layers"].items():
+            if layer_defn not in Parser.cache:
+                Parser.cache[layer_defn] = pattern_from_json(pattern, layer_defn)
+        return len(data["layers"])
 
-        parsed = self.pattern.parseString(string, parseAll=True)
-        return parsed[0]
+    @staticmethod
+    def save_cache(path=None):
+        """Writes the cache to `path` (default: the path given to `load_cache`) if anything new was parsed"""
+        path = path or Parser.cache_path
+        if path is None or not Parser.cache_dirty:
+            return
+        data = {"version": PARSE_CACHE_VERSION, "layers": {layer_defn: pattern_to_json(pattern) for layer_defn, pattern in Parser.cache.items()}}
+        try:
+            tmp_path = path + "." + str(os.getpid()) + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, path)
+            Parser.cache_dirty = False
+        except (OSError, TypeError) as e:
+            print("[hypergan] Warning: could not write parse cache " + path + ": " + str(e))
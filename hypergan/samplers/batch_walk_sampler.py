@@ -17,9 +17,9 @@ class BatchWalkSampler(BaseSampler):
         self.pos = self.latent1
         self.direction = direction / torch.norm(direction, p=2, dim=1, keepdim=True).expand_as(direction)
         self.hardtanh = nn.Hardtanh()
-        self.ones = torch.ones_like(self.direction, device="cuda:0")
-        self.mask = torch.cat([torch.zeros([1, direction.shape[1]//2]), torch.ones([1, direction.shape[1]//2])], dim=1).cuda()
-        self.mask = torch.ones_like(self.mask).cuda()
+        self.ones = torch.ones_like(self.direction)
+        self.mask = torch.cat([torch.zeros([1, direction.shape[1]//2]), torch.ones([1, direction.shape[1]//2])], dim=1).to(direction.device)
+        self.mask = torch.ones_like(self.mask)
         #self.mask = 1 - self.mask
 
     def compatible_with(gan):
@@ -27,9 +27,9 @@ class FactorizationBatchWalkSampler(BaseSampler):
         self.index = 0
         self.direction = self.eigvec[:, self.index].unsqueeze(0)
         self.direction = self.direction / torch.norm(self.direction)
-        self.ones = torch.ones_like(self.direction, device="cuda:0")
-        self.mask = torch.cat([torch.zeros([1, direction.shape[1]//2]), torch.ones([1, direction.shape[1]//2])], dim=1).cuda()
-        self.mask = torch.ones_like(self.mask).cuda()
+        self.ones = torch.ones_like(self.direction)
+        self.mask = torch.cat([torch.zeros([1, direction.shape[1]//2]), torch.ones([1, direction.shape[1]//2])], dim=1).to(direction.device)
+        self.mask = torch.ones_like(self.mask)
         self.steps = 30
 
     def compatible_with(gan):
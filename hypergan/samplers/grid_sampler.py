@@ -19,12 +19,12 @@ class GridSampler(BaseSampler):
         gs = []
         for i in range(int(needed)):
             zi = z[i*gan.batch_size():(i+1)*gan.batch_size()]
-            zi = torch.from_numpy(zi).type(torch.FloatTensor).cuda()
+            zi = torch.from_numpy(zi).type(torch.FloatTensor).to(gan.device)
             g = gan.generator(zi).detach().cpu().numpy()
             gs.append(g)
         g = np.reshape(gs, [4, 8, gan.channels(), gan.height(), gan.width()])
         g = np.concatenate(g, axis=0)
-        g = torch.from_numpy(g).cuda()
+        g = torch.from_numpy(g).to(gan.device)
         #x_hat = gan.session.run(gan.autoencoded_x, feed_dict={gan.inputs.x: self.x})
         #e = gan.session.run(gan.encoder.sample, feed_dict={gan.inputs.x: g})
 
@@ -16,3 +16,8 @@ class TrainHookCollection:
         for hook in self.gan.hooks:
             g = hook.augment_g(g)
         return g
+
+    def augment_xg(self, x, g):
+        for hook in self.gan.hooks:
+            x, g = hook.augment_xg(x, g)
+        return x, g
@@ -21,6 +21,9 @@ class BaseTrainHook(GANComponent):
     def augment_g(self, g):
         return g
 
+    def augment_xg(self, x, g):
+        return self.augment_x(x), self.augment_g(g)
+
     def create(self):
         pass
 
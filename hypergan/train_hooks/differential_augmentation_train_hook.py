@@ -12,11 +12,20 @@ class DifferentialAugmentationTrainHook(BaseTrainHook):
         Differentiable Augmentation for Data-Efficient GAN Training
         Shengyu Zhao, Zhijian Liu, Ji Lin, Jun-Yan Zhu, and Song Han
         https://arxiv.org/pdf/2006.10738
+
+        `policy` is a comma separated list of `color`, `translation` and `cutout`.  With `joint: true` the real and
+        generated batches are augmented in one call.  That saves kernel launches for small images on the GPU, but
+        backward then runs over the real batch too.
     """
     def augment_x(self, x):
         return DiffAugment(x, policy=self.config.policy or '')
     def augment_g(self, g):
         return DiffAugment(g, policy=self.config.policy or '')
+    def augment_xg(self, x, g):
+        if not self.config.joint or x.shape[1:] != g.shape[1:]:
+            return BaseTrainHook.augment_xg(self, x, g)
+        xg = DiffAugment(torch.cat([x, g]), policy=self.config.policy or '')
+        return xg[:x.shape[0]], xg[x.shape[0]:]
 
 def DiffAugment(x, policy='', channels_first=True):
     if policy:
@@ -31,6 +40,16 @@ def DiffAugment(x, policy='', channels_first=True):
     return x
 
 
+_positions = {}
+
+def positions(size, device):
+    """`torch.arange(size)`, cached per size and device for the translation and cutout index grids"""
+    key = (size, str(device))
+    if key not in _positions:
+        _positions[key] = torch.arange(size, dtype=torch.long, device=device)
+    return _positions[key]
+
+
 def rand_brightness(x):
     x = x + (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) - 0.5)
     return x
@@ -48,19 +67,32 @@ def rand_contrast(x):
     return x
 
 
+def rand_color(x):
+    """
+    `rand_brightness`, `rand_saturation` then `rand_contrast` as one multiply-add over `x`.  Brightness moves the
+    channel mean, saturation scales around it and contrast scales around the image mean, so together they are
+    `x * saturation * contrast` plus an offset from the channel and image means.
+    """
+    brightness = torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) - 0.5
+    saturation = torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) * 2
+    contrast = torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) + 0.5
+    channel_mean = x.mean(dim=1, keepdim=True)
+    image_mean = channel_mean.mean(dim=[2, 3], keepdim=True)
+    scale = saturation * contrast
+    offset = channel_mean * (contrast - scale) + image_mean * (1 - contrast) + brightness
+    return torch.addcmul(offset, x, scale)
+
+
 def rand_translation(x, ratio=0.125):
     shift_x, shift_y = int(x.size(2) * ratio + 0.5), int(x.size(3) * ratio + 0.5)
     translation_x = torch.randint(-shift_x, shift_x + 1, size=[x.size(0), 1, 1], device=x.device)
     translation_y = torch.randint(-shift_y, shift_y + 1, size=[x.size(0), 1, 1], device=x.device)
-    grid_batch, grid_x, grid_y = torch.meshgrid(
-        torch.arange(x.size(0), dtype=torch.long, device=x.device),
-        torch.arange(x.size(2), dtype=torch.long, device=x.device),
-        torch.arange(x.size(3), dtype=torch.long, device=x.device),
-    )
-    grid_x = torch.clamp(grid_x + translation_x + 1, 0, x.size(2) + 1)
-    grid_y = torch.clamp(grid_y + translation_y + 1, 0, x.size(3) + 1)
+    # rows then columns of the zero padded input, shifted per sample
+    grid_x = torch.clamp(positions(x.size(2), x.device).view(1, 1, -1, 1) + translation_x.unsqueeze(1) + 1, 0, x.size(2) + 1)
+    grid_y = torch.clamp(positions(x.size(3), x.device).view(1, 1, 1, -1) + translation_y.unsqueeze(1) + 1, 0, x.size(3) + 1)
     x_pad = F.pad(x, [1, 1, 1, 1, 0, 0, 0, 0])
-    x = x_pad.permute(0, 2, 3, 1).contiguous()[grid_batch, grid_x, grid_y].permute(0, 3, 1, 2)
+    x = x_pad.gather(2, grid_x.expand(-1, x.size(1), -1, x.size(3) + 2))
+    x = x.gather(3, grid_y.expand(-1, x.size(1), x.size(2), -1))
     return x
 
 
@@ -68,21 +100,17 @@ def rand_cutout(x, ratio=0.5):
     cutout_size = int(x.size(2) * ratio + 0.5), int(x.size(3) * ratio + 0.5)
     offset_x = torch.randint(0, x.size(2) + (1 - cutout_size[0] % 2), size=[x.size(0), 1, 1], device=x.device)
     offset_y = torch.randint(0, x.size(3) + (1 - cutout_size[1] % 2), size=[x.size(0), 1, 1], device=x.device)
-    grid_batch, grid_x, grid_y = torch.meshgrid(
-        torch.arange(x.size(0), dtype=torch.long, device=x.device),
-        torch.arange(cutout_size[0], dtype=torch.long, device=x.device),
-        torch.arange(cutout_size[1], dtype=torch.long, device=x.device),
-    )
-    grid_x = torch.clamp(grid_x + offset_x - cutout_size[0] // 2, min=0, max=x.size(2) - 1)
-    grid_y = torch.clamp(grid_y + offset_y - cutout_size[1] // 2, min=0, max=x.size(3) - 1)
-    mask = torch.ones(x.size(0), x.size(2), x.size(3), dtype=x.dtype, device=x.device)
-    mask[grid_batch, grid_x, grid_y] = 0
-    x = x * mask.unsqueeze(1)
+    start_x = offset_x - cutout_size[0] // 2
+    start_y = offset_y - cutout_size[1] // 2
+    grid_x = positions(x.size(2), x.device).view(1, -1, 1)
+    grid_y = positions(x.size(3), x.device).view(1, 1, -1)
+    inside = (grid_x >= start_x) & (grid_x < start_x + cutout_size[0]) & (grid_y >= start_y) & (grid_y < start_y + cutout_size[1])
+    x = x * (~inside).to(x.dtype).unsqueeze(1)
     return x
 
 
 AUGMENT_FNS = {
-    'color': [rand_brightness, rand_saturation, rand_contrast],
+    'color': [rand_color],
     'translation': [rand_translation],
     'cutout': [rand_cutout],
 }
@@ -32,7 +32,7 @@ class GradientPenaltyTrainHook(BaseTrainHook):
     elif self.config.input == 'g':
         inp = g
     else:
-        alpha = torch.rand(self.gan.batch_size(), 1, 1, 1).cuda()
+        alpha = torch.rand(x.shape[0], 1, 1, 1, device=x.device)
         inp = alpha * x + (1 - alpha) * g
     #inp = inp(interpolated, requires_grad=True).cuda()
 
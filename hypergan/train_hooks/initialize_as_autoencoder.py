@@ -22,7 +22,7 @@ class InitializeAsAutoencoder(BaseTrainHook):
 
         defn = self.config.encoder.copy()
         klass = GANComponent.lookup_function(None, defn['class'])
-        encode = klass(self.gan, defn).cuda()
+        encode = klass(self.gan, defn).to(self.gan.device)
         defn = self.config.optimizer.copy()
         klass = GANComponent.lookup_function(None, defn['class'])
         del defn["class"]
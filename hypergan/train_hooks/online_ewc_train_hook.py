@@ -39,27 +39,27 @@ class OnlineEWCTrainHook(BaseTrainHook):
       for i, (param, fisher) in enumerate(zip(self.g_ewc_params, self.g_ewc_fisher)):
           self.register_parameter('g_ewc'+str(i), param)
           self.register_parameter('g_fisher'+str(i), fisher)
-      self.g_ewc_params = [e.cuda() for e in self.g_ewc_params]
-      self.d_ewc_params = [e.cuda() for e in self.d_ewc_params]
-      self.d_ewc_fisher = [e.cuda() for e in self.d_ewc_fisher]
-      self.g_ewc_fisher = [e.cuda() for e in self.g_ewc_fisher]
+      self.g_ewc_params = [e.to(self.gan.device) for e in self.g_ewc_params]
+      self.d_ewc_params = [e.to(self.gan.device) for e in self.d_ewc_params]
+      self.d_ewc_fisher = [e.to(self.gan.device) for e in self.d_ewc_fisher]
+      self.g_ewc_fisher = [e.to(self.gan.device) for e in self.g_ewc_fisher]
 
-      self.d_gamma = torch.Tensor([self.config.d_gamma or self.config.gamma]).float()[0].cuda()
-      self.g_gamma = torch.Tensor([self.config.g_gamma or self.config.gamma]).float()[0].cuda()
+      self.d_gamma = torch.Tensor([self.config.d_gamma or self.config.gamma]).float()[0].to(self.gan.device)
+      self.g_gamma = torch.Tensor([self.config.g_gamma or self.config.gamma]).float()[0].to(self.gan.device)
 
-      self.d_new_fisher_gamma = torch.Tensor([self.config.d_new_fisher_gamma or self.config.new_fisher_gamma or 1e4]).float()[0].cuda()
-      self.g_new_fisher_gamma = torch.Tensor([self.config.g_new_fisher_gamma or self.config.new_fisher_gamma or 1e4]).float()[0].cuda()
+      self.d_new_fisher_gamma = torch.Tensor([self.config.d_new_fisher_gamma or self.config.new_fisher_gamma or 1e4]).float()[0].to(self.gan.device)
+      self.g_new_fisher_gamma = torch.Tensor([self.config.g_new_fisher_gamma or self.config.new_fisher_gamma or 1e4]).float()[0].to(self.gan.device)
 
-      self.g_mean_decay = torch.Tensor([self.config.g_mean_decay or self.config.mean_decay]).float()[0].cuda()
-      self.d_mean_decay = torch.Tensor([self.config.d_mean_decay or self.config.mean_decay]).float()[0].cuda()
-      self.g_mean_decay_1m = torch.Tensor([1.0 - (self.config.g_mean_decay or self.config.mean_decay)]).float()[0].cuda()
-      self.d_mean_decay_1m = torch.Tensor([1.0 - (self.config.d_mean_decay or self.config.mean_decay)]).float()[0].cuda()
+      self.g_mean_decay = torch.Tensor([self.config.g_mean_decay or self.config.mean_decay]).float()[0].to(self.gan.device)
+      self.d_mean_decay = torch.Tensor([self.config.d_mean_decay or self.config.mean_decay]).float()[0].to(self.gan.device)
+      self.g_mean_decay_1m = torch.Tensor([1.0 - (self.config.g_mean_decay or self.config.mean_decay)]).float()[0].to(self.gan.device)
+      self.d_mean_decay_1m = torch.Tensor([1.0 - (self.config.d_mean_decay or self.config.mean_decay)]).float()[0].to(self.gan.device)
 
-      self.d_beta = torch.Tensor([self.config.d_beta or self.config.beta]).float()[0].cuda()
-      self.g_beta = torch.Tensor([self.config.g_beta or self.config.beta]).float()[0].cuda()
+      self.d_beta = torch.Tensor([self.config.d_beta or self.config.beta]).float()[0].to(self.gan.device)
+      self.g_beta = torch.Tensor([self.config.g_beta or self.config.beta]).float()[0].to(self.gan.device)
 
-      self.d_loss_start = torch.zeros(1).float()[0].cuda()
-      self.g_loss_start = torch.zeros(1).float()[0].cuda()
+      self.d_loss_start = torch.zeros(1).float()[0].to(self.gan.device)
+      self.g_loss_start = torch.zeros(1).float()[0].to(self.gan.device)
 
 
   def forward(self, d_loss, g_loss):
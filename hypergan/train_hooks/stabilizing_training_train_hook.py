@@ -19,14 +19,14 @@ class StabilizingTrainingTrainHook(BaseTrainHook):
       super().__init__(config=config, gan=gan, trainer=trainer)
       self.d_loss = None
       self.g_loss = None
-      self.sig = torch.nn.Sigmoid().cuda()
+      self.sig = torch.nn.Sigmoid()
       self.gamma = self.gan.configurable_param(self.config.gamma or 1.0)
 
   def forward(self, d_loss, g_loss):
       x = self.gan.inputs.sample
       g = self.gan.generator_sample
-      d1_params = Variable(x, requires_grad=True).cuda()#self.gan.d_parameters()
-      d2_params = Variable(g, requires_grad=True).cuda()#self.gan.g_parameters()
+      d1_params = Variable(x, requires_grad=True)#self.gan.d_parameters()
+      d2_params = Variable(g, requires_grad=True)#self.gan.g_parameters()
       d1_logits = self.gan.discriminator(d1_params)
       d2_logits = self.gan.discriminator(d2_params)
       d1 = self.sig(d1_logits)
@@ -35,11 +35,11 @@ class StabilizingTrainingTrainHook(BaseTrainHook):
       d2_params = list(self.gan.discriminator.parameters())# + [d2_logits]
       d1_grads = torch_grad(outputs=d1_logits.mean(), inputs=d1_params, retain_graph=True, create_graph=True)
       d2_grads = torch_grad(outputs=d2_logits.mean(), inputs=d2_params, retain_graph=True, create_graph=True)
-      d1_norm = [torch.norm(_d1_grads.view(-1).cuda(),p=2,dim=0) for _d1_grads in d1_grads]
-      d2_norm = [torch.norm(_d2_grads.view(-1).cuda(),p=2,dim=0) for _d2_grads in d2_grads]
+      d1_norm = [torch.norm(_d1_grads.view(-1),p=2,dim=0) for _d1_grads in d1_grads]
+      d2_norm = [torch.norm(_d2_grads.view(-1),p=2,dim=0) for _d2_grads in d2_grads]
 
-      reg_d1 = [(((1.0-d1)**2).cuda() * (_d1_norm**2).cuda()) for _d1_norm in d1_norm]
-      reg_d2 = [((d2**2).cuda() * (_d2_norm**2).cuda()) for _d2_norm in d2_norm]
+      reg_d1 = [(((1.0-d1)**2) * (_d1_norm**2)) for _d1_norm in d1_norm]
+      reg_d2 = [((d2**2) * (_d2_norm**2)) for _d2_norm in d2_norm]
       #reg_d1 = [((d1**2).cuda() * (_d1_norm**2).cuda()) for _d1_norm in d1_norm]
       #reg_d2 = [(((1.0-d2)**2).cuda() * (_d2_norm**2).cuda()) for _d2_norm in d2_norm]
       reg_d1 = sum(reg_d1)
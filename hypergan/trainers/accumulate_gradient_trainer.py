@@ -35,6 +35,7 @@ class AccumulateGradientTrainer(AlternatingTrainer):
             self.accumulated_g_grads = None
             self.accumulation_steps = 0
         else:
+            self.forward_loss()
             gs = self.g_grads()
             if self.accumulated_g_grads is None:
                 self.accumulated_g_grads = [g.clone()/accumulate for g in gs]
@@ -57,6 +58,7 @@ class AccumulateGradientTrainer(AlternatingTrainer):
             g_grads = []
             self.accumulation_steps += 1
 
+        self.clear_forward()
         return d_grads, g_grads
 
 
@@ -68,6 +70,7 @@ class AccumulateGradientTrainer(AlternatingTrainer):
         d_grads, g_grads = self.calculate_gradients()
         self.train_d(d_grads)
         self.train_g(g_grads)
+        self.clear_forward()
 
         self.after_step(self.current_step, feed_dict)
 
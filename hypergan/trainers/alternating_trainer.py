@@ -2,6 +2,7 @@ import numpy as np
 import torch
 import hyperchamber as hc
 import inspect
+from torch.autograd import grad as torch_grad
 
 from hypergan.trainers.base_trainer import BaseTrainer
 
@@ -9,6 +10,9 @@ TINY = 1e-12
 
 class AlternatingTrainer(BaseTrainer):
     """ Steps G and D alternating """
+    forward_cache = None
+    forward_uses = set()
+
     def _create(self):
         if self.config.d_optimizer:
             self.d_optimizer = self.create_optimizer("d_optimizer")
@@ -21,35 +25,65 @@ class AlternatingTrainer(BaseTrainer):
     def required(self):
         return "".split()
 
+    def forward_loss(self, targets=['d','g']):
+        """
+        (d_loss, g_loss) for the current step with gradients flowing to the `targets` parameters.  The forward pass,
+        and `gan.d_real`/`gan.d_fake` with it, is reused within `calculate_gradients` until an optimizer step or a
+        target it was not run for.  `forward_uses` holds the sides still to take gradients from it, by default the
+        `targets`; the last one frees the graph.
+        """
+        cache = self.forward_cache
+        if cache is None or cache[0] != self.current_step or not set(targets) <= cache[1]:
+            d_params, g_params = list(self.trainable_gan.d_parameters()), list(self.trainable_gan.g_parameters())
+            if 'g' not in targets:
+                self.setup_gradient_flow(d_params, g_params)
+            elif 'd' not in targets:
+                self.setup_gradient_flow(g_params, d_params)
+            else:
+                self.setup_gradient_flow(d_params + g_params, [])
+            self.forward_cache = cache = (self.current_step, set(targets), self.trainable_gan.forward_loss())
+            self.forward_uses = set(targets)
+        return cache[2]
+
+    def use_forward(self, side):
+        """Marks the cached forward as used by `side`, returning True when another side still needs its graph"""
+        self.forward_uses = self.forward_uses - set([side])
+        return len(self.forward_uses) > 0
+
+    def clear_forward(self):
+        self.forward_cache = None
+        self.forward_uses = set()
+
     def g_grads(self, d_real=None, d_fake=None):
         self.g_optimizer.zero_grad()
-        self.setup_gradient_flow(self.trainable_gan.g_parameters(), self.trainable_gan.d_parameters())
 
         if d_fake is None:
-            _, g_loss = self.trainable_gan.forward_loss()#TODO targets=['d']
+            _, g_loss = self.forward_loss(['g'])
+            retain_graph = self.use_forward('g')
         else:
             _, g_loss = self.trainable_gan.loss.forward(d_real, d_fake)#TODO targets=['d']
-        _, g_loss = self.trainable_gan.forward_loss()#TODO targets=['d']
+            retain_graph = True
 
         self.gan.add_metric('g_loss', g_loss.mean())
-        g_loss += sum([l[1] for l in self.train_hook_losses(None, g_loss) if l[1] is not None])
+        g_loss = g_loss + sum([l[1] for l in self.train_hook_losses(None, g_loss) if l[1] is not None])
         g_loss = g_loss.mean()
 
-        return self.grads_for(g_loss, self.trainable_gan.g_parameters())
+        return self.grads_for(g_loss, self.trainable_gan.g_parameters(), retain_graph)
 
     def d_grads(self, d_real=None, d_fake=None):
         self.d_optimizer.zero_grad()
-        self.setup_gradient_flow(self.trainable_gan.d_parameters(), self.trainable_gan.g_parameters())
 
         if d_fake is None:
-            d_loss, _ = self.trainable_gan.forward_loss()#TODO targets=['d']
+            d_loss, _ = self.forward_loss(['d'])
+            retain_graph = self.use_forward('d')
         else:
             d_loss, _ = self.trainable_gan.loss.forward(d_real, d_fake)#TODO targets=['d']
+            retain_graph = True
         self.gan.add_metric('d_loss', d_loss.mean())
-        d_loss += sum([l[0] for l in self.train_hook_losses(d_loss, None) if l[0] is not None])
+        d_loss = d_loss + sum([l[0] for l in self.train_hook_losses(d_loss, None) if l[0] is not None])
         d_loss = d_loss.mean()
 
-        return self.grads_for(d_loss, self.trainable_gan.d_parameters())
+        return self.grads_for(d_loss, self.trainable_gan.d_parameters(), retain_graph)
 
     def setup_gradient_flow(self, train_params, ignore_params):
         for p in train_params:
@@ -57,12 +91,10 @@ class AlternatingTrainer(BaseTrainer):
         for p in ignore_params:
             p.requires_grad = False
 
-    def grads_for(self, loss, train_params):
+    def grads_for(self, loss, train_params, retain_graph=True):
         if loss == 0:
             return []
-        loss.backward(retain_graph=True)
-        #return torch_grad(outputs=loss, inputs=train_params, retain_graph=True)
-        return [p.grad for p in train_params]
+        return list(torch_grad(outputs=loss, inputs=list(train_params), retain_graph=retain_graph, allow_unused=True))
 
     def train_hook_losses(self, d_loss, g_loss):
         losses = []
@@ -71,25 +103,20 @@ class AlternatingTrainer(BaseTrainer):
         return losses
 
     def calculate_gradients(self, targets=['d','g']):
+        pretrain_d = self.config.pretrain_d is not None and self.config.pretrain_d > self.gan.steps
         g_grads = []
-        if 'g' in targets:
+        if 'g' in targets and not pretrain_d:
             if( self.config.train_g_every is None or
-                (self.trainable_gan.steps % self.config.train_g_every == 0)):
+                (self.gan.steps % self.config.train_g_every == 0)):
                 g_grads = self.g_grads()
-            if (self.config.pretrain_d is not None and
-                self.config.pretrain_d > self.trainable_gan.steps[0]):
-                g_grads = []
 
         d_grads = []
         if 'd' in targets:
-            if ( self.config.train_d_every is None or
-               ( self.trainable_gan.steps % self.config.train_d_every == 0)):
-                d_grads = self.d_grads()
-
-            if (self.config.pretrain_d is not None and
-                self.config.pretrain_d > self.trainable_gan.steps):
+            if ( self.config.train_d_every is None or pretrain_d or
+               ( self.gan.steps % self.config.train_d_every == 0)):
                 d_grads = self.d_grads()
 
+        self.clear_forward()
         return d_grads, g_grads
 
     def train_d(self, grads):
@@ -102,6 +129,7 @@ class AlternatingTrainer(BaseTrainer):
             p.grad = np
 
         self.d_optimizer.step()
+        self.clear_forward()
 
     def train_g(self, grads):
         if(len(grads) == 0):
@@ -113,6 +141,7 @@ class AlternatingTrainer(BaseTrainer):
             p.grad = np
 
         self.g_optimizer.step()
+        self.clear_forward()
 
     def _step(self, feed_dict):
         self.before_step(self.current_step, feed_dict)
@@ -121,6 +150,7 @@ class AlternatingTrainer(BaseTrainer):
         self.train_d(d_grads)
         _, g_grads = self.calculate_gradients(['g'])
         self.train_g(g_grads)
+        self.clear_forward()
 
         self.after_step(self.current_step, feed_dict)
 
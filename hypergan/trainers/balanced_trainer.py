@@ -18,7 +18,8 @@ class BalancedTrainer(AlternatingTrainer):
         self.last_d_fake = None
 
     def calculate_gradients(self):
-        d_real, d_fake = self.gan.forward_pass()
+        self.forward_loss()
+        d_real, d_fake = self.gan.d_real, self.gan.d_fake
         self.add_metric("R", d_real.mean())
         self.add_metric("F", d_fake.mean())
 
@@ -35,6 +36,7 @@ class BalancedTrainer(AlternatingTrainer):
         else:
             step_d = False
 
+        self.forward_uses = set(['d' if step_d else 'g'])
         if step_d:
             d_grads = self.d_grads()
             g_grads = []
@@ -47,6 +49,7 @@ class BalancedTrainer(AlternatingTrainer):
         self.gan.add_metric("dcount", self.dcount)
         self.gan.add_metric("gcount", self.gcount)
 
+        self.clear_forward()
         return d_grads, g_grads
 
 
@@ -58,6 +61,7 @@ class BalancedTrainer(AlternatingTrainer):
         d_grads, g_grads = self.calculate_gradients()
         self.train_d(d_grads)
         self.train_g(g_grads)
+        self.clear_forward()
 
         self.after_step(self.current_step, feed_dict)
 
@@ -10,10 +10,16 @@ from hypergan.optimizers.adamirror import Adamirror
 TINY = 1e-12
 
 class SimultaneousTrainer(BaseTrainer):
-    """ Steps G and D simultaneously """
+    """
+    Steps G and D simultaneously
+
+    With `single_graph: true` the gradients come from `torch.autograd.grad` over the D and G parameters instead of
+    two `backward` passes that toggle `requires_grad`, and the graph is released after the step.
+    """
     def _create(self):
         self.optimizer = self.create_optimizer()
         self.ttur = self.config.ttur or 1.0
+        self.parameter_groups = None
 
     def required(self):
         return "optimizer".split()
@@ -48,6 +54,9 @@ class SimultaneousTrainer(BaseTrainer):
             if loss[1] is not None:
                 g_loss += loss[1]
 
+        if self.config.single_graph:
+            return self.single_graph_gradients(d_loss, g_loss)
+
         self.trainable_gan.set_generator_trainable(True)
         self.trainable_gan.set_discriminator_trainable(False)
 
@@ -63,6 +72,18 @@ class SimultaneousTrainer(BaseTrainer):
         g_grads = [p.grad for p in self.trainable_gan.g_parameters()]
         return d_grads, g_grads
 
+    def single_graph_gradients(self, d_loss, g_loss):
+        """
+        The same gradients as the `backward` passes.  One `torch.autograd.grad` call over both groups would add
+        d_loss's gradient to G, so G's gradients of g_loss are taken first keeping the graph, then D's free it.
+        """
+        if self.parameter_groups is None:
+            self.parameter_groups = (list(self.trainable_gan.d_parameters()), list(self.trainable_gan.g_parameters()))
+        d_params, g_params = self.parameter_groups
+        g_grads = torch.autograd.grad(g_loss.mean(), g_params, retain_graph=True, allow_unused=True, materialize_grads=True)
+        d_grads = torch.autograd.grad(d_loss.mean(), d_params, allow_unused=True, materialize_grads=True)
+        return [g * self.ttur for g in d_grads], list(g_grads)
+
     def print_metrics(self, step):
         metrics = self.gan.metrics()
         metric_values = self.output_variables(metrics)
@@ -0,0 +1,63 @@
+import torch
+from hypergan.distributions.fitness_distribution import FitnessDistribution
+
+class Source:
+    def __init__(self, gan, config):
+        self.z = None
+        self.count = 0
+
+    def next(self, batch_size=None):
+        self.z = torch.arange(self.count, self.count + 4, dtype=torch.float32).view(4, 1)
+        self.count += 4
+        return self.z
+
+class FitnessGAN:
+    def __init__(self):
+        self.device = torch.device("cpu")
+        self.scored = []
+        self.metrics = {}
+
+    def batch_size(self):
+        return 4
+
+    def generator(self, z):
+        return z
+
+    def discriminator(self, x):
+        self.scored.append(x.shape[0])
+        return -x
+
+    def add_metric(self, name, value):
+        self.metrics[name] = value
+
+def distribution(**kwargs):
+    return FitnessDistribution(FitnessGAN(), {
+        "source": "class:tests.distributions.test_fitness_distribution.Source",
+        "z": 1,
+        "steps": 3,
+        "batched": True,
+        **kwargs
+    })
+
+class TestFitnessDistribution:
+    def test_batched(self):
+        subject = distribution(chunk_size=4)
+        z = subject.next()
+        assert sorted(z.view(-1).tolist()) == [8, 9, 10, 11]
+        assert subject.gan.scored == [4, 4, 4]
+
+    def test_batched_prior(self):
+        subject = distribution(reverse=True)
+        subject.next()
+        z = subject.next()
+        assert sorted(z.view(-1).tolist()) == [0, 1, 2, 3]
+        assert subject.gan.scored == [12, 12, 4]
+
+    def test_reservoir(self):
+        subject = distribution(reservoir_size=6)
+        subject.next()
+        z = subject.next()
+        assert z.view(-1).tolist() == [23, 22, 21, 20]
+        assert subject.reservoir.shape[0] == 6
+        assert subject.gan.scored == [12, 12]
+        assert 'fitness_ms' in subject.gan.metrics
@@ -0,0 +1,46 @@
+import pickle
+import torch
+from hypergan.distributions.latent_buffer import LatentBuffer, truncated_normal, uniform
+
+class TestLatentBuffer:
+    def test_slices(self):
+        buffer = LatentBuffer([4, 8], uniform, block_batches=2, seed=1)
+        a = buffer.next("cpu")
+        b = buffer.next("cpu")
+        assert a.shape == torch.Size([4, 8])
+        assert a.data_ptr() == buffer.block.data_ptr()
+        assert b.data_ptr() == a.data_ptr() + a.numel() * a.element_size()
+        c = buffer.next("cpu")
+        assert c.data_ptr() == buffer.block.data_ptr()
+        assert not torch.equal(a, c)
+        assert a.min() >= -1 and a.max() <= 1
+
+    def test_seed(self):
+        a = LatentBuffer([4, 8], uniform, seed=1).next("cpu")
+        b = LatentBuffer([4, 8], uniform, seed=1).next("cpu")
+        assert torch.equal(a, b)
+
+    def test_restore(self):
+        buffer = LatentBuffer([4, 8], uniform, block_batches=3)
+        buffer.next("cpu")
+        buffer.next("cpu")
+        state = buffer.state_dict()
+        expected = [buffer.next("cpu").clone() for i in range(4)]
+
+        restored = LatentBuffer([4, 8], uniform, block_batches=3)
+        restored.next("cpu")
+        restored.load_state_dict(state)
+        for e in expected:
+            assert torch.equal(restored.next("cpu"), e)
+
+    def test_pickle(self):
+        buffer = LatentBuffer([4, 8], uniform, block_batches=3)
+        buffer.next("cpu")
+        copy = pickle.loads(pickle.dumps(buffer))
+        assert torch.equal(copy.next("cpu"), buffer.next("cpu"))
+
+    def test_truncated_normal(self):
+        z = truncated_normal([100000], None, "cpu")
+        assert z.abs().max() <= 2
+        assert abs(z.mean().item()) < 0.02
+        assert abs(z.std().item() - 0.88) < 0.02
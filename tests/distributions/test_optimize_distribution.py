@@ -0,0 +1,71 @@
+import torch
+from hypergan.distributions.optimize_distribution import OptimizeDistribution
+
+class Source:
+    def __init__(self, gan, config):
+        self.values = config.get("values", [[0.1], [0.2]])
+        self.z = None
+
+    def next(self, batch_size=None):
+        self.z = torch.tensor(self.values)
+        return self.z
+
+class Loss:
+    def forward_adversarial_norm(self, d_real, d_fake):
+        return ((d_real - d_fake)**2).mean()
+
+class Inputs:
+    def __init__(self, sample):
+        self.sample = torch.tensor(sample)
+
+class OptimizeGAN:
+    def __init__(self, sample=[[0.5], [0.5]]):
+        self.device = torch.device("cpu")
+        self.loss = Loss()
+        self.inputs = Inputs(sample)
+
+    def generator(self, z):
+        return z
+
+    def discriminator(self, x):
+        return x
+
+def distribution(gan=None, source={}, **kwargs):
+    return OptimizeDistribution(gan or OptimizeGAN(), {
+        "source": {"class": "class:tests.distributions.test_optimize_distribution.Source", "z": 1, **source},
+        "optimizer": {"class": "class:torch.optim.SGD", "lr": 1.0},
+        "steps": 3,
+        "fast": True,
+        **kwargs
+    })
+
+class TestOptimizeDistribution:
+    def test_fast(self):
+        subject = distribution()
+        z = subject.next()
+        optimizer = subject.optimizer
+        assert z.mean().item() > 0.15
+        subject.next()
+        assert subject.optimizer is optimizer
+
+    def test_fast_freezes(self):
+        subject = distribution(z_change_threshold=2.0)
+        z = subject.next()
+        assert torch.equal(z, torch.tensor([[0.1], [0.2]]))
+
+    def test_fast_freezes_per_sample(self):
+        # the first sample saturates the hardtanh after one step so its movement drops to zero and it freezes,
+        # the second keeps moving.  With momentum a frozen sample would keep drifting if it were not held
+        def subject(steps=4, **kwargs):
+            return distribution(OptimizeGAN(sample=[[2.0], [2.0]]), source={"values": [[0.95], [-0.5]]},
+                                optimizer={"class": "class:torch.optim.SGD", "lr": 0.1, "momentum": 0.9}, steps=steps, **kwargs)
+        first_step = subject(steps=1).next().detach().clone()
+        assert first_step[0, 0] > 1.0 and first_step[1, 0] < 1.0
+
+        z = subject(z_change_threshold=0.5).next().detach()
+        assert torch.equal(z[0], first_step[0])
+        assert z[1, 0] > first_step[1, 0]
+
+        unfrozen = subject().next().detach()
+        assert unfrozen[0, 0] > first_step[0, 0]
+        assert torch.allclose(unfrozen[1], z[1])
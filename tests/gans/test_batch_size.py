@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+import pytest
+import torch
+from hypergan.configurable_component import ConfigurableComponent
+from hypergan.inputs.image_loader import ImageLoader
+from hypergan.modules.learned_noise import LearnedNoise
+from hypergan.viewer import GlobalViewer
+from tests.mocks import input_config, small_gan, small_gan_config
+
+BATCH_SIZES = [1, 2, 3, 5, 8, 16, 31, 64, 128, 255, 256, 511, 512]
+
+def gan_config():
+    return small_gan_config({
+        "class": "function:hypergan.trainers.simultaneous_trainer.SimultaneousTrainer",
+        "hooks": [],
+        "optimizer": {"class": "class:torch.optim.Adam", "lr": 1e-3}
+    },
+    generator=["identity name=z", "latent", "linear 4*4*8", "relu", "identity name=x", "const", "add self x", "add self noise", "learned_noise", "deconv 8", "relu", "conv 3", "tanh"],
+    discriminator=["conv 8", "relu", "flatten", "linear 5"],
+    loss={"class": "function:hypergan.losses.realness_loss.RealnessLoss", "skew": [-1, 1]})
+
+def create(save_file):
+    return small_gan(gan_config(), inputs=ImageLoader(input_config(height=8, width=8)), save_file=save_file)
+
+@contextmanager
+def without_noise(gan):
+    noise = [m.weight for m in gan.generator.modules() if isinstance(m, LearnedNoise)]
+    saved = [w.detach().clone() for w in noise]
+    try:
+        with torch.no_grad():
+            for w in noise:
+                w.zero_()
+            yield
+    finally:
+        with torch.no_grad():
+            for w, s in zip(noise, saved):
+                w.copy_(s)
+
+@pytest.fixture(scope="module")
+def gan(tmp_path_factory):
+    viewer_enabled = GlobalViewer.enabled
+    GlobalViewer.enabled = False
+    save_file = str(tmp_path_factory.mktemp("batch_size") / "model.save")
+    gan, trainable_gan = create(save_file)
+    trainable_gan.step()
+    trainable_gan.save()
+    loaded_gan, loaded_trainable_gan = create(save_file)
+    assert loaded_trainable_gan.load()
+    yield loaded_gan
+    GlobalViewer.enabled = viewer_enabled
+
+class TestBatchSize:
+    @pytest.mark.parametrize("batch_size", BATCH_SIZES)
+    def test_generator(self, gan, batch_size):
+        with torch.no_grad():
+            sample = gan.generator(gan.latent.next(batch_size))
+        assert list(sample.shape) == [batch_size, 3, 8, 8]
+        assert torch.isfinite(sample).all()
+
+    @pytest.mark.parametrize("batch_size", BATCH_SIZES)
+    def test_generator_given_latent(self, gan, batch_size):
+        gan.latent.next()
+        z = torch.rand([batch_size, 16]) * 2 - 1
+        with without_noise(gan):
+            sample = gan.generator(z)
+            negated = gan.generator(-z)
+        assert list(sample.shape) == [batch_size, 3, 8, 8]
+        assert not torch.allclose(sample, negated)
+
+    def test_samples_do_not_depend_on_batch(self, gan):
+        for batch_size in [gan.batch_size(), 5]:
+            gan.latent.next()
+            z = torch.rand([batch_size, 16]) * 2 - 1
+            with without_noise(gan):
+                batch = gan.generator(z)
+                single = torch.cat([gan.generator(z[i:i+1]) for i in range(batch_size)], dim=0)
+            assert torch.allclose(batch, single, atol=1e-6)
+
+    def test_latent_layer_keeps_training_latent(self, gan):
+        gan.latent.next()
+        z = gan.latent.z
+        component = ConfigurableComponent(gan, {"layers": ["latent", "linear 4"]}, input_shape=[16])
+        with torch.no_grad():
+            assert list(component(torch.zeros([5, 16])).shape) == [5, 4]
+        assert gan.latent.z is z
+
+    def test_latent_buffer_larger_than_block(self, gan):
+        assert gan.latent.next(gan.batch_size() * 100).shape[0] == gan.batch_size() * 100
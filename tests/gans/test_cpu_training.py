@@ -0,0 +1,61 @@
+import hypergan as hg
+import os
+import torch
+from hypergan.inputs.image_loader import ImageLoader
+from hypergan.modules.learned_noise import LearnedNoise
+from hypergan.samplers.static_batch_sampler import StaticBatchSampler
+from hypergan.viewer import GlobalViewer
+from tests.mocks import input_config, small_gan, small_gan_config
+
+def gan_config():
+    return small_gan_config({
+        "class": "function:hypergan.trainers.simultaneous_trainer.SimultaneousTrainer",
+        "hooks": [],
+        "optimizer": {"class": "class:torch.optim.Adam", "lr": 1e-3}
+    }, discriminator=["conv 8", "learned_noise", "relu", "flatten", "linear 1"])
+
+def create(save_file):
+    return small_gan(gan_config(), inputs=ImageLoader(input_config(height=8, width=8)), save_file=save_file)
+
+class TestCPUTraining:
+    def setup_method(self):
+        self.viewer_enabled = GlobalViewer.enabled
+        GlobalViewer.enabled = False
+
+    def teardown_method(self):
+        GlobalViewer.enabled = self.viewer_enabled
+
+    def test_train_sample_save_load(self, tmp_path):
+        save_file = str(tmp_path / "saves" / "model.save")
+        gan, trainable_gan = create(save_file)
+        assert gan.generator.get_device().type == "cpu"
+        before = [p.detach().clone() for p in gan.g_parameters()]
+        for i in range(3):
+            trainable_gan.step()
+        assert int(gan.steps.item()) == 3
+        assert any([not torch.equal(b, p) for b, p in zip(before, gan.g_parameters())])
+
+        samples = trainable_gan.sample(StaticBatchSampler(gan), str(tmp_path / "samples"))
+        assert os.path.exists(samples[0]['image'])
+
+        trainable_gan.save()
+        loaded_gan, loaded_trainable_gan = create(save_file)
+        assert loaded_trainable_gan.load()
+        for p, q in zip(gan.parameters(), loaded_gan.parameters()):
+            assert q.device.type == "cpu"
+            assert torch.equal(p, q)
+        loaded_trainable_gan.step()
+
+    def test_default_device(self):
+        gan = hg.GAN(config=gan_config(), inputs=ImageLoader(input_config(height=8, width=8)))
+        expected = "cuda" if torch.cuda.is_available() else "cpu"
+        assert gan.discriminator.get_device().type == expected
+
+    def test_blank_input(self):
+        loader = ImageLoader(input_config(blank=True), device="cpu")
+        assert loader.next().device.type == "cpu"
+
+    def test_learned_noise_follows_input(self):
+        noise = LearnedNoise()
+        x = torch.zeros([3, 2, 4, 4])
+        assert noise(x).shape == x.shape
@@ -0,0 +1,55 @@
+import hyperchamber as hc
+import torch
+from hypergan.inputs.fitness_image_loader import FitnessImageLoader
+from tests.mocks import fixture_path
+
+class MeanDiscriminator:
+    def __init__(self):
+        self.sizes = []
+
+    def __call__(self, x):
+        self.sizes.append(x.shape[0])
+        return x.mean(dim=[1, 2, 3]).view(-1, 1)
+
+class FitnessGAN:
+    def __init__(self):
+        self.discriminator = MeanDiscriminator()
+
+    def batch_size(self):
+        return 2
+
+def loader(**kwargs):
+    config = hc.Config({
+        "class": "class:hypergan.inputs.fitness_image_loader.FitnessImageLoader",
+        "batch_size": 2,
+        "directories": [fixture_path()],
+        "channels": 3,
+        "crop": True,
+        "height": 2,
+        "width": 2,
+        "steps": 2,
+        **kwargs
+    })
+    loader = FitnessImageLoader(config, device="cpu")
+    loader.gan = FitnessGAN()
+    return loader
+
+class TestFitnessImageLoader:
+    def test_selects_lowest(self):
+        inputs = loader()
+        x = inputs.next()
+        assert list(x.shape) == [2, 3, 2, 2]
+        assert x.max() == -1
+        assert inputs.gan.discriminator.sizes == [6]
+
+    def test_reverse(self):
+        inputs = loader(reverse=True)
+        assert inputs.next().min() == 1
+
+    def test_cache_scores(self):
+        inputs = loader(cache_scores=True)
+        inputs.next()
+        inputs.next()
+        assert inputs.gan.discriminator.sizes == [6, 4]
+        assert inputs.best_scores.max() == -1
+        assert inputs.next().max() == -1
@@ -2,10 +2,7 @@ import hypergan as hg
 import tensorflow as tf
 from hypergan.gan_component import ValidationException
 from hypergan.inputs.image_loader import ImageLoader
-import os
-
-def fixture_path(subpath=""):
-    return os.path.dirname(os.path.realpath(__file__)) + '/fixtures/' + subpath
+from tests.mocks import fixture_path
 
 class TestImageLoader:
     def test_constructor(self):
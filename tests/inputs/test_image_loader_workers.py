@@ -0,0 +1,49 @@
+import torch
+from hypergan.inputs.image_loader import ImageLoader
+from tests.mocks import input_config
+
+class TestImageLoaderWorkers:
+    def test_defaults(self):
+        loader = ImageLoader(input_config(), device="cpu")
+        assert loader.dataloaders[0].num_workers == 0
+        x = loader.next()
+        assert list(x.shape) == [2, 3, 2, 2]
+        assert loader.wait_time >= 0
+
+    def test_worker_options(self):
+        loader = ImageLoader(input_config(workers=2, persistent_workers=True, prefetch_factor=3), device="cpu")
+        assert loader.dataloaders[0].num_workers == 2
+        assert loader.dataloaders[0].persistent_workers
+        assert loader.dataloaders[0].prefetch_factor == 3
+
+    def test_prefetch(self):
+        loader = ImageLoader(input_config(prefetch=2), device="cpu")
+        for _ in range(5):
+            x = loader.next()
+            assert list(x.shape) == [2, 3, 2, 2]
+            assert sorted([x[i].mean().item() for i in range(2)]) == [-1.0, 1.0]
+        assert loader.ready[0].maxsize == 2
+
+    def test_reuse_buffers(self):
+        loader = ImageLoader(input_config(reuse_buffers=True), device="cpu")
+        x = loader.next()
+        y = loader.next()
+        assert x.data_ptr() == y.data_ptr()
+        assert x.dtype == torch.float32
+        assert sorted([y[i].mean().item() for i in range(2)]) == [-1.0, 1.0]
+
+    def test_disjoint_ranks(self):
+        loader = ImageLoader(input_config(batch_size=1, shuffle=False), device="cpu")
+        first = loader.to("cpu", rank=0, world_size=2)
+        second = loader.to("cpu", rank=1, world_size=2)
+        assert list(first.samplers[0]) != list(second.samplers[0])
+        assert sorted(list(first.samplers[0]) + list(second.samplers[0])) == [0, 1]
+
+    def test_shared_cache(self):
+        loader = ImageLoader(input_config(cache_bytes=1024), device="cpu")
+        worker = loader.to("cpu", rank=0, world_size=1)
+        assert worker.caches[0] is loader.caches[0]
+        worker.next()
+        assert len(loader.caches[0]) == 2
+        x = loader.next()
+        assert sorted([x[i].mean().item() for i in range(2)]) == [-1.0, 1.0]
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import torchvision
+from hypergan.inputs.manifest import Manifest
+from hypergan.inputs.unsupervised_image_folder import UnsupervisedImageFolder
+from tests.mocks import fixture_path
+
+def dataset(tmp_path):
+    root = tmp_path / "images"
+    shutil.copytree(fixture_path(), str(root))
+    return str(root)
+
+def is_valid_file(path):
+    return torchvision.datasets.folder.has_file_allowed_extension(path, torchvision.datasets.folder.IMG_EXTENSIONS)
+
+class TestManifest:
+    def test_default_path(self):
+        manifest = Manifest("/tmp/images")
+        assert manifest.path == Manifest.default_path("/tmp/images")
+        assert manifest.default_path("/tmp/images").endswith(".json")
+
+    def test_samples(self, tmp_path):
+        root = dataset(tmp_path)
+        manifest = Manifest(root, path=str(tmp_path / "manifest.json"))
+        samples = manifest.samples(is_valid_file)
+        assert samples == [os.path.join(root, "black", "image.png"), os.path.join(root, "white", "image.png")]
+        data = manifest.load()
+        assert data["sizes"]["black/image.png"] == [4, 4]
+        assert set(data["directories"].keys()) == set(["", "black", "white"])
+
+    def test_reuses_unchanged_directories(self, tmp_path, monkeypatch):
+        root = dataset(tmp_path)
+        manifest = Manifest(root, path=str(tmp_path / "manifest.json"))
+        manifest.samples(is_valid_file)
+        def fail(path):
+            raise AssertionError("listed " + path)
+        monkeypatch.setattr(os, "scandir", fail)
+        assert len(manifest.samples(is_valid_file)) == 2
+
+    def test_incremental_update(self, tmp_path):
+        root = dataset(tmp_path)
+        manifest = Manifest(root, path=str(tmp_path / "manifest.json"))
+        manifest.samples(is_valid_file)
+        shutil.copy(os.path.join(root, "black", "image.png"), os.path.join(root, "black", "image2.png"))
+        with open(os.path.join(root, "white", "broken.png"), "w") as f:
+            f.write("not an image")
+        samples = manifest.samples(is_valid_file)
+        assert os.path.join(root, "black", "image2.png") in samples
+        assert os.path.join(root, "white", "broken.png") not in samples
+        assert manifest.load()["quarantine"] == ["white/broken.png"]
+
+    def test_quarantine_at_load(self, tmp_path):
+        root = dataset(tmp_path)
+        manifest = Manifest(root, path=str(tmp_path / "manifest.json"))
+        folder = UnsupervisedImageFolder(root, transform=torchvision.transforms.PILToTensor(), manifest=manifest)
+        with open(folder.samples[0], "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n truncated")
+        [sample] = folder[0]
+        assert sample.min() == 255
+        assert manifest.load()["quarantine"] == ["black/image.png"]
+        assert UnsupervisedImageFolder(root, manifest=manifest).samples == [os.path.join(root, "white", "image.png")]
+
+    def test_concurrent_quarantine(self, tmp_path):
+        root = dataset(tmp_path)
+        manifest = Manifest(root, path=str(tmp_path / "manifest.json"))
+        manifest.samples(is_valid_file)
+        paths = [os.path.join(root, "black", "broken%d.png" % i) for i in range(8)] + [os.path.join(root, "black", "image.png")]
+        with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+            list(executor.map(manifest.quarantine, paths))
+        quarantined = sorted([os.path.relpath(path, root) for path in paths])
+        assert manifest.load()["quarantine"] == quarantined
+        assert "black/image.png" not in manifest.load()["sizes"]
+        assert manifest.samples(is_valid_file) == [os.path.join(root, "white", "image.png")]
+        assert not os.path.exists(manifest.quarantine_path)
+        assert manifest.load()["quarantine"] == ["black/image.png"]
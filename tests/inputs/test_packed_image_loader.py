@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+import torch
+from hypergan.gan_component import ValidationException
+from hypergan.inputs.packed_image_loader import PackedImageLoader, PackedDataset, pack
+from tests.mocks import fixture_path, input_config
+
+def packed_config(directory, **kwargs):
+    return input_config([directory], **{"class": "class:hypergan.inputs.packed_image_loader.PackedImageLoader", **kwargs})
+
+class TestPackedImageLoader:
+    def test_pack(self, tmp_path):
+        index = pack(packed_config(fixture_path()), fixture_path(), str(tmp_path), shard_size=1)
+        assert index["count"] == 2
+        assert len(index["shards"]) == 2
+        assert PackedImageLoader.is_packed(str(tmp_path))
+        assert not PackedImageLoader.is_packed(fixture_path())
+
+    def test_gather_across_shards(self, tmp_path):
+        pack(packed_config(fixture_path()), fixture_path(), str(tmp_path), shard_size=1)
+        dataset = PackedDataset(str(tmp_path))
+        batch = dataset.gather(np.array([1, 0]))
+        assert batch.dtype == np.uint8
+        assert list(batch.shape) == [2, 3, 2, 2]
+        assert batch[0].max() == 0
+        assert batch[1].min() == 255
+
+    def test_next(self, tmp_path):
+        pack(packed_config(fixture_path()), fixture_path(), str(tmp_path))
+        loader = PackedImageLoader(packed_config(str(tmp_path)), device="cpu")
+        assert loader.is_packed(str(tmp_path))
+        for _ in range(3):
+            x = loader.next()
+            assert list(x.shape) == [2, 3, 2, 2]
+            assert sorted([x[i].mean().item() for i in range(2)]) == [-1.0, 1.0]
+
+    def test_size_mismatch(self, tmp_path):
+        pack(packed_config(fixture_path()), fixture_path(), str(tmp_path))
+        with pytest.raises(ValidationException):
+            PackedImageLoader(packed_config(str(tmp_path), width=4, height=4))
@@ -0,0 +1,47 @@
+import torch
+from hypergan.inputs.shared_cache import CachedDataset, SharedImageCache
+
+class Images:
+    def __init__(self):
+        self.loads = 0
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        self.loads += 1
+        return [torch.full([3, 2, 2], index, dtype=torch.uint8)]
+
+class TestSharedImageCache:
+    def test_size_from_budget(self):
+        cache = SharedImageCache(100, [3, 2, 2], 12 * 10)
+        assert cache.size == 10
+        assert cache.images.is_shared()
+
+    def test_get_put(self):
+        cache = SharedImageCache(4, [3, 2, 2], 1024)
+        assert cache.get(1) is None
+        cache.put(1, torch.full([3, 2, 2], 7, dtype=torch.uint8))
+        assert cache.get(1).min() == 7
+        assert len(cache) == 1
+
+    def test_lru_eviction(self):
+        cache = SharedImageCache(4, [3, 2, 2], 12 * 2)
+        cache.put(0, torch.zeros([3, 2, 2], dtype=torch.uint8))
+        cache.put(1, torch.ones([3, 2, 2], dtype=torch.uint8))
+        cache.get(0)
+        cache.put(2, torch.ones([3, 2, 2], dtype=torch.uint8))
+        assert cache.get(1) is None
+        assert cache.get(0) is not None
+        assert cache.get(2) is not None
+        assert len(cache) == 2
+
+    def test_cached_dataset(self):
+        images = Images()
+        cache = SharedImageCache(4, [3, 2, 2], 1024)
+        first = CachedDataset(images, cache)
+        second = CachedDataset(images, cache)
+        [a] = first[3]
+        [b] = second[3]
+        assert images.loads == 1
+        assert a.equal(b)
@@ -0,0 +1,34 @@
+import numpy as np
+import os
+import torch
+import torchvision
+from PIL import Image
+from hypergan.inputs.crop_resize_transform import CropResizeTransform
+from hypergan.inputs.unsupervised_image_folder import UnsupervisedImageFolder
+
+def write_jpeg(path, width, height):
+    x = np.linspace(0, 255, width)[None, :, None]
+    y = np.linspace(0, 255, height)[:, None, None]
+    pixels = np.concatenate([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2).astype(np.uint8)
+    Image.fromarray(pixels).save(path, quality=95)
+
+class TestUnsupervisedImageFolder:
+    def test_draft_matches_full_decode(self, tmp_path):
+        os.makedirs(str(tmp_path / "images"))
+        write_jpeg(str(tmp_path / "images" / "image.jpg"), 640, 480)
+        transform = torchvision.transforms.Compose([CropResizeTransform((32, 32)), torchvision.transforms.PILToTensor()])
+        full = UnsupervisedImageFolder(str(tmp_path / "images"), transform=transform, manifest=False)
+        draft = UnsupervisedImageFolder(str(tmp_path / "images"), transform=transform, manifest=False, draft_size=(32, 32))
+        assert draft.pil_loader(draft.samples[0]).size == (80, 60)
+        [a] = full[0]
+        [b] = draft[0]
+        assert a.shape == b.shape
+        assert (a.float() - b.float()).abs().mean() < 4
+
+    def test_draft_rgba(self, tmp_path):
+        os.makedirs(str(tmp_path / "images"))
+        write_jpeg(str(tmp_path / "images" / "image.jpg"), 256, 256)
+        folder = UnsupervisedImageFolder(str(tmp_path / "images"), mode="RGBA", manifest=False, draft_size=(64, 64))
+        [image] = folder[0]
+        assert image.mode == "RGBA"
+        assert image.size == (64, 64)
@@ -1,8 +1,10 @@
 import hyperchamber as hc
 import hypergan as hg
+import os
 import torch
 
 from hypergan.gan_component import GANComponent
+from hypergan.inputs.image_loader import ImageLoader
 
 def mock_gan(batch_size=1, y=1, config=None, generator_config=None):
     mock_config = config or hc.Config({
@@ -77,3 +79,73 @@ class MockInput:
         self.y = torch.zeros([batch_size, y], dtype=torch.float32)
         self.sample = [self.x, self.y]
 
+
+class MockComponentGAN:
+    """The sizes a ConfigurableComponent reads from its gan"""
+    def __init__(self, channels=3, width=8, height=8):
+        self._channels = channels
+        self._width = width
+        self._height = height
+
+    def channels(self):
+        return self._channels
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+def fixture_path(subpath=""):
+    return os.path.dirname(os.path.realpath(__file__)) + '/inputs/fixtures/' + subpath
+
+def input_config(directories=None, **kwargs):
+    return hc.Config({
+        "class": "class:hypergan.inputs.image_loader.ImageLoader",
+        "batch_size": 2,
+        "directories": directories or [fixture_path()],
+        "channels": 3,
+        "crop": True,
+        "height": 2,
+        "width": 2,
+        "shuffle": True,
+        **kwargs
+    })
+
+ADVERSARIAL_NORM_HOOK = {
+    "class": "function:hypergan.train_hooks.adversarial_norm_train_hook.AdversarialNormTrainHook",
+    "gammas": [-1e12, 1e12],
+    "offset": 1.0,
+    "loss": ["dg"],
+    "mode": "fake"
+}
+
+def small_gan_config(trainer, generator=None, discriminator=None, loss=None):
+    """An 8x8 StandardGAN that trains in milliseconds on the cpu"""
+    return hc.Config({
+        "class": "class:hypergan.gans.standard_gan.StandardGAN",
+        "latent": {
+            "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
+            "z": 16
+        },
+        "generator": {
+            "class": "class:hypergan.generators.configurable_generator.ConfigurableGenerator",
+            "layers": generator or ["linear 4*4*8", "relu", "deconv 3", "tanh"]
+        },
+        "discriminator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "layers": discriminator or ["conv 8", "relu", "flatten", "linear 1"]
+        },
+        "loss": loss or {
+            "class": "function:hypergan.losses.standard_loss.StandardLoss"
+        },
+        "trainer": trainer
+    })
+
+def small_gan(config, inputs=None, save_file="default.save"):
+    """(gan, trainable_gan) on the cpu, reading blank 8x8 images unless given `inputs`"""
+    torch.manual_seed(0)
+    if inputs is None:
+        inputs = ImageLoader(hc.Config({"blank": True, "batch_size": 2, "width": 8, "height": 8, "channels": 3}), device="cpu")
+    gan = hg.GAN(config=config, inputs=inputs, device="cpu")
+    return gan, hg.TrainableGAN(gan, save_file=save_file, backend_name="cpu")
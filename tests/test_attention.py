@@ -0,0 +1,90 @@
+import pytest
+import torch
+from hypergan.discriminators.configurable_discriminator import ConfigurableDiscriminator
+from hypergan.modules.attention import Attention, ChunkedAttention
+from torch.nn import functional as f
+from tests.mocks import MockComponentGAN
+
+def per_head(layer, input_):
+    n, _, h, w = input_.size()
+    keys = layer.keys(input_).reshape((n, layer.key_channels, h * w))
+    queries = layer.queries(input_).reshape(n, layer.key_channels, h * w)
+    values = layer.values(input_).reshape((n, layer.value_channels, h * w))
+    head_key_channels = layer.key_channels // layer.head_count
+    head_value_channels = layer.value_channels // layer.head_count
+    attended_values = []
+    for i in range(layer.head_count):
+        key = f.softmax(keys[:, i * head_key_channels: (i + 1) * head_key_channels, :], dim=2)
+        query = f.softmax(queries[:, i * head_key_channels: (i + 1) * head_key_channels, :], dim=1)
+        value = values[:, i * head_value_channels: (i + 1) * head_value_channels, :]
+        context = key @ value.transpose(1, 2)
+        attended_values.append((context.transpose(1, 2) @ query).reshape(n, head_value_channels, h, w))
+    return layer.reprojection(torch.cat(attended_values, dim=1))
+
+class TestEfficientAttention:
+    @pytest.mark.parametrize("layer_defn", ["efficient_attention heads=1", "efficient_attention", "efficient_attention 12 heads=8", "efficient_attention heads=3 key_channels=16 value_channels=12"])
+    def test_matches_per_head(self, layer_defn):
+        component = ConfigurableDiscriminator(MockComponentGAN(channels=8, width=6, height=5), {"device": "cpu", "layers": [layer_defn]})
+        layer = component.net[0]
+        x = torch.randn(2, 8, 5, 6)
+        assert torch.allclose(layer(x, {}), per_head(layer, x), atol=1e-6)
+
+class TestAttention:
+    def test_efficient_matches_attention_map(self):
+        torch.manual_seed(0)
+        layer = Attention(4)
+        x = torch.randn(2, 4, 8, 6, requires_grad=True)
+        results = []
+        for efficient_size in [48, 0]:
+            layer.efficient_size = efficient_size
+            y = layer(x)
+            results.append([y] + list(torch.autograd.grad((y ** 2).sum(), [x] + list(layer.parameters()), allow_unused=True, materialize_grads=True)))
+        for expected, actual in zip(*results):
+            assert torch.allclose(expected, actual, atol=1e-4)
+
+    def test_chunked_attention_gradgradcheck(self):
+        q, k, v = [torch.randn(2, 7, 3, dtype=torch.double, requires_grad=True) for i in range(3)]
+        # 7 positions in blocks of 3 covers a partial block and the online softmax across blocks
+        chunked = lambda q, k, v: ChunkedAttention.apply(q, k, v, 3)
+        assert torch.autograd.gradcheck(chunked, (q, k, v))
+        assert torch.autograd.gradgradcheck(chunked, (q, k, v))
+        expected = torch.softmax(q @ k.transpose(1, 2), -1) @ v
+        assert torch.allclose(chunked(q, k, v)[0], expected)
+
+    def test_efficient_double_backward(self):
+        torch.manual_seed(0)
+        layer = Attention(4, chunk_size=16)
+        x = torch.randn(2, 4, 8, 6, requires_grad=True)
+        results = []
+        for efficient_size in [0, 48]:
+            layer.efficient_size = efficient_size
+            grad = torch.autograd.grad(layer(x).sum(), x, create_graph=True)[0]
+            results.append(torch.autograd.grad((grad ** 2).sum(), [x] + list(layer.parameters()), allow_unused=True, materialize_grads=True))
+        for expected, actual in zip(*results):
+            assert torch.allclose(expected, actual, atol=1e-4)
+
+    def test_efficient_without_gradients(self):
+        layer = Attention(4, efficient_size=0)
+        x = torch.randn(2, 4, 8, 6)
+        with torch.no_grad():
+            fused = layer(x)
+        layer.efficient_size = 48
+        assert torch.allclose(fused, layer(x), atol=1e-5)
+
+    def test_no_attention_map(self):
+        layer = Attention(4, efficient_size=0, chunk_size=64)
+        x = torch.randn(2, 4, 16, 16, requires_grad=True)
+        saved = []
+        def pack(tensor):
+            saved.append(tensor.numel())
+            return tensor
+        with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+            y = layer(x)
+        y.sum().backward()
+        assert max(saved) < 2 * 256 * 256
+
+    def test_efficient_size_option(self):
+        component = ConfigurableDiscriminator(MockComponentGAN(channels=8, width=6, height=5), {"device": "cpu", "layers": ["attention efficient_size=16 chunk_size=8"]})
+        assert component.net[0].efficient_size == 16
+        assert component.net[0].chunk_size == 8
+        assert list(component(torch.randn(2, 8, 5, 6)).shape) == [2, 8, 5, 6]
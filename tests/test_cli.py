@@ -0,0 +1,27 @@
+import os
+import pytest
+import subprocess
+import sys
+
+pkg_resources = pytest.importorskip("pkg_resources")
+try:
+    pkg_resources.require("hypergan")
+except pkg_resources.DistributionNotFound:
+    pytest.skip("bin/hypergan needs hypergan installed, run `python3 setup.py develop`", allow_module_level=True)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+def hypergan(*args):
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([ROOT] + [p for p in [os.environ.get("PYTHONPATH")] if p])}
+    return subprocess.run([sys.executable, os.path.join(ROOT, "bin", "hypergan")] + list(args), capture_output=True, text=True, timeout=600, env=env, cwd=ROOT)
+
+class TestCLI:
+    def test_check(self):
+        result = hypergan("check", "hypergan/configurations/default.json", "--noviewer")
+        assert "Error detected" not in result.stdout, result.stdout + result.stderr
+        assert "is valid" in result.stdout
+
+    def test_check_cost(self):
+        result = hypergan("check", "hypergan/configurations/default.json", "--cost", "--noviewer")
+        assert "Error detected" not in result.stdout, result.stdout + result.stderr
+        assert "Per step" in result.stdout
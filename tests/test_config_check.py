@@ -0,0 +1,51 @@
+import hyperchamber as hc
+import hypergan as hg
+from hypergan.config_check import check_config, format_report
+
+def config(generator, discriminator):
+    return hc.Config({
+        "latent": {
+            "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
+            "z": 16
+        },
+        "generator": {
+            "class": "class:hypergan.generators.configurable_generator.ConfigurableGenerator",
+            "layers": generator
+        },
+        "discriminator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "layers": discriminator
+        }
+    })
+
+class TestConfigCheck:
+    def test_valid(self):
+        rows, errors = check_config(config(["linear 4*4*8", "relu", "deconv 3", "tanh"], ["conv 8", "relu", "flatten", "linear 1"]), 8, 8, 3, 4)
+        assert errors == []
+        assert [row["shape"] for row in rows[:4]] == [[8, 4, 4], [8, 4, 4], [3, 8, 8], [3, 8, 8]]
+        assert rows[0]["parameters"] == 16 * 128 + 128
+        assert rows[0]["activation_bytes"] == 4 * 128 * 4
+        assert rows[-1]["shape"] == [1]
+        assert "discriminator" in format_report(rows, errors)
+
+    def test_latent_layer(self):
+        rows, errors = check_config(config(["identity name=z", "latent", "linear 4*4*8", "relu", "deconv 3", "tanh"], ["conv 8", "relu", "flatten", "linear 1"]), 8, 8, 3, 4)
+        assert errors == []
+        assert rows[1]["layer"] == "latent"
+        assert rows[1]["shape"] == [16]
+
+    def test_default_configuration(self):
+        default = hg.Configuration.load("default.json", verbose=False, prepackaged=True)
+        rows, errors = check_config(default, 64, 64, 3, 8)
+        assert errors == []
+        assert [row for row in rows if row["layer"] == "latent"]
+
+    def test_generator_size_mismatch(self):
+        rows, errors = check_config(config(["linear 4*4*8", "relu", "deconv 3", "tanh"], ["conv 8", "flatten", "linear 1"]), 16, 16, 3, 4)
+        assert len(errors) > 0
+        assert "generator: output size [3, 8, 8]" in errors[0]
+
+    def test_layer_error(self):
+        rows, errors = check_config(config(["linear 8*8*3", "tanh"], ["flatten", "linear 1", "conv 3"]), 8, 8, 3, 4)
+        assert len(errors) == 1
+        assert errors[0].startswith("discriminator")
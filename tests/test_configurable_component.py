@@ -0,0 +1,144 @@
+import pickle
+import pytest
+import torch
+from hypergan.discriminators.configurable_discriminator import ConfigurableDiscriminator
+from hypergan.gan_component import ValidationException
+from tests.mocks import MockComponentGAN
+
+def component(layers):
+    return ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "layers": layers})
+
+def interpret(subject, input):
+    for module in subject.net:
+        input = module(input)
+    return input
+
+class TestConfigurableComponent:
+    def test_plan(self):
+        subject = component(["conv 4", "relu", "flatten", "linear 1"])
+        assert len(subject.plan) == 4
+        assert subject.validated == False
+        x = torch.randn(2, 3, 8, 8)
+        first = subject(x)
+        assert subject.validated == True
+        assert torch.equal(subject(x), first)
+        assert torch.equal(interpret(subject, x), first)
+
+    def test_named_layers_write_context(self):
+        subject = component(["conv 4 name=features", "relu", "add self (conv 4)"])
+        x = torch.randn(2, 3, 8, 8)
+        for i in range(2):
+            context = {}
+            y = subject(x, context)
+            assert list(context["features"].shape) == [2, 4, 8, 8]
+            assert list(y.shape) == [2, 4, 8, 8]
+
+    def test_operation_reads_named_layer(self):
+        subject = component(["conv 4 name=features", "relu", "add self features"])
+        x = torch.randn(2, 3, 8, 8)
+        subject(x)
+        context = {}
+        y = subject(x, context)
+        assert torch.allclose(y, torch.relu(context["features"]) + context["features"])
+
+    def test_split(self):
+        subject = component(["flatten", "linear 4", "split 2 1"])
+        x = torch.randn(2, 3, 8, 8)
+        subject(x)
+        y = subject(x)
+        assert torch.equal(y, interpret(subject, x)[:, 2:])
+
+    def test_error_names_layer(self):
+        subject = component(["flatten", "linear 1"])
+        subject(torch.randn(2, 3, 8, 8))
+        with pytest.raises(ValidationException, match="linear 1"):
+            subject(torch.randn(2, 3, 4, 4))
+
+    def test_validation_error_names_layer(self):
+        subject = component(["flatten", "linear 1"])
+        with pytest.raises(ValidationException, match="linear 1"):
+            subject(torch.randn(2, 3, 4, 4))
+        assert subject.validated == False
+
+    def test_pickle_recompiles_plan(self):
+        subject = component(["conv 4 name=features", "relu", "flatten", "linear 1"])
+        x = torch.randn(2, 3, 8, 8)
+        with torch.no_grad():
+            expected = subject(x)
+        restored = pickle.loads(pickle.dumps(subject))
+        assert len(restored.plan) == 4
+        context = {}
+        with torch.no_grad():
+            assert torch.equal(restored(x, context), expected)
+        assert "features" in context
+
+def channels_last_pair(layers):
+    torch.manual_seed(0)
+    nchw = component(layers)
+    subject = ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "memory_format": "channels_last", "layers": layers})
+    subject.load_state_dict(nchw.state_dict())
+    return nchw, subject
+
+class TestChannelsLast:
+    def test_matches_nchw(self):
+        nchw, subject = channels_last_pair(["conv 8", "relu", "upsample", "conv 4", "flatten", "linear 1"])
+        x = torch.randn(2, 3, 8, 8)
+        assert torch.allclose(subject(x), nchw(x), atol=1e-5)
+
+    def test_layers_stay_channels_last(self):
+        nchw, subject = channels_last_pair(["flatten", "linear 16 name=w", "linear 8*8*6", "ez_norm", "segment_softmax 3"])
+        x = torch.randn(2, 3, 8, 8)
+        context = {}
+        y = subject(x, context)
+        assert y.is_contiguous(memory_format=torch.channels_last)
+        assert not y.is_contiguous()
+        assert torch.allclose(y, nchw(x), atol=1e-5)
+
+    def test_invalid_memory_format(self):
+        with pytest.raises(ValidationException, match="memory_format"):
+            ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "memory_format": "nhwc", "layers": ["conv 4"]})
+
+def checkpoint_pair(layers, checkpoint):
+    torch.manual_seed(0)
+    stored = component(layers)
+    subject = ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "checkpoint": checkpoint, "layers": layers})
+    subject.load_state_dict(stored.state_dict())
+    return stored, subject
+
+def penalty_gradients(subject, x):
+    parameters = list(subject.parameters())
+    grads = torch.autograd.grad(subject(x).mean(), parameters, create_graph=True)
+    penalty = sum([(g ** 2).sum() for g in grads])
+    return torch.autograd.grad(penalty, parameters, allow_unused=True, materialize_grads=True)
+
+CHECKPOINT_LAYERS = ["flatten", "linear 16 name=w", "linear 8*8*6", "ez_norm checkpoint=true", "add self (conv 6 checkpoint=true)", "conv 4 name=features", "relu", "add self features", "flatten", "linear 1"]
+
+class TestCheckpoint:
+    def test_policy(self):
+        subject = ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "checkpoint": "conv", "layers": ["conv 4", "conv 4 checkpoint=false", "relu checkpoint=true"]})
+        assert [subject.checkpointed(parsed.layer_name, parsed.parsed_options) for parsed in subject.parsed_layers] == [True, False, True]
+
+    def test_gradients_match(self):
+        stored, subject = checkpoint_pair(CHECKPOINT_LAYERS, ["conv"])
+        x = torch.randn(2, 3, 8, 8)
+        for component in [stored, subject]:
+            component(x).mean().backward()
+        for p, q in zip(stored.parameters(), subject.parameters()):
+            assert torch.allclose(p.grad, q.grad, atol=1e-6)
+
+    def test_double_backward(self):
+        stored, subject = checkpoint_pair(CHECKPOINT_LAYERS, ["conv"])
+        x = torch.randn(2, 3, 8, 8)
+        subject(x)
+        for expected, actual in zip(penalty_gradients(stored, x), penalty_gradients(subject, x)):
+            assert torch.allclose(expected, actual, atol=1e-6)
+
+    def test_no_grad(self):
+        stored, subject = checkpoint_pair(CHECKPOINT_LAYERS, ["conv"])
+        x = torch.randn(2, 3, 8, 8)
+        with torch.no_grad():
+            assert torch.allclose(subject(x), stored(x))
+
+    def test_invalid_checkpoint(self):
+        with pytest.raises(ValidationException, match="checkpoint"):
+            ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "checkpoint": 3, "layers": ["conv 4"]})
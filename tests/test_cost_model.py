@@ -0,0 +1,58 @@
+import hyperchamber as hc
+from hypergan.cost_model import estimate, format_costs, optimizer_states
+
+def config(generator, discriminator, optimizer=None):
+    return hc.Config({
+        "latent": {
+            "class": "function:hypergan.distributions.uniform_distribution.UniformDistribution",
+            "z": 16
+        },
+        "generator": {
+            "class": "class:hypergan.generators.configurable_generator.ConfigurableGenerator",
+            "layers": generator
+        },
+        "discriminator": {
+            "class": "class:hypergan.discriminators.configurable_discriminator.ConfigurableDiscriminator",
+            "layers": discriminator
+        },
+        "trainer": {
+            "optimizer": optimizer or {"class": "class:torch.optim.Adam", "lr": 1e-4}
+        }
+    })
+
+class TestCostModel:
+    def test_linear(self):
+        rows, totals, errors = estimate(config(["linear 4*4*8", "relu", "deconv 3", "tanh"], ["flatten", "linear 1"]), 8, 8, 3, 4)
+        assert errors == []
+        linear = rows[0]
+        assert linear["forward_flops"] == 2 * 4 * 16 * 128
+        assert linear["backward_flops"] == 2 * linear["forward_flops"]
+        assert linear["parameter_bytes"] == (16 * 128 + 128) * 4
+        d_linear = rows[-1]
+        assert d_linear["forward_flops"] == 2 * 4 * 192
+        assert totals["forward_flops"] == sum([r["forward_flops"] for r in rows[:4]]) + 2 * (rows[4]["forward_flops"] + rows[5]["forward_flops"])
+        assert totals["optimizer_bytes"] == 2 * totals["parameter_bytes"]
+        assert totals["forward_activation_bytes"] > 0
+        assert "Per step" in format_costs(rows, totals, errors)
+
+    def test_latent_layer(self):
+        rows, totals, errors = estimate(config(["latent", "linear 4*4*8", "relu", "deconv 3", "tanh"], ["flatten", "linear 1"]), 8, 8, 3, 4)
+        assert errors == []
+        assert rows[0]["layer"] == "latent"
+        assert rows[1]["forward_flops"] == 2 * 4 * 16 * 128
+
+    def test_conv(self):
+        rows, totals, errors = estimate(config(["linear 8*8*3", "tanh"], ["conv 8 filter=3 stride=1", "flatten", "linear 1"]), 8, 8, 3, 2)
+        conv = [row for row in rows if row["component"] == "discriminator"][0]
+        assert conv["forward_flops"] == 2 * 2 * 8 * 8 * 8 * 3 * 3 * 3
+
+    def test_optimizer_states(self):
+        assert optimizer_states(config([], [], {"class": "class:torch.optim.Adam", "amsgrad": True})) == 3
+        assert optimizer_states(config([], [], {"class": "class:torch.optim.SGD"})) == 0
+        assert optimizer_states(config([], [], {"class": "class:torch.optim.SGD", "momentum": 0.9})) == 1
+        assert optimizer_states(config([], [], {"class": "class:torch.optim.RMSprop"})) == 1
+
+    def test_modulated_conv2d_and_attention(self):
+        rows, totals, errors = estimate(config(["identity name=w", "linear 4*4*8", "modulated_conv2d 8", "efficient_attention", "conv 3", "tanh"], ["flatten", "linear 1"]), 4, 4, 3, 2)
+        assert errors == []
+        assert all([row["forward_flops"] > 0 and row["backward_flops"] > 0 for row in rows[2:4]])
@@ -0,0 +1,47 @@
+import pytest
+import torch
+from hypergan.discriminators.configurable_discriminator import ConfigurableDiscriminator
+from hypergan.modules.modulated_conv2d import ModulatedConv2d
+from tests.mocks import MockComponentGAN
+
+def grouped(layer, input, style):
+    layer.shares_style = lambda style, batch: False
+    try:
+        return layer(input, style)
+    finally:
+        del layer.shares_style
+
+METHODS = [{"upsample": False}, {"upsample": True}, {"upsample": False, "downsample": True}]
+
+class TestModulatedConv2d:
+    @pytest.mark.parametrize("method", METHODS)
+    def test_broadcast_style(self, method):
+        layer = ModulatedConv2d(4, 5, 3, 6, **method)
+        x = torch.randn(3, 4, 8, 8)
+        style = torch.randn(1, 6, requires_grad=True)
+        assert layer.shares_style(style, 3)
+        shared = layer(x, style)
+        assert torch.allclose(shared, grouped(layer, x, style.expand(3, -1)), atol=1e-5)
+        expected = torch.autograd.grad(grouped(layer, x, style.expand(3, -1)).sum(), style)[0]
+        assert torch.allclose(torch.autograd.grad(shared.sum(), style)[0], expected, atol=1e-4)
+
+    @pytest.mark.parametrize("method", METHODS)
+    def test_expanded_style(self, method):
+        layer = ModulatedConv2d(4, 5, 3, 6, **method)
+        x = torch.randn(3, 4, 8, 8)
+        style = torch.randn(1, 6).expand(3, -1)
+        assert layer.shares_style(style, 3)
+        with torch.no_grad():
+            assert torch.allclose(layer(x, style), grouped(layer, x, style), atol=1e-5)
+
+    def test_equal_rows_are_not_compared(self):
+        layer = ModulatedConv2d(4, 5, 3, 6)
+        with torch.no_grad():
+            assert not layer.shares_style(torch.randn(1, 6).repeat(3, 1), 3)
+            assert not layer.shares_style(torch.randn(3, 6), 3)
+
+    def test_shared_style_option(self):
+        component = ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "layers": ["flatten", "linear 8 name=w", "linear 8*8*3", "modulated_conv2d 4 shared_style=true"]})
+        layer = component.net[-1]
+        assert layer.shared_style
+        assert layer.shares_style(torch.randn(2, 8), 2)
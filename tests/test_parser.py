@@ -97,3 +97,64 @@ class TestParser:
 
     
 
+
+class TestParseCache:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.parser = hg.parser.Parser()
+
+    def test_returns_cached_pattern(self):
+        line = "conv2d 32 stride=2 initializer=(xavier_normal gain=2)"
+        assert self.parser.parse_string(line) is hg.parser.Parser().parse_string(line)
+
+    def test_pattern_is_frozen(self):
+        parsed = self.parser.parse_string("add self (conv2d 8 name=a)")
+        with pytest.raises(AttributeError):
+            parsed.args = []
+        with pytest.raises(TypeError):
+            parsed.options["name"] = "b"
+        with pytest.raises(AttributeError):
+            hg.parser.nested_pattern(parsed.args[1]).layer_name = "linear"
+
+    def test_parsed_options_is_a_copy(self):
+        parsed = self.parser.parse_string("conv2d 32 stride=2")
+        options = parsed.parsed_options
+        options["stride"] = 1
+        assert options.stride == 1
+        assert parsed.parsed_options.stride == 2
+
+    def test_nested_pattern(self):
+        parsed = self.parser.parse_string("conv2d 32 initializer=(orthogonal gain=relu)")
+        initializer = hg.parser.nested_pattern(parsed.options["initializer"])
+        assert initializer.to_list() == ["orthogonal", [], {"gain": "relu"}]
+        assert hg.parser.nested_pattern("orthogonal") is None
+
+    def test_save_and_load(self, tmp_path):
+        path = str(tmp_path / "layers.json")
+        line = "add self (ez_norm initializer=(xavier_normal) style=w) noise=true"
+        parsed = self.parser.parse_string(line)
+        hg.parser.Parser.save_cache(path)
+        del hg.parser.Parser.cache[line]
+        assert hg.parser.Parser.load_cache(path) > 0
+        loaded = self.parser.parse_string(line)
+        assert loaded is not parsed
+        assert loaded.layer_defn == line
+        assert hg.parser.pattern_to_json(loaded) == hg.parser.pattern_to_json(parsed)
+
+    def test_save_and_load_on_instance(self, tmp_path):
+        path = str(tmp_path / "layers.json")
+        line = "conv2d 17 stride=2"
+        self.parser.parse_string(line)
+        self.parser.save_cache(path)
+        del hg.parser.Parser.cache[line]
+        assert self.parser.load_cache(path) > 0
+        assert line in hg.parser.Parser.cache
+
+    def test_pickle(self):
+        import pickle
+        parsed = self.parser.parse_string("conv2d 32 stride=2 initializer=(xavier_normal)")
+        restored = pickle.loads(pickle.dumps(parsed))
+        assert restored.to_list()[:2] == ["conv2d", [32]]
+        assert restored.options["stride"] == 2
+        with pytest.raises(AttributeError):
+            restored.args = []
@@ -0,0 +1,39 @@
+import pytest
+import torch
+from hypergan.discriminators.configurable_discriminator import ConfigurableDiscriminator
+from hypergan.modules.modulated_conv2d import make_kernel, upfirdn2d, upfirdn2d_filter, upfirdn2d_native
+from tests.mocks import MockComponentGAN
+
+def native(input, kernel, up, down, pad):
+    batch, channels, height, width = input.shape
+    out = upfirdn2d_native(input.reshape(-1, height, width, 1), kernel, up, up, down, down, pad[0], pad[1], pad[0], pad[1])
+    return out.reshape(batch, channels, out.shape[1], out.shape[2])
+
+class TestUpFirDn2d:
+    @pytest.mark.parametrize("up", [1, 2])
+    @pytest.mark.parametrize("down", [1, 2])
+    @pytest.mark.parametrize("pad", [(0, 0), (2, 1), (1, 2), (-1, 1)])
+    @pytest.mark.parametrize("blur_kernel", [[1, 3, 3, 1], [1, 2, 1]])
+    def test_matches_native(self, up, down, pad, blur_kernel):
+        kernel = make_kernel(blur_kernel) * up ** 2
+        x = torch.randn(2, 3, 7, 6)
+        assert torch.allclose(upfirdn2d(x, kernel, up=up, down=down, pad=pad), native(x, kernel, up, down, pad), atol=1e-6)
+
+    @pytest.mark.parametrize("up", [1, 2])
+    def test_double_backward(self, up):
+        kernel = make_kernel([1, 3, 3, 1]).double()
+        x = torch.randn(1, 2, 5, 5, dtype=torch.float64, requires_grad=True)
+        assert torch.autograd.gradgradcheck(lambda x: upfirdn2d(x, kernel, up=up, pad=(2, 1)), [x])
+
+    def test_filter_cache(self):
+        kernel = make_kernel([1, 3, 3, 1])
+        weight, crop = upfirdn2d_filter(kernel, 3, 1, (1, 1))
+        assert upfirdn2d_filter(kernel, 3, 1, (1, 1))[0] is weight
+        assert upfirdn2d_filter(kernel, 3, 2, (1, 1))[0] is not weight
+        kernel.mul_(2)
+        assert torch.equal(upfirdn2d_filter(kernel, 3, 1, (1, 1))[0], weight * 2)
+
+    @pytest.mark.parametrize("layer_defn", ["modulated_conv2d 4", "modulated_conv2d 4 upsample", "modulated_conv2d 4 downsample", "blur"])
+    def test_layers_on_cpu(self, layer_defn):
+        component = ConfigurableDiscriminator(MockComponentGAN(), {"device": "cpu", "layers": ["flatten", "linear 8 name=w", "linear 8*8*3", layer_defn]})
+        component(torch.randn(2, 3, 8, 8)).mean().backward()
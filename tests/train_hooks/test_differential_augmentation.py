@@ -0,0 +1,91 @@
+import hyperchamber as hc
+import pytest
+import torch
+import torch.nn.functional as F
+from hypergan.train_hooks.differential_augmentation_train_hook import DiffAugment, DifferentialAugmentationTrainHook
+
+class HookGAN:
+    pass
+
+def reference_brightness(x):
+    return x + (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) - 0.5)
+
+def reference_saturation(x):
+    x_mean = x.mean(dim=1, keepdim=True)
+    return (x - x_mean) * (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) * 2) + x_mean
+
+def reference_contrast(x):
+    x_mean = x.mean(dim=[1, 2, 3], keepdim=True)
+    return (x - x_mean) * (torch.rand(x.size(0), 1, 1, 1, dtype=x.dtype, device=x.device) + 0.5) + x_mean
+
+def reference_translation(x, ratio=0.125):
+    shift_x, shift_y = int(x.size(2) * ratio + 0.5), int(x.size(3) * ratio + 0.5)
+    translation_x = torch.randint(-shift_x, shift_x + 1, size=[x.size(0), 1, 1], device=x.device)
+    translation_y = torch.randint(-shift_y, shift_y + 1, size=[x.size(0), 1, 1], device=x.device)
+    grid_batch, grid_x, grid_y = torch.meshgrid(torch.arange(x.size(0)), torch.arange(x.size(2)), torch.arange(x.size(3)), indexing="ij")
+    grid_x = torch.clamp(grid_x + translation_x + 1, 0, x.size(2) + 1)
+    grid_y = torch.clamp(grid_y + translation_y + 1, 0, x.size(3) + 1)
+    x_pad = F.pad(x, [1, 1, 1, 1, 0, 0, 0, 0])
+    return x_pad.permute(0, 2, 3, 1).contiguous()[grid_batch, grid_x, grid_y].permute(0, 3, 1, 2)
+
+def reference_cutout(x, ratio=0.5):
+    cutout_size = int(x.size(2) * ratio + 0.5), int(x.size(3) * ratio + 0.5)
+    offset_x = torch.randint(0, x.size(2) + (1 - cutout_size[0] % 2), size=[x.size(0), 1, 1], device=x.device)
+    offset_y = torch.randint(0, x.size(3) + (1 - cutout_size[1] % 2), size=[x.size(0), 1, 1], device=x.device)
+    grid_batch, grid_x, grid_y = torch.meshgrid(torch.arange(x.size(0)), torch.arange(cutout_size[0]), torch.arange(cutout_size[1]), indexing="ij")
+    grid_x = torch.clamp(grid_x + offset_x - cutout_size[0] // 2, min=0, max=x.size(2) - 1)
+    grid_y = torch.clamp(grid_y + offset_y - cutout_size[1] // 2, min=0, max=x.size(3) - 1)
+    mask = torch.ones(x.size(0), x.size(2), x.size(3), dtype=x.dtype, device=x.device)
+    mask[grid_batch, grid_x, grid_y] = 0
+    return x * mask.unsqueeze(1)
+
+REFERENCE = {
+    'color': [reference_brightness, reference_saturation, reference_contrast],
+    'translation': [reference_translation],
+    'cutout': [reference_cutout]
+}
+
+def reference(x, policy):
+    for p in policy.split(','):
+        for f in REFERENCE[p]:
+            x = f(x)
+    return x
+
+class TestDiffAugment:
+    @pytest.mark.parametrize("policy", ["color", "translation", "cutout", "color,translation,cutout"])
+    @pytest.mark.parametrize("shape", [[4, 3, 16, 16], [3, 1, 9, 12], [2, 3, 7, 5]])
+    def test_matches_reference(self, policy, shape):
+        x = torch.randn(shape)
+        torch.manual_seed(1)
+        expected = reference(x, policy)
+        torch.manual_seed(1)
+        assert torch.allclose(DiffAugment(x, policy=policy), expected, atol=1e-5)
+
+    def test_gradients_match_reference(self):
+        policy = "color,translation,cutout"
+        x = torch.randn(4, 3, 16, 16, requires_grad=True)
+        torch.manual_seed(1)
+        expected = torch.autograd.grad((reference(x, policy) ** 2).sum(), x)[0]
+        torch.manual_seed(1)
+        assert torch.allclose(torch.autograd.grad((DiffAugment(x, policy=policy) ** 2).sum(), x)[0], expected, atol=1e-5)
+
+    def test_joint(self):
+        hook = DifferentialAugmentationTrainHook(HookGAN(), hc.Config({"policy": "color,translation,cutout", "joint": True}))
+        x = torch.randn(4, 3, 16, 16)
+        g = torch.randn(4, 3, 16, 16)
+        torch.manual_seed(1)
+        expected = reference(torch.cat([x, g]), "color,translation,cutout")
+        torch.manual_seed(1)
+        augmented_x, augmented_g = hook.augment_xg(x, g)
+        assert torch.allclose(augmented_x, expected[:4], atol=1e-5)
+        assert torch.allclose(augmented_g, expected[4:], atol=1e-5)
+
+    def test_separate(self):
+        hook = DifferentialAugmentationTrainHook(HookGAN(), hc.Config({"policy": "translation"}))
+        x = torch.randn(4, 3, 16, 16)
+        g = torch.randn(2, 3, 16, 16)
+        torch.manual_seed(1)
+        expected = [reference(x, "translation"), reference(g, "translation")]
+        torch.manual_seed(1)
+        for actual, e in zip(hook.augment_xg(x, g), expected):
+            assert torch.equal(actual, e)
@@ -0,0 +1,106 @@
+import pytest
+import torch
+from hypergan.viewer import GlobalViewer
+from tests.mocks import ADVERSARIAL_NORM_HOOK, small_gan, small_gan_config
+
+def gan_config(trainer):
+    optimizer = {"class": "class:torch.optim.Adam", "lr": 1e-3}
+    return small_gan_config({"hooks": [ADVERSARIAL_NORM_HOOK], "d_optimizer": optimizer, "g_optimizer": optimizer, **trainer})
+
+def create(trainer):
+    gan, trainable_gan = small_gan(gan_config(trainer))
+    gan.forward_count = 0
+    forward_pass = gan.forward_pass
+    def counted_forward_pass():
+        gan.forward_count += 1
+        return forward_pass()
+    gan.forward_pass = counted_forward_pass
+    return gan, trainable_gan
+
+def alternating(**options):
+    return {"class": "function:hypergan.trainers.alternating_trainer.AlternatingTrainer", **options}
+
+def balanced(**options):
+    return {"class": "function:hypergan.trainers.balanced_trainer.BalancedTrainer", **options}
+
+def accumulate_gradient(**options):
+    return {"class": "function:hypergan.trainers.accumulate_gradient_trainer.AccumulateGradientTrainer", **options}
+
+def forwards_per_step(trainer, steps=3):
+    gan, trainable_gan = create(trainer)
+    counts = []
+    for i in range(steps):
+        gan.forward_count = 0
+        trainable_gan.step()
+        counts.append(gan.forward_count)
+    return counts
+
+class TestAlternatingTrainer:
+    def setup_method(self):
+        self.viewer_enabled = GlobalViewer.enabled
+        GlobalViewer.enabled = False
+
+    def teardown_method(self):
+        GlobalViewer.enabled = self.viewer_enabled
+
+    def test_one_forward_per_update(self):
+        assert forwards_per_step(alternating()) == [2, 2, 2]
+
+    def test_train_every(self):
+        assert forwards_per_step(alternating(train_d_every=2), 4) == [2, 1, 2, 1]
+        assert forwards_per_step(alternating(train_g_every=3), 4) == [2, 1, 1, 2]
+
+    def test_pretrain_d(self):
+        gan, trainable_gan = create(alternating(pretrain_d=2))
+        g_before = [p.detach().clone() for p in gan.g_parameters()]
+        for i in range(2):
+            trainable_gan.step()
+        assert all([torch.equal(b, p) for b, p in zip(g_before, gan.g_parameters())])
+        assert gan.forward_count == 2
+        trainable_gan.step()
+        assert gan.forward_count == 4
+        assert any([not torch.equal(b, p) for b, p in zip(g_before, gan.g_parameters())])
+
+    def test_balanced_reuses_decision_forward(self):
+        assert forwards_per_step(balanced()) == [1, 1, 1]
+
+    def test_accumulate_gradient_reuses_forward(self):
+        assert forwards_per_step(accumulate_gradient(accumulate=2)) == [1, 1, 0]
+
+    def test_cached_gradients(self):
+        gan, trainable_gan = create(balanced(pretrain_d=10))
+        torch.manual_seed(1)
+        d_grads, g_grads = trainable_gan.trainer.calculate_gradients()
+        assert g_grads == []
+        assert gan.forward_count == 1
+
+        gan, trainable_gan = create(alternating(pretrain_d=10))
+        torch.manual_seed(1)
+        expected, _ = trainable_gan.trainer.calculate_gradients(['d'])
+        assert len(d_grads) == len(expected)
+        for a, b in zip(d_grads, expected):
+            assert torch.allclose(a, b, rtol=1e-4, atol=1e-6)
+
+    @pytest.mark.parametrize("trainer", [alternating(), alternating(train_g_every=2), balanced(), accumulate_gradient(accumulate=2)])
+    def test_graph_freed_after_step(self, trainer):
+        gan, trainable_gan = create(trainer)
+        for i in range(2):
+            trainable_gan.step()
+            assert trainable_gan.trainer.forward_cache is None
+            with pytest.raises(RuntimeError, match="second time"):
+                gan.d_fake.sum().backward()
+
+    def test_cache_cleared_by_optimizer_step(self):
+        gan, trainable_gan = create(alternating())
+        trainer = trainable_gan.trainer
+        trainer.forward_loss(['d'])
+        trainer.forward_loss(['d'])
+        assert gan.forward_count == 1
+        d_fake = gan.d_fake
+        trainer.forward_loss(['g'])
+        assert gan.forward_count == 2
+        assert gan.d_fake is not d_fake
+        trainer.train_g(trainer.g_grads())
+        assert gan.forward_count == 2
+        trainer.forward_loss(['g'])
+        assert gan.forward_count == 3
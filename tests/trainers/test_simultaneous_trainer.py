@@ -0,0 +1,48 @@
+import torch
+from hypergan.viewer import GlobalViewer
+from tests.mocks import ADVERSARIAL_NORM_HOOK, small_gan, small_gan_config
+
+def create(single_graph):
+    return small_gan(small_gan_config({
+        "class": "function:hypergan.trainers.simultaneous_trainer.SimultaneousTrainer",
+        "single_graph": single_graph,
+        "ttur": 2.0,
+        "hooks": [ADVERSARIAL_NORM_HOOK],
+        "optimizer": {"class": "class:torch.optim.Adam", "lr": 1e-3}
+    }))
+
+def gradients(single_graph):
+    gan, trainable_gan = create(single_graph)
+    torch.manual_seed(1)
+    return trainable_gan.trainer.calculate_gradients()
+
+class TestSimultaneousTrainer:
+    def setup_method(self):
+        self.viewer_enabled = GlobalViewer.enabled
+        GlobalViewer.enabled = False
+
+    def teardown_method(self):
+        GlobalViewer.enabled = self.viewer_enabled
+
+    def test_single_graph_gradients(self):
+        d_grads, g_grads = gradients(False)
+        single_d_grads, single_g_grads = gradients(True)
+        assert len(d_grads) == len(single_d_grads) and len(g_grads) == len(single_g_grads)
+        for a, b in zip(d_grads + g_grads, single_d_grads + single_g_grads):
+            assert torch.allclose(a, b, rtol=1e-4, atol=1e-6)
+
+    def test_single_graph_does_not_toggle_trainable(self):
+        gan, trainable_gan = create(True)
+        toggled = []
+        trainable_gan.set_generator_trainable = trainable_gan.set_discriminator_trainable = toggled.append
+        trainable_gan.trainer.calculate_gradients()
+        assert toggled == []
+
+    def test_single_graph_step(self):
+        gan, trainable_gan = create(True)
+        before = [p.detach().clone() for p in gan.parameters()]
+        for i in range(2):
+            trainable_gan.step()
+        assert int(gan.steps.item()) == 2
+        assert all([p.requires_grad for p in gan.parameters()])
+        assert any([not torch.equal(b, p) for b, p in zip(before, gan.parameters())])